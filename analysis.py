@@ -0,0 +1,222 @@
+"""
+Multi-PV analysis: a score and a principal variation for every root column from one search
+
+alpha_beta_pruning only proves which column is best, the other columns are cut off as soon as they
+are known to be worse. analyze() instead searches every root column with iterative deepening,
+sharing one transposition table and move ordering across columns and depths:
+
+    - all columns (top_k None): every column gets a full window, so every score is exact
+    - top_k: only scores that can still enter the top k matter, so each column is searched with the
+      k-th best exact score so far as its bound; a column that fails it gets a bound ("upper" when the
+      AI is to move: the real score is at most that, "lower" when the Human is to move) instead of an exact score
+
+Scores are from the AI's perspective like the rest of the engine. The principal variation of a column
+is read back from the transposition table (the best reply stored for each position along the line).
+In a symmetric position (e.g. the empty board) only one column of each mirrored pair is searched,
+its mirror gets the same score and the mirrored principal variation.
+
+Usage:
+    python3 analysis.py 4453 --time-ms 1000           # every column of the position after these moves
+    python3 analysis.py 4453 --depth 10 --top 2
+"""
+import time
+
+from bitboard import ONGOING
+from board import Board
+from constants import AI_TURN, HUMAN_TURN, ALPHA, BETA, HIGHEST_SCORE, LOWEST_SCORE
+from engine import SearchLimits, SearchTimeout, alpha_beta_pruning
+from ordering import MoveOrdering
+from transposition import TranspositionTable, MOVE
+
+# Bound of a line's score
+EXACT = "exact"
+UPPER = "upper"  # the real score is at most the score
+LOWER = "lower"  # the real score is at least the score
+
+
+def principal_variation(bitboard, column: int, turn: int, table: TranspositionTable, max_length: int):
+    """Expected line after playing a column: the column, then the best move stored in the table for each position
+
+    Args:
+        bitboard (BitBoard): position before the column, left unchanged
+        column (int): first move of the line
+        turn (int): player of the first move
+        table (TranspositionTable): table the search filled
+        max_length (int): longest line returned, usually the search depth
+
+    Returns:
+        list: columns of the line, the first one included
+    """
+    pv = [column]
+    bitboard.make_move(column, turn)
+    turn = 1 - turn
+    while len(pv) < max_length and bitboard.last_move_status() == ONGOING:
+        key, mirrored = bitboard.canonical_key(turn)
+        entry = table.probe(key)
+        if entry is None or entry[MOVE] is None:
+            break
+        column = bitboard.geometry.cols - 1 - entry[MOVE] if mirrored else entry[MOVE]
+        if not bitboard.can_play(column):
+            break
+        pv.append(column)
+        bitboard.make_move(column, turn)
+        turn = 1 - turn
+    for _ in pv:
+        bitboard.unmake_move()
+    return pv
+
+
+def _sort_key(player_turn: int):
+    # best first for the player to move, exact scores before bounds on ties
+    if player_turn == AI_TURN:
+        return lambda line: (-line["score"], line["bound"] != EXACT)
+    return lambda line: (line["score"], line["bound"] != EXACT)
+
+
+def _search_root(board: Board, depth: int, player_turn: int, columns: list, top_k: int, table: TranspositionTable,
+                 limits: SearchLimits, ordering: MoveOrdering):
+    """Search every root column to depth, SearchTimeout leaves moves on the board
+
+    Returns:
+        list: one line per column, best first
+    """
+    bitboard = board.bitboard
+    last_column = bitboard.geometry.cols - 1
+    # in a symmetric position a column scores the same as its mirror column, only the first of the two is searched
+    mirrors = {}
+    if bitboard.is_symmetric():
+        searched = bitboard.geometry.drop_mirrored(columns)
+        mirrors = {last_column - col: col for col in searched if last_column - col != col}
+        columns = searched
+
+    exact_scores = []
+    lines = []
+    for column in columns:
+        # only a score better than the k-th best so far can change the top k
+        alpha, beta = ALPHA, BETA
+        if top_k is not None and len(exact_scores) >= top_k:
+            kth = sorted(exact_scores, reverse=player_turn == AI_TURN)[top_k - 1]
+            # the top k are all forced wins: nothing can beat them, and the window (kth, kth) would be empty,
+            # so the column is not searched and only gets the trivial bound
+            if kth == (HIGHEST_SCORE if player_turn == AI_TURN else LOWEST_SCORE):
+                lines.append({"column": column, "score": kth, "bound": UPPER if player_turn == AI_TURN else LOWER})
+                continue
+            if player_turn == AI_TURN:
+                alpha = kth
+            else:
+                beta = kth
+
+        bitboard.make_move(column, player_turn)
+        score = alpha_beta_pruning(board, depth - 1, 1 - player_turn, alpha, beta, table, limits,
+                                   ordering=ordering, ply=1)[1]
+        bitboard.unmake_move()
+
+        # a score at an infinite bound is exact: nothing is below a forced loss or above a forced win
+        if score <= alpha and alpha != ALPHA:
+            bound = UPPER
+        elif score >= beta and beta != BETA:
+            bound = LOWER
+        else:
+            bound = EXACT
+            exact_scores.append(score)
+        lines.append({"column": column, "score": score, "bound": bound})
+
+    for line in lines:
+        line["pv"] = principal_variation(bitboard, line["column"], player_turn, table, depth)
+    for column, searched in mirrors.items():
+        line = next(line for line in lines if line["column"] == searched)
+        lines.append(dict(line, column=column, pv=[last_column - col for col in line["pv"]]))
+    lines.sort(key=_sort_key(player_turn))
+    return lines
+
+
+def analyze(board: Board, player_turn: int, time_ms: float = None, max_depth: int = None, top_k: int = None,
+            table: TranspositionTable = None, ordering: MoveOrdering = None, stop=None, limits: SearchLimits = None,
+            on_depth=None):
+    """Score every valid column of a position with iterative deepening, the columns best so far are searched first
+
+    Args:
+        board (Board): board that is active, it is not modified
+        player_turn (int): 0 if AI_TURN (Maximizer), 1 if HUMAN_TURN
+        time_ms (float): wall-clock budget in milliseconds, None for no time limit
+        max_depth (int): deepest depth to search, defaults to the number of empty cells
+        top_k (int): only the best top_k columns need exact scores, the others may get bounds; None for all exact
+        table (TranspositionTable): cache shared by all columns and depths, a new one if None
+        ordering (MoveOrdering): optional move ordering heuristics shared by all columns and depths
+        stop (threading.Event): optional flag another thread sets to abort the analysis early
+        limits (SearchLimits): optional budget used instead of time_ms/ stop
+        on_depth (callable): optional on_depth(depth, lines), called after every completed depth
+
+    Returns:
+        tuple: (lines, depth) of the deepest completed depth, lines best first, one per valid column:
+            {"column": int, "score": float, "bound": EXACT | UPPER | LOWER, "pv": [columns]};
+            ([], 0) if the game is over or no depth completed
+    """
+    if limits is None:
+        limits = SearchLimits(time_ms, stop=stop)
+    if table is None:
+        table = TranspositionTable()
+    bitboard = board.bitboard
+    geometry = bitboard.geometry
+    valid_columns = bitboard.valid_columns()
+    if not valid_columns or (bitboard.moves and bitboard.last_move_status() != ONGOING):
+        return [], 0
+
+    empty_cells = geometry.size - len(bitboard.moves)
+    if max_depth is None or max_depth > empty_cells:
+        max_depth = empty_cells
+    if ordering is not None:
+        ordering.new_search()
+
+    # an aborted search leaves its moves on the board, so search a copy
+    search_board = board.copy()
+    columns = [col for col in geometry.center_order if col in valid_columns]
+    lines, completed_depth = [], 0
+    for depth in range(1, max_depth + 1):
+        if limits.is_expired():
+            break
+        try:
+            depth_lines = _search_root(search_board, depth, player_turn, columns, top_k, table, limits, ordering)
+        except SearchTimeout:
+            break
+        lines, completed_depth = depth_lines, depth
+        if on_depth is not None:
+            on_depth(depth, lines)
+        columns = [line["column"] for line in lines]
+
+        # every column is a forced win/ loss, searching deeper will not change anything
+        if all(line["bound"] == EXACT and line["score"] in (HIGHEST_SCORE, LOWEST_SCORE) for line in lines):
+            break
+
+    return lines, completed_depth
+
+
+def main():
+    # the hover hint imports this module, so the command line only costs anything when it runs
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score every column of a Connect 4 position")
+    parser.add_argument("moves", nargs="?", default="", help="moves played so far, one digit per move, columns from 1")
+    parser.add_argument("--time-ms", type=float, default=None)
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--top", type=int, default=None, help="only the best TOP columns get exact scores")
+    args = parser.parse_args()
+    if args.time_ms is None and args.depth is None:
+        args.time_ms = 1000
+
+    board = Board.from_moves(args.moves)
+    turn = AI_TURN if len(args.moves) % 2 == 0 else HUMAN_TURN
+    start = time.perf_counter()
+    limits = SearchLimits(args.time_ms)
+    lines, depth = analyze(board, turn, max_depth=args.depth, top_k=args.top, ordering=MoveOrdering(), limits=limits)
+    elapsed = time.perf_counter() - start
+    print(f"depth {depth}, {limits.nodes} nodes in {elapsed * 1000:.0f} ms, scores from the AI's (first player's) "
+          f"perspective, {'AI' if turn == AI_TURN else 'Human'} to move")
+    for line in lines:
+        bound = {EXACT: "  ", UPPER: "<=", LOWER: ">="}[line["bound"]]
+        pv = "".join(str(column + 1) for column in line["pv"])
+        print(f"column {line['column'] + 1}: {bound}{line['score']:>8}  pv {pv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Streaming game-archive analyzer: score every move of every game and flag the blunders
+
+Archives are files of game records (records.py: one move string per line, arena.py JSON lines work too).
+The pipeline is a chain of generators, so memory stays flat for any archive size:
+
+    read_records -> game_tasks -> run_tasks (process pool) -> analyze_archive -> reports
+
+    - game_tasks replays each game incrementally on one BitBoard (make_move per ply), checks the moves and
+      looks every position up in the cache
+    - run_tasks sends the positions that are not cached to a process pool, with a bounded number of games in flight
+    - every searched position scores all of its columns with analysis.analyze (fixed depth, exact scores)
+    - the played column is compared with the best column for the player who moved it:
+        missed_win   a forced win was available but not played
+        losing_move  the move walks into a forced loss that could have been avoided
+        mistake      the score drops by at least the threshold (evaluation points)
+
+Per-position scores are cached in an SQLite file keyed by the board geometry and the position hash
+(BitBoard.canonical_key: Zobrist hash and side to move, shared with the mirror image, whose scores are stored
+mirrored), so analyzing overlapping archives (every game shares its opening) only searches positions that were
+not seen before, or their mirror images, at the same or a greater depth. Games analyzed at the same
+time may still search a shared position twice before it reaches the cache.
+
+Usage:
+    python3 archive.py games.txt --depth 8 --workers 4
+    python3 archive.py games.txt more_games.txt --output report.jsonl --threshold 500
+    python3 arena.py --games 100 --output selfplay.jsonl && python3 archive.py selfplay.jsonl
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from analysis import analyze
+from bitboard import BitBoard, ONGOING, get_geometry
+from board import Board
+from constants import AI_TURN
+from engine import SearchLimits
+from ordering import MoveOrdering
+from records import encode_moves, read_records
+from transposition import TranspositionTable
+
+ANALYSIS_CACHE_PATH = "analysis_cache.sqlite"
+DEFAULT_DEPTH = 8
+DEFAULT_THRESHOLD = 1000  # evaluation points lost by a move to call it a mistake
+WORKER_TABLE_ENTRIES = 1 << 18
+
+# Flags of a move
+MISSED_WIN = "missed_win"
+LOSING_MOVE = "losing_move"
+MISTAKE = "mistake"
+
+_caches = {}  # geometry -> (TranspositionTable, MoveOrdering), shared by the positions analyzed in this process
+
+
+def _score(score: float):
+    # JSON has no infinity, forced wins/ losses are written as "inf"/ "-inf"
+    return score if score is None or math.isfinite(score) else str(score)
+
+
+def _signed(key: int):
+    # SQLite integers are signed 64 bit
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class PositionCache:
+    def __init__(self, path: str, geometry):
+        """Scores of analyzed positions in an SQLite file, shared by every archive analyzed with it
+
+        Args:
+            path (str): database file, created if missing
+            geometry (Geometry): board of the positions, positions of other geometries in the file are ignored
+        """
+        self.shape = f"{geometry.rows}x{geometry.cols}x{geometry.connect}"
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS positions (shape TEXT, key INTEGER, depth INTEGER, "
+                                "scores TEXT, PRIMARY KEY (shape, key)) WITHOUT ROWID")
+
+    def get(self, key: int, mirrored: bool, depth: int):
+        """Scores of every column (None for full columns) of a position analyzed to depth or deeper, None if not cached
+
+        Args:
+            key (int): canonical key of the position
+            mirrored (bool): the key is the one of the mirror image, the stored scores are mirrored back
+            depth (int): least depth of a usable entry
+        """
+        row = self.connection.execute("SELECT depth, scores FROM positions WHERE shape = ? AND key = ?",
+                                      (self.shape, _signed(key))).fetchone()
+        if row is None or row[0] < depth:
+            return None
+        scores = [float(score) if isinstance(score, str) else score for score in json.loads(row[1])]
+        return scores[::-1] if mirrored else scores
+
+    def put(self, entries):
+        """Store (key, mirrored, depth, scores) entries (see get), replacing shallower ones"""
+        rows = []
+        for key, mirrored, depth, scores in entries:
+            if mirrored:
+                scores = scores[::-1]
+            rows.append((self.shape, _signed(key), depth, json.dumps([_score(score) for score in scores])))
+        self.connection.executemany("INSERT OR REPLACE INTO positions VALUES (?, ?, ?, ?)", rows)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def _analyze_positions(shape: tuple, moves: list, plies: list, depth: int, first_turn: int = AI_TURN):
+    """Score every column of some positions of a game, in a worker process
+
+    Args:
+        shape (tuple): (rows, cols, connect) of the board
+        moves (list): columns of the game
+        plies (list): positions to analyze, the position before moves[ply] for each ply
+        depth (int): search depth
+        first_turn (int): player of the first move
+
+    Returns:
+        tuple: ({ply: scores}, nodes), scores[column] from the AI's perspective, None for full columns
+    """
+    geometry = get_geometry(*shape)
+    if geometry not in _caches:
+        _caches[geometry] = (TranspositionTable(WORKER_TABLE_ENTRIES), MoveOrdering(geometry=geometry))
+    table, ordering = _caches[geometry]
+
+    board = Board(BitBoard(geometry=geometry))
+    wanted = set(plies)
+    results = {}
+    nodes = 0
+    turn = first_turn
+    for ply, column in enumerate(moves[:max(plies) + 1]):
+        if ply in wanted:
+            limits = SearchLimits()
+            lines = analyze(board, turn, max_depth=depth, table=table, ordering=ordering, limits=limits)[0]
+            scores = [None] * geometry.cols
+            for line in lines:
+                scores[line["column"]] = line["score"]
+            results[ply] = scores
+            nodes += limits.nodes
+        board.bitboard.make_move(column, turn)
+        turn = 1 - turn
+    return results, nodes
+
+
+def classify_move(scores: list, column: int, turn: int, threshold: float):
+    """Flag of a played column, None if the move is fine
+
+    Args:
+        scores (list): score of every column from the AI's perspective, None for full columns
+        column (int): column played
+        turn (int): player who played it
+        threshold (float): score lost by a mistake
+
+    Returns:
+        tuple: (flag or None, best column, best score, played score), scores from the mover's perspective
+    """
+    sign = 1 if turn == AI_TURN else -1
+    best_column = max((col for col, score in enumerate(scores) if score is not None),
+                      key=lambda col: sign * scores[col])
+    best, played = sign * scores[best_column], sign * scores[column]
+    flag = None
+    if best == math.inf and played != math.inf:
+        flag = MISSED_WIN
+    elif played == -math.inf and best != -math.inf:
+        flag = LOSING_MOVE
+    elif math.isfinite(best) and math.isfinite(played) and best - played >= threshold:
+        flag = MISTAKE
+    return flag, best_column, best, played
+
+
+def game_tasks(records, geometry, depth: int, cache: PositionCache = None, on_error=None):
+    """Replay every game incrementally, check it and find the positions that still need a search
+
+    Args:
+        records: (source, line_number, moves, result, first_turn) tuples of read_records
+        geometry (Geometry): board of the games
+        depth (int): search depth, cached positions analyzed less deep are searched again
+        cache (PositionCache): optional position cache
+        on_error (callable): on_error(source, line_number, message) for an illegal game, None to raise ValueError
+
+    Yields:
+        tuple: (game, moves, keys, scores, missing): game info dict ("first" is the player of the first move),
+            columns played, (canonical key, mirrored) of every ply, {ply: scores} of the cached positions
+            and the plies to search
+    """
+    for source, line_number, moves, result, first_turn in records:
+        bitboard = BitBoard(geometry=geometry)
+        keys, scores = [], {}
+        turn = first_turn
+        try:
+            for ply, column in enumerate(moves):
+                if bitboard.moves and bitboard.last_move_status() != ONGOING:
+                    raise ValueError(f"move {ply + 1} is played after the game is over")
+                if not 0 <= column < geometry.cols or not bitboard.can_play(column):
+                    raise ValueError(f"move {ply + 1} plays column {column + 1}, which is not playable")
+                key, mirrored = bitboard.canonical_key(turn)
+                keys.append((key, mirrored))
+                if cache is not None:
+                    cached = cache.get(key, mirrored, depth)
+                    if cached is not None:
+                        scores[ply] = cached
+                bitboard.make_move(column, turn)
+                turn = 1 - turn
+        except ValueError as error:
+            if on_error is None:
+                raise ValueError(f"{source}:{line_number}: {error}") from None
+            on_error(source, line_number, str(error))
+            continue
+
+        game = {"source": source, "line": line_number, "record": encode_moves(moves), "result": result,
+                "first": first_turn}
+        yield game, moves, keys, scores, [ply for ply in range(len(moves)) if ply not in scores]
+
+
+def run_tasks(tasks, shape: tuple, depth: int, workers: int = None, max_in_flight: int = None):
+    """Search the missing positions of game tasks on a process pool, yielding (task, results, nodes) as games finish
+    Only max_in_flight games are submitted at a time, so memory stays flat for any number of games
+
+    Args:
+        tasks: game_tasks tuples
+        shape (tuple): (rows, cols, connect) of the board
+        depth (int): search depth
+        workers (int): number of processes, 1 searches in this process
+        max_in_flight (int): games submitted but not finished, defaults to 4 per worker
+    """
+    def job(task):
+        game, moves, missing = task[0], task[1], task[4]
+        return (shape, moves, missing, depth, game["first"]) if missing else None
+
+    if workers == 1:
+        for task in tasks:
+            args = job(task)
+            yield (task,) + (_analyze_positions(*args) if args else ({}, 0))
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = 4 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for task in tasks:
+            args = job(task)
+            if args is None:  # every position is cached
+                yield task, {}, 0
+                continue
+            pending[pool.submit(_analyze_positions, *args)] = task
+            if len(pending) >= max_in_flight:
+                done = wait(pending, return_when=FIRST_COMPLETED).done
+                for future in done:
+                    yield (pending.pop(future),) + future.result()
+        for future in wait(pending).done:
+            yield (pending.pop(future),) + future.result()
+
+
+class ArchiveStats:
+    def __init__(self):
+        """Running totals of an archive analysis"""
+        self.games = 0
+        self.positions = 0
+        self.searched = 0  # positions that were not cached
+        self.nodes = 0
+        self.errors = 0  # lines that are not records or games with illegal moves
+        self.flags = {MISSED_WIN: 0, LOSING_MOVE: 0, MISTAKE: 0}
+        self.start = time.perf_counter()
+
+    def on_error(self, source: str, line_number: int, message: str):
+        self.errors += 1
+        print(f"{source}:{line_number}: skipped, {message}", file=sys.stderr)
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self.start
+        return {
+            "games": self.games,
+            "positions": self.positions,
+            "searched": self.searched,
+            "cached": self.positions - self.searched,
+            "nodes": self.nodes,
+            "errors": self.errors,
+            "flags": dict(self.flags),
+            "seconds": round(elapsed, 3),
+            "positions_per_s": round(self.positions / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def analyze_archive(paths, geometry=None, depth: int = DEFAULT_DEPTH, threshold: float = DEFAULT_THRESHOLD,
+                    cache_path: str = None, workers: int = None, max_in_flight: int = None, stats: ArchiveStats = None):
+    """Analyze every game of some archive files, yielding one report per game as games finish
+
+    Args:
+        paths: archive files, "-" for stdin
+        geometry (Geometry): board of the games, defaults to the classic 6x7 connect 4
+        depth (int): search depth of every position
+        threshold (float): score a move must lose to be a mistake
+        cache_path (str): position cache file, None for no cache
+        workers (int): number of processes, 1 searches in this process
+        max_in_flight (int): games submitted but not finished, defaults to 4 per worker
+        stats (ArchiveStats): totals to update, a new one if None
+
+    Yields:
+        dict: game info (source, line, record, result, first), number of moves and cached positions, and "flags":
+            one {"ply", "player", "column", "best_column", "score", "best_score", "flag"} per flagged move,
+            player 0 is the first player and scores are from the mover's perspective
+    """
+    if geometry is None:
+        geometry = get_geometry()
+    if stats is None:
+        stats = ArchiveStats()
+    shape = (geometry.rows, geometry.cols, geometry.connect)
+    cache = PositionCache(cache_path, geometry) if cache_path else None
+    records = read_records(paths, on_error=stats.on_error)
+    tasks = game_tasks(records, geometry, depth, cache, on_error=stats.on_error)
+    try:
+        for task, results, nodes in run_tasks(tasks, shape, depth, workers, max_in_flight):
+            game, moves, keys, scores, missing = task
+            if cache is not None and results:
+                cache.put([keys[ply] + (depth, results[ply]) for ply in missing])
+            scores.update(results)
+
+            flags = []
+            for ply, column in enumerate(moves):
+                turn = game["first"] if ply % 2 == 0 else 1 - game["first"]
+                flag, best_column, best, played = classify_move(scores[ply], column, turn, threshold)
+                if flag is not None:
+                    stats.flags[flag] += 1
+                    flags.append({"ply": ply, "player": ply % 2, "column": column, "best_column": best_column,
+                                  "score": _score(played), "best_score": _score(best), "flag": flag})
+            stats.games += 1
+            stats.positions += len(moves)
+            stats.searched += len(missing)
+            stats.nodes += nodes
+            yield dict(game, moves=len(moves), cached=len(moves) - len(missing), flags=flags)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def main():
+    from benchmark import parse_geometry
+
+    parser = argparse.ArgumentParser(description="Score every move of archived Connect 4 games and flag blunders")
+    parser.add_argument("paths", nargs="+", help="archive files of game records, - for stdin")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="evaluation points a move must lose to be a mistake")
+    parser.add_argument("--workers", type=int, default=None, help="processes, defaults to the number of CPUs")
+    parser.add_argument("--cache", default=ANALYSIS_CACHE_PATH, help="position cache file")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--geometry", default=None, help="board of the games, e.g. 8x9x5 (rows x columns x connect)")
+    parser.add_argument("--output", default=None, help="JSON lines file for the report of every game")
+    args = parser.parse_args()
+
+    geometry = parse_geometry(args.geometry) if args.geometry else get_geometry()
+    stats = ArchiveStats()
+    output = open(args.output, "w") if args.output else None
+    try:
+        for report in analyze_archive(args.paths, geometry, args.depth, args.threshold,
+                                      None if args.no_cache else args.cache, args.workers, stats=stats):
+            if output is not None:
+                output.write(json.dumps(report) + "\n")
+            if report["flags"]:
+                moves = ", ".join(f"{flag['ply'] + 1}. {flag['column'] + 1} {flag['flag']} (best {flag['best_column'] + 1})"
+                                  for flag in report["flags"])
+                print(f"{report['source']}:{report['line']} {report['record']}: {moves}")
+    finally:
+        if output is not None:
+            output.close()
+    print(json.dumps(stats.to_dict()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Headless self-play arena: AI-vs-AI batch games between engine configurations
+
+Engine configurations vary by depth, time budget, node budget and evaluation weights. Every pair of
+configurations plays the requested number of games, spread across a process pool. Games come in
+pairs with the same random opening and colors swapped, so neither side profits from a lucky opening.
+
+Every finished game is streamed as one JSON line (moves, result, per-move time/ nodes/ depth),
+and a summary of win rates and Elo-style ratings is printed at the end. Use it to tune the
+evaluate_window weights and to catch strength or speed regressions.
+
+Usage:
+    python3 arena.py --games 200 --workers 8 --output games.jsonl
+    python3 arena.py --config engines.json --games 1000
+
+engines.json is a list of configurations, e.g.
+    [{"name": "depth4", "depth": 4},
+     {"name": "fast", "time_ms": 50, "weights": {"own": [100, 300, 500], "opponent": [300, 700, 1000]}}]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from bitboard import BitBoard, ONGOING, WIN
+from board import Board
+from engine import SearchLimits, iterative_deepening
+from evaluation import DEFAULT_WEIGHTS, window_gains, window_scores
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+DEFAULT_OPENING_PLIES = 2
+ELO_BASE = 1500
+
+
+class EngineConfig:
+    def __init__(self, name: str, depth: int = None, time_ms: float = None, max_nodes: int = None,
+                 weights: dict = None):
+        """One engine setup taking part in the arena, at least one of depth/ time_ms/ max_nodes should be set
+
+        Args:
+            name (str): unique name used in results
+            depth (int): maximum search depth
+            time_ms (float): think time per move in milliseconds
+            max_nodes (int): node budget per move
+            weights (dict): evaluation weights, see evaluation.window_scores, None for the defaults
+        """
+        self.name = name
+        self.depth = depth
+        self.time_ms = time_ms
+        self.max_nodes = max_nodes
+        self.weights = weights
+
+    def to_dict(self):
+        return {"name": self.name, "depth": self.depth, "time_ms": self.time_ms,
+                "max_nodes": self.max_nodes, "weights": self.weights}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["name"], data.get("depth"), data.get("time_ms"), data.get("max_nodes"), data.get("weights"))
+
+
+DEFAULT_CONFIGS = [EngineConfig("depth4", depth=4), EngineConfig("time100ms", time_ms=100)]
+
+
+class _Player:
+    """One engine in one game: its own board (its evaluation weights are part of the board) and caches"""
+
+    def __init__(self, config: EngineConfig, turn: int):
+        self.config = config
+        self.turn = turn
+        # the weights are always from this engine's own perspective, the defaults included: the board's default
+        # table is written for the AI (turn 0), so an engine playing turn 1 would otherwise weigh threats differently
+        weights = config.weights or DEFAULT_WEIGHTS
+        self.board = Board(BitBoard(window_gains(window_scores(weights, perspective=turn))))
+        self.table = TranspositionTable(1 << 16)
+        self.ordering = MoveOrdering()
+
+    def choose_move(self):
+        limits = SearchLimits(self.config.time_ms, self.config.max_nodes)
+        column, score, depth = iterative_deepening(self.board, self.turn, max_depth=self.config.depth,
+                                                   table=self.table, ordering=self.ordering, limits=limits)
+        return column, score, depth, limits.nodes
+
+
+def random_opening(rng: random.Random, plies: int):
+    """Random first moves that do not end the game
+
+    Returns:
+        list: columns played
+    """
+    bitboard = BitBoard()
+    turn = 0
+    for _ in range(plies):
+        column = rng.choice(bitboard.valid_columns())
+        bitboard.make_move(column, turn)
+        if bitboard.last_move_status() != ONGOING:
+            bitboard.unmake_move()
+            break
+        turn = 1 - turn
+    return bitboard.moves[:]
+
+
+def play_game(game_id: int, config_a: dict, config_b: dict, a_first: bool, opening: list):
+    """Play one game between two configurations (run in a worker process)
+
+    Args:
+        game_id (int): id written to the result
+        config_a (dict): EngineConfig.to_dict() of engine A
+        config_b (dict): EngineConfig.to_dict() of engine B
+        a_first (bool): engine A makes the first move (after the opening)
+        opening (list): columns played before the engines take over
+
+    Returns:
+        dict: JSON-serializable game record
+    """
+    engine_a = EngineConfig.from_dict(config_a)
+    engine_b = EngineConfig.from_dict(config_b)
+    # the first player always plays turn 0
+    players = [_Player(engine_a, 0), _Player(engine_b, 1)] if a_first else [_Player(engine_b, 0), _Player(engine_a, 1)]
+
+    turn = 0
+    status = ONGOING
+    for column in opening:
+        for player in players:
+            player.board.bitboard.make_move(column, turn)
+        status = players[0].board.bitboard.last_move_status()
+        turn = 1 - turn
+
+    moves = []
+    while status == ONGOING:
+        player = players[turn]
+        start = time.perf_counter()
+        column, score, depth, nodes = player.choose_move()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for other in players:
+            other.board.bitboard.make_move(column, turn)
+        moves.append({"column": column, "player": player.config.name, "time_ms": round(elapsed_ms, 3),
+                      "nodes": nodes, "depth": depth, "score": score if math.isfinite(score) else str(score)})
+        status = players[0].board.bitboard.last_move_status()
+        turn = 1 - turn
+
+    winner = players[1 - turn].config.name if status == WIN else None
+    return {
+        "game": game_id,
+        "a": engine_a.name,
+        "b": engine_b.name,
+        "first": players[0].config.name,
+        "opening": opening,
+        "record": "".join(str(column + 1) for column in players[0].board.bitboard.moves),
+        "moves": moves,
+        "result": "draw" if winner is None else ("a" if winner == engine_a.name else "b"),
+        "winner": winner,
+    }
+
+
+def schedule(configs: list, games_per_pair: int, opening_plies: int = DEFAULT_OPENING_PLIES, seed: int = 0):
+    """Yield play_game arguments for every pair of configurations, in color-swapped pairs of games"""
+    rng = random.Random(seed)
+    game_id = 0
+    for i in range(len(configs)):
+        for j in range(i + 1, len(configs)):
+            for game in range(games_per_pair):
+                if game % 2 == 0:
+                    opening = random_opening(rng, opening_plies)
+                yield (game_id, configs[i].to_dict(), configs[j].to_dict(), game % 2 == 0, opening)
+                game_id += 1
+
+
+def run_games(tasks, workers: int = None, max_in_flight: int = None):
+    """Play games on a process pool, yielding records as they finish
+    Only max_in_flight games are submitted at a time, so memory stays flat for any number of games
+
+    Args:
+        tasks: iterable of play_game argument tuples
+        workers (int): number of processes, 1 plays in this process
+        max_in_flight (int): games submitted but not finished, defaults to 4 per worker
+    """
+    if workers == 1:
+        for task in tasks:
+            yield play_game(*task)
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = 4 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for task in tasks:
+            pending.add(pool.submit(play_game, *task))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in wait(pending).done:
+            yield future.result()
+
+
+def elo_ratings(scores: list, iterations: int = 100):
+    """Fit Elo-style ratings to game results (maximum likelihood, with one virtual draw against
+    an ELO_BASE player each so an unbeaten engine still gets a finite rating)
+
+    Args:
+        scores (list): (name_a, name_b, score of a: 1 win, 0.5 draw, 0 loss) per game
+
+    Returns:
+        dict: name -> rating
+    """
+    names = sorted({name for a, b, _ in scores for name in (a, b)})
+    ratings = {name: 0.0 for name in names}
+    for _ in range(iterations):
+        for name in names:
+            actual, expected, variance = 0.5, 0.0, 0.0
+            # the virtual draw against a 0-rated (ELO_BASE) player
+            expected_virtual = 1 / (1 + 10 ** (-ratings[name] / 400))
+            expected += expected_virtual
+            variance += expected_virtual * (1 - expected_virtual)
+            for a, b, score in scores:
+                if name == a:
+                    opponent, result = b, score
+                elif name == b:
+                    opponent, result = a, 1 - score
+                else:
+                    continue
+                probability = 1 / (1 + 10 ** ((ratings[opponent] - ratings[name]) / 400))
+                actual += result
+                expected += probability
+                variance += probability * (1 - probability)
+            ratings[name] += (actual - expected) / variance * 400 / math.log(10) if variance else 0.0
+    return {name: round(ELO_BASE + rating, 1) for name, rating in ratings.items()}
+
+
+def summarize(records: list):
+    """Win/ loss/ draw counts, score rate, average time and nodes per move, and Elo ratings per engine
+
+    Args:
+        records (list): game records from play_game (only result fields are needed)
+    """
+    table = {}
+    scores = []
+    for record in records:
+        score_a = {"a": 1.0, "b": 0.0, "draw": 0.5}[record["result"]]
+        scores.append((record["a"], record["b"], score_a))
+        for name, score in ((record["a"], score_a), (record["b"], 1 - score_a)):
+            row = table.setdefault(name, {"games": 0, "wins": 0, "losses": 0, "draws": 0,
+                                          "moves": 0, "time_ms": 0.0, "nodes": 0})
+            row["games"] += 1
+            row["wins"] += score == 1.0
+            row["losses"] += score == 0.0
+            row["draws"] += score == 0.5
+        for move in record.get("moves", ()):
+            row = table[move["player"]]
+            row["moves"] += 1
+            row["time_ms"] += move["time_ms"]
+            row["nodes"] += move["nodes"]
+
+    ratings = elo_ratings(scores)
+    summary = {}
+    for name, row in table.items():
+        summary[name] = {
+            "games": row["games"],
+            "wins": row["wins"],
+            "losses": row["losses"],
+            "draws": row["draws"],
+            "score_rate": (row["wins"] + 0.5 * row["draws"]) / row["games"],
+            "avg_time_ms": row["time_ms"] / row["moves"] if row["moves"] else 0.0,
+            "avg_nodes": row["nodes"] / row["moves"] if row["moves"] else 0.0,
+            "elo": ratings[name],
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play AI-vs-AI games between engine configurations")
+    parser.add_argument("--config", help="JSON file with a list of engine configurations")
+    parser.add_argument("--games", type=int, default=20, help="games per pair of configurations")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", default="-", help="JSONL file for game records, - for stdout")
+    parser.add_argument("--summary", help="also write the summary as JSON to this file")
+    parser.add_argument("--opening-plies", type=int, default=DEFAULT_OPENING_PLIES)
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random openings")
+    args = parser.parse_args()
+
+    if args.config:
+        with open(args.config) as file:
+            configs = [EngineConfig.from_dict(data) for data in json.load(file)]
+    else:
+        configs = DEFAULT_CONFIGS
+    if len({config.name for config in configs}) != len(configs) or len(configs) < 2:
+        parser.error("need at least 2 engine configurations with unique names")
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    results = []  # only the fields the summary needs, full records are streamed out
+    try:
+        tasks = schedule(configs, args.games, args.opening_plies, args.seed)
+        for record in run_games(tasks, args.workers):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            results.append({"a": record["a"], "b": record["b"], "result": record["result"],
+                            "moves": [{key: move[key] for key in ("player", "time_ms", "nodes")}
+                                      for move in record["moves"]]})
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    summary = summarize(results)
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    if args.summary:
+        with open(args.summary, "w") as file:
+            json.dump(summary, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
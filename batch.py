@@ -0,0 +1,240 @@
+"""
+NumPy batch evaluation: score many boards at once
+
+Boards are given as an (N, rows, cols) integer array, laid out like Board.board:
+row 0 is the top row, 0 is an AI disc, 1 a Human disc and EMPTY (-1) an empty cell.
+Every window of `connect` cells is gathered for all boards in one indexing operation (the window index array
+holds the flat cell indices of every window of the geometry, 69 windows of 4 cells on the classic board),
+its AI/ Human disc counts are turned into a window state (see evaluation.py), and the scores are looked up
+in the window score table, so the result is exactly engine.score_position of each board (the scores are
+whole numbers or +/- inf, which float64 adds exactly). The tables are built once per Geometry.
+
+batch_search is a minimax search that expands the tree down to the frontier, evaluates every
+frontier leaf in one evaluate_batch call and backs the scores up. It visits every node (no pruning),
+so it is meant for analysis and training data where all leaf scores are wanted; alpha_beta_pruning
+stays the faster way to pick one move.
+
+numpy is only needed by this module: the game and the engine run without it.
+
+Usage:
+    python3 batch.py --positions 50000   # check against score_position and time both
+    python3 batch.py --positions 5000 --rows 8 --cols 9 --connect 5
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from bitboard import BitBoard, ONGOING, WIN, DRAW, DEFAULT_GEOMETRY, get_geometry
+from board import Board
+from constants import AI_TURN, HUMAN_TURN, ROWS, COLS, CONNECT, HIGHEST_SCORE, LOWEST_SCORE
+from evaluation import evaluate_window_scores
+
+EMPTY = -1
+
+
+class BatchTables:
+    def __init__(self, geometry):
+        """NumPy lookup tables of one board geometry, use batch_tables() to share them
+
+        Args:
+            geometry (Geometry): board size and connect length
+        """
+        self.geometry = geometry
+        rows, cols = geometry.rows, geometry.cols
+        # window_index[window] = flat indices (row * cols + col) of the cells of each window
+        self.window_index = np.array([[row * cols + col for row, col in window] for window in geometry.windows],
+                                     dtype=np.intp)
+        self.window_scores = np.array(evaluate_window_scores(geometry.connect), dtype=np.float64)
+        # cell_bits[row, col] = bit index of the cell on a BitBoard; positions wider than 63 bits are shifted
+        # as Python ints (object arrays), slower but exact
+        self.bits_dtype = np.int64 if cols * geometry.column_height <= 63 else object
+        self.cell_bits = np.array([[geometry.cell_bit(row, col) for col in range(cols)] for row in range(rows)],
+                                  dtype=np.int64)
+
+
+_batch_tables = {}
+
+
+def batch_tables(geometry=DEFAULT_GEOMETRY):
+    """Shared BatchTables of a geometry, built on first use"""
+    tables = _batch_tables.get(geometry)
+    if tables is None:
+        tables = _batch_tables[geometry] = BatchTables(geometry)
+    return tables
+
+
+def to_array(bitboards, geometry=None):
+    """Convert positions to the (N, rows, cols) layout of evaluate_batch
+
+    Args:
+        bitboards: sequence of BitBoard, Board or (ai_bits, human_bits) pairs
+        geometry (Geometry): geometry of the positions, defaults to the one of the first BitBoard/ Board
+            (classic 6x7 for bare pairs)
+
+    Returns:
+        numpy.ndarray: int8 array of shape (N, rows, cols)
+
+    Raises:
+        ValueError: the positions are not all of the same geometry
+    """
+    pairs = []
+    for position in bitboards:
+        if isinstance(position, Board):
+            position = position.bitboard
+        if isinstance(position, BitBoard):
+            if geometry is None:
+                geometry = position.geometry
+            elif position.geometry is not geometry:
+                raise ValueError(f"positions of {position.geometry} and {geometry} cannot be mixed in one batch")
+            position = position.bits
+        pairs.append(position)
+    tables = batch_tables(geometry or DEFAULT_GEOMETRY)
+    bits = np.array(pairs, dtype=tables.bits_dtype).reshape(-1, 2)
+    ai = (bits[:, 0, None, None] >> tables.cell_bits) & 1
+    human = (bits[:, 1, None, None] >> tables.cell_bits) & 1
+    return np.where(ai == 1, AI_TURN, np.where(human == 1, HUMAN_TURN, EMPTY)).astype(np.int8)
+
+
+def evaluate_batch(boards, geometry=DEFAULT_GEOMETRY):
+    """Score every board with the heuristic evaluation, and tell which ones are over
+
+    Args:
+        boards: (N, rows, cols) integer array (or nested lists), 0 AI, 1 Human, EMPTY empty
+        geometry (Geometry): board size and connect length of the boards
+
+    Returns:
+        tuple: numpy arrays of length N
+            scores (float64): same as engine.score_position, from the AI's perspective
+            ai_wins (bool): the AI has `connect` in a row
+            human_wins (bool): the Human has `connect` in a row
+            terminal (bool): someone has won or the board is full
+
+    Raises:
+        ValueError: the boards do not have the shape of the geometry
+    """
+    boards = np.asarray(boards)
+    rows, cols = geometry.rows, geometry.cols
+    if boards.ndim != 3 or boards.shape[1:] != (rows, cols):
+        raise ValueError(f"boards of {geometry} must have shape (N, {rows}, {cols}), got {boards.shape}")
+
+    tables = batch_tables(geometry)
+    windows = boards.reshape(len(boards), rows * cols)[:, tables.window_index]  # (N, windows, connect)
+    states = ((windows == AI_TURN).sum(axis=2) * geometry.state_step[AI_TURN] +
+              (windows == HUMAN_TURN).sum(axis=2) * geometry.state_step[HUMAN_TURN])
+    scores = tables.window_scores[states].sum(axis=1)
+    ai_wins = (states == geometry.win_states[AI_TURN]).any(axis=1)
+    human_wins = (states == geometry.win_states[HUMAN_TURN]).any(axis=1)
+    full = (boards != EMPTY).all(axis=(1, 2))
+    return scores, ai_wins, human_wins, ai_wins | human_wins | full
+
+
+def _expand(bitboard: BitBoard, depth: int, player_turn: int, leaves: list):
+    """Build the search tree down to depth, collecting the frontier positions in leaves
+
+    Returns:
+        float (score of a finished game), int (index into leaves) or tuple (player_turn, [(column, child), ...])
+    """
+    status = bitboard.last_move_status()
+    if status == WIN:
+        return HIGHEST_SCORE if player_turn == HUMAN_TURN else LOWEST_SCORE
+    if status == DRAW:
+        return 0.0
+    if depth == 0:
+        leaves.append((bitboard.bits[0], bitboard.bits[1]))
+        return len(leaves) - 1
+
+    children = []
+    for column in bitboard.valid_columns():
+        bitboard.make_move(column, player_turn)
+        children.append((column, _expand(bitboard, depth - 1, 1 - player_turn, leaves)))
+        bitboard.unmake_move()
+    return player_turn, children
+
+
+def _backup(node, scores):
+    """Minimax the frontier scores back up the tree built by _expand
+
+    Returns:
+        tuple: (best_column, score)
+    """
+    if isinstance(node, float):
+        return None, node
+    if isinstance(node, int):
+        return None, scores[node]
+
+    player_turn, children = node
+    best_column, best_score = None, None
+    for column, child in children:
+        score = _backup(child, scores)[1]
+        # strictly better only, so ties go to the first column like alpha_beta_pruning
+        if best_score is None or (score > best_score if player_turn == AI_TURN else score < best_score):
+            best_column, best_score = column, score
+    return best_column, best_score
+
+
+def batch_search(board: Board, depth: int, player_turn: int):
+    """Minimax search to a fixed depth, evaluating the whole frontier in one batch
+
+    Args:
+        board (Board): board that is active, it is not modified
+        depth (int): depth of tree
+        player_turn (int): 0 if AI_TURN (Maximizer), 1 if HUMAN_TURN
+
+    Returns:
+        tuple: (best_column, score), the score is the one of alpha_beta_pruning without a transposition table or
+            move ordering; the column can differ on ties (the threat pre-pass searches forced moves only),
+            with engine.THREAT_PREPASS off it is the same column too
+    """
+    geometry = board.bitboard.geometry
+    leaves = []
+    tree = _expand(board.bitboard.copy(), depth, player_turn, leaves)
+    scores = evaluate_batch(to_array(leaves, geometry), geometry)[0].tolist() if leaves else []
+    return _backup(tree, scores)
+
+
+def random_positions(count: int, seed: int = 0, geometry=DEFAULT_GEOMETRY):
+    """Random positions of random length for testing, a game stops when it is over, so some positions are won"""
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(count):
+        bitboard = BitBoard(geometry=geometry)
+        turn = rng.choice([AI_TURN, HUMAN_TURN])
+        for _ in range(rng.randrange(geometry.size)):
+            bitboard.make_move(rng.choice(bitboard.valid_columns()), turn)
+            if bitboard.last_move_status() != ONGOING:
+                break
+            turn = 1 - turn
+        positions.append(bitboard)
+    return positions
+
+
+if __name__ == "__main__":
+    from engine import score_position
+
+    parser = argparse.ArgumentParser(description="Check evaluate_batch against score_position and time both")
+    parser.add_argument("--positions", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--cols", type=int, default=COLS)
+    parser.add_argument("--connect", type=int, default=CONNECT)
+    args = parser.parse_args()
+
+    geometry = get_geometry(args.rows, args.cols, args.connect)
+    positions = random_positions(args.positions, args.seed, geometry)
+    boards = to_array(positions, geometry)
+
+    start = time.perf_counter()
+    scores, ai_wins, human_wins, terminal = evaluate_batch(boards, geometry)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = [score_position(Board(position), AI_TURN) for position in positions]
+    scalar_time = time.perf_counter() - start
+
+    mismatches = sum(1 for score, reference in zip(scores.tolist(), expected)
+                     if not (score == reference or (score != score and reference != reference)))  # nan == nan
+    print(f"{args.positions} positions: {mismatches} mismatches")
+    print(f"evaluate_batch {batch_time * 1000:.1f} ms, score_position {scalar_time * 1000:.1f} ms "
+          f"({scalar_time / batch_time:.0f}x)")
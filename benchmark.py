@@ -0,0 +1,356 @@
+"""
+Search benchmark suite with regression gates
+
+Searches a fixed, versioned set of positions (benchmarks/positions.json: opening, midgame, tactical
+and near-endgame boards) to a fixed depth, each with fresh caches, and reports per position
+the nodes searched, nodes/sec, the time to reach each depth and the best move.
+
+The search has no randomness, so node counts and best moves are exactly repeatable; times are
+the fastest of --repeat runs. Results are written as JSON and compared against a stored baseline,
+and the run exits with status 1 when a regression exceeds the tolerances:
+    - nodes: more nodes than the baseline by more than --node-tolerance (relative)
+    - best move: a different best column than the baseline (unless --allow-move-change)
+    - time, only with --check-time: slower than the baseline by more than --time-tolerance (relative, per position
+      and in total nodes/sec), and by at least MIN_TIME_DIFF_MS for a single position
+Times depend on the machine (and its load) the baseline was recorded on, so they are only gated on request,
+e.g. on the machine that saved the baseline; nodes and best moves are the same everywhere.
+
+--scaling benchmarks other board sizes and connect lengths instead (no baseline): random positions of each
+geometry are searched to a fixed depth, and the search's time per node is compared with one full rescan
+of the board (score_position), to check that the cost of a node does not grow with the board area.
+
+--compare-threats runs the suite with the threat pre-pass off and on (threats.py) and reports the nodes it saves.
+
+Usage:
+    python3 benchmark.py                    # run and compare with benchmarks/baseline.json
+    python3 benchmark.py --save-baseline    # run and store the result as the new baseline
+    python3 benchmark.py --check-time       # also fail on slower times (same machine as the baseline)
+    python3 benchmark.py --scaling 6x7x4 8x9x5 12x14x6
+    python3 benchmark.py --compare-threats  # nodes/ time with and without the threat pre-pass
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+
+from bitboard import BitBoard, ONGOING, get_geometry
+from board import Board
+import engine
+from constants import THREAT_PREPASS
+from engine import SearchLimits, iterative_deepening, score_position
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+POSITIONS_PATH = os.path.join(BENCHMARK_DIR, "positions.json")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+DEFAULT_REPEAT = 3
+DEFAULT_NODE_TOLERANCE = 0.02
+DEFAULT_TIME_TOLERANCE = 0.25
+MIN_TIME_DIFF_MS = 2.0  # timer noise: smaller slowdowns never count, whatever the relative change
+DEFAULT_GEOMETRIES = ("6x7x4", "8x9x5", "12x14x6")
+SCALING_DEPTH = 6
+SCALING_POSITIONS = 4
+
+
+def load_positions(path: str = POSITIONS_PATH):
+    """
+    Returns:
+        dict: {"version": int, "positions": [{"id", "category", "moves", "depth"}, ...]}
+    """
+    with open(path) as file:
+        return json.load(file)
+
+
+def _score(score: float):
+    # JSON has no infinity, forced wins/ losses are written as "inf"/ "-inf"
+    return score if math.isfinite(score) else str(score)
+
+
+def search_position(moves: str, depth: int):
+    """Search one position with fresh caches
+
+    Returns:
+        dict: best_column, score, nodes, time_ms and per depth results (cumulative time_ms and nodes)
+    """
+    board = Board.from_moves(moves)
+    limits = SearchLimits()
+    depths = []
+    start = time.perf_counter()
+
+    def on_depth(completed_depth, column, score):
+        depths.append({"depth": completed_depth, "time_ms": (time.perf_counter() - start) * 1000,
+                       "nodes": limits.nodes, "best_column": column, "score": _score(score)})
+
+    column, score, _ = iterative_deepening(board, len(moves) % 2, max_depth=depth, table=TranspositionTable(),
+                                           ordering=MoveOrdering(), limits=limits, on_depth=on_depth)
+    return {"best_column": column, "score": _score(score), "nodes": limits.nodes,
+            "time_ms": (time.perf_counter() - start) * 1000, "depths": depths}
+
+
+def run_position(position: dict, repeat: int = DEFAULT_REPEAT):
+    """Benchmark one position, keeping the fastest of repeat runs
+
+    Returns:
+        dict: result of the position, see search_position, plus nps
+    """
+    runs = [search_position(position["moves"], position["depth"]) for _ in range(repeat)]
+    for run in runs[1:]:
+        if run["nodes"] != runs[0]["nodes"] or run["best_column"] != runs[0]["best_column"]:
+            raise RuntimeError(f"search of {position['id']} is not deterministic")
+
+    best = min(runs, key=lambda run: run["time_ms"])
+    for index, depth in enumerate(best["depths"]):
+        depth["time_ms"] = round(min(run["depths"][index]["time_ms"] for run in runs), 3)
+    best["time_ms"] = round(best["time_ms"], 3)
+    return {
+        "id": position["id"],
+        "category": position["category"],
+        "moves": position["moves"],
+        "depth": position["depth"],
+        **best,
+        "nps": round(best["nodes"] / best["time_ms"] * 1000) if best["time_ms"] else 0,
+    }
+
+
+def run_suite(suite: dict, repeat: int = DEFAULT_REPEAT, verbose: bool = True):
+    """Benchmark every position of a suite (see load_positions)
+
+    Returns:
+        dict: machine-readable results, the format of the baseline file
+    """
+    results = []
+    for position in suite["positions"]:
+        result = run_position(position, repeat)
+        results.append(result)
+        if verbose:
+            print(f"{result['id']:<24} depth {result['depth']:>2}  best {result['best_column']}  "
+                  f"nodes {result['nodes']:>9}  {result['time_ms']:>9.1f} ms  {result['nps']:>8} nodes/s")
+
+    nodes = sum(result["nodes"] for result in results)
+    time_ms = sum(result["time_ms"] for result in results)
+    return {
+        "version": suite["version"],
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "positions": results,
+        "total": {"nodes": nodes, "time_ms": round(time_ms, 3),
+                  "nps": round(nodes / time_ms * 1000) if time_ms else 0},
+    }
+
+
+def compare(results: dict, baseline: dict, node_tolerance: float = DEFAULT_NODE_TOLERANCE,
+            time_tolerance: float = DEFAULT_TIME_TOLERANCE, allow_move_change: bool = False,
+            check_time: bool = False):
+    """Compare results against a baseline
+
+    Args:
+        node_tolerance (float): allowed relative increase in nodes, e.g. 0.02 for 2%
+        time_tolerance (float): allowed relative increase in time/ decrease in nodes/sec
+        allow_move_change (bool): do not count a different best move as a regression
+        check_time (bool): also count slower times as regressions, only meaningful on the baseline's machine
+
+    Returns:
+        list: description of every regression, empty if there is none
+    """
+    if results["version"] != baseline["version"]:
+        raise ValueError(f"positions version {results['version']} does not match baseline version {baseline['version']}, "
+                         "save a new baseline")
+
+    regressions = []
+    baseline_positions = {position["id"]: position for position in baseline["positions"]}
+    for result in results["positions"]:
+        old = baseline_positions.get(result["id"])
+        if old is None:
+            continue
+        name = result["id"]
+        if result["nodes"] > old["nodes"] * (1 + node_tolerance):
+            regressions.append(f"{name}: nodes {old['nodes']} -> {result['nodes']}")
+        if check_time and \
+                result["time_ms"] > max(old["time_ms"] * (1 + time_tolerance), old["time_ms"] + MIN_TIME_DIFF_MS):
+            regressions.append(f"{name}: time {old['time_ms']:.1f} ms -> {result['time_ms']:.1f} ms")
+        if not allow_move_change and result["best_column"] != old["best_column"]:
+            regressions.append(f"{name}: best column {old['best_column']} -> {result['best_column']}")
+
+    old_nps, nps = baseline["total"]["nps"], results["total"]["nps"]
+    if check_time and nps < old_nps / (1 + time_tolerance):
+        regressions.append(f"total: {old_nps} -> {nps} nodes/s")
+    return regressions
+
+
+def run_threat_comparison(suite: dict, repeat: int = DEFAULT_REPEAT):
+    """Benchmark every position of a suite with and without the threat pre-pass (threats.py)
+
+    Returns:
+        list: per position {"id", "nodes_without", "nodes_with", "reduction", "time_ms_without", "time_ms_with",
+            "same_move"}, plus a "total" row
+    """
+    runs = {}
+    try:
+        for prepass in (False, True):
+            engine.THREAT_PREPASS = prepass
+            runs[prepass] = run_suite(suite, repeat, verbose=False)
+    finally:
+        engine.THREAT_PREPASS = THREAT_PREPASS
+
+    rows = []
+    for without, with_ in zip(runs[False]["positions"] + [runs[False]["total"]],
+                              runs[True]["positions"] + [runs[True]["total"]]):
+        rows.append({
+            "id": without.get("id", "total"),
+            "nodes_without": without["nodes"],
+            "nodes_with": with_["nodes"],
+            "reduction": round(1 - with_["nodes"] / without["nodes"], 4) if without["nodes"] else 0.0,
+            "time_ms_without": without["time_ms"],
+            "time_ms_with": with_["time_ms"],
+            "same_move": without.get("best_column") == with_.get("best_column"),
+        })
+    return rows
+
+
+def parse_geometry(text: str):
+    """Geometry of a "ROWSxCOLSxCONNECT" string, e.g. 8x9x5 for 8 rows, 9 columns and connect 5"""
+    try:
+        rows, cols, connect = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"geometry must look like 8x9x5 (rows x columns x connect), got {text!r}") from None
+    return get_geometry(rows, cols, connect)
+
+
+def scaling_positions(geometry, count: int, seed: int = 0):
+    """Random positions of a geometry that are not over, a few discs per column on average"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        bitboard = BitBoard(geometry=geometry)
+        for ply in range(rng.randrange(geometry.cols, 2 * geometry.cols)):
+            bitboard.make_move(rng.choice(bitboard.valid_columns()), ply % 2)
+            if bitboard.last_move_status() != ONGOING:
+                break
+        else:
+            positions.append(bitboard)
+    return positions
+
+
+def run_scaling(geometries, depth: int = SCALING_DEPTH, count: int = SCALING_POSITIONS, repeat: int = DEFAULT_REPEAT,
+                verbose: bool = True):
+    """Search random positions of every geometry to a fixed depth, with fresh caches
+
+    Returns:
+        list: per geometry: lines, nodes, time_ms (fastest of repeat runs), nps, us_per_node of the search
+            and rescan_us, the time of one full rescan of the board (score_position) for comparison
+    """
+    results = []
+    for geometry in geometries:
+        positions = scaling_positions(geometry, count)
+        nodes, times = 0, []
+        for _ in range(repeat):
+            nodes, start = 0, time.perf_counter()
+            for bitboard in positions:
+                limits = SearchLimits()
+                iterative_deepening(Board(bitboard.copy()), len(bitboard.moves) % 2, max_depth=depth,
+                                    table=TranspositionTable(), ordering=MoveOrdering(geometry=geometry), limits=limits)
+                nodes += limits.nodes
+            times.append((time.perf_counter() - start) * 1000)
+        time_ms = min(times)
+
+        start = time.perf_counter()
+        for bitboard in positions:
+            score_position(Board(bitboard), 0)
+        rescan_us = (time.perf_counter() - start) * 1e6 / len(positions)
+
+        result = {
+            "geometry": f"{geometry.rows}x{geometry.cols}x{geometry.connect}",
+            "lines": len(geometry.windows),
+            "depth": depth,
+            "nodes": nodes,
+            "time_ms": round(time_ms, 3),
+            "nps": round(nodes / time_ms * 1000) if time_ms else 0,
+            "us_per_node": round(time_ms * 1000 / nodes, 2) if nodes else 0.0,
+            "rescan_us": round(rescan_us, 2),
+        }
+        results.append(result)
+        if verbose:
+            print(f"{result['geometry']:<9} {result['lines']:>4} lines  nodes {nodes:>8}  {time_ms:>9.1f} ms  "
+                  f"{result['nps']:>7} nodes/s  {result['us_per_node']:>6.2f} us/node  "
+                  f"(full rescan {result['rescan_us']:.0f} us)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search on fixed positions and check for regressions")
+    parser.add_argument("--positions", default=POSITIONS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the results")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per position, the fastest counts")
+    parser.add_argument("--node-tolerance", type=float, default=DEFAULT_NODE_TOLERANCE)
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument("--check-time", action="store_true",
+                        help="also fail on slower times, only meaningful on the machine that saved the baseline")
+    parser.add_argument("--allow-move-change", action="store_true")
+    parser.add_argument("--scaling", nargs="*", metavar="RxCxN",
+                        help=f"benchmark board geometries instead (default: {' '.join(DEFAULT_GEOMETRIES)})")
+    parser.add_argument("--depth", type=int, default=SCALING_DEPTH, help="search depth of --scaling")
+    parser.add_argument("--compare-threats", action="store_true",
+                        help="report the nodes and time the threat pre-pass saves on every position instead")
+    args = parser.parse_args()
+
+    if args.compare_threats:
+        rows = run_threat_comparison(load_positions(args.positions), args.repeat)
+        print(f"{'position':<24} {'nodes without':>13} {'with':>9} {'saved':>7} {'ms without':>11} {'with':>9}")
+        for row in rows:
+            print(f"{row['id']:<24} {row['nodes_without']:>13} {row['nodes_with']:>9} {row['reduction']:>7.1%} "
+                  f"{row['time_ms_without']:>11.1f} {row['time_ms_with']:>9.1f}"
+                  f"{'' if row['same_move'] else '  (different best move)'}")
+        with open(args.output, "w") as file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "threat_prepass": rows}, file, indent=2)
+        return
+
+    if args.scaling is not None:
+        try:
+            geometries = [parse_geometry(text) for text in args.scaling or DEFAULT_GEOMETRIES]
+        except ValueError as error:
+            parser.error(str(error))
+        results = run_scaling(geometries, args.depth, repeat=args.repeat)
+        with open(args.output, "w") as file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "scaling": results}, file, indent=2)
+        return
+
+    results = run_suite(load_positions(args.positions), args.repeat)
+    print(f"total: {results['total']['nodes']} nodes, {results['total']['time_ms']:.1f} ms, "
+          f"{results['total']['nps']} nodes/s")
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --save-baseline to create one")
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.node_tolerance, args.time_tolerance, args.allow_move_change,
+                          args.check_time)
+    if regressions:
+        print("REGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("no regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+Bitboard position representation used by the search
+
+Layout (column-major, one spare sentinel bit on top of each column):
+
+    6 13 20 27 34 41 48   <- sentinel row, always empty
+    5 12 19 26 33 40 47   <- top row (row 0 on the UI board)
+    4 11 18 25 32 39 46
+    3 10 17 24 31 38 45
+    2  9 16 23 30 37 44
+    1  8 15 22 29 36 43
+    0  7 14 21 28 35 42   <- bottom row (row ROWS - 1 on the UI board)
+
+- bits[0] holds AI discs, bits[1] holds Human discs (indexed by turn value)
+- heights[col] is the bit index of the next free cell in that column
+- The sentinel row keeps shifted lines from wrapping into the next column
+- hash is a Zobrist hash of the discs, updated incrementally on every make/ unmake
+- window_states/ score keep the heuristic evaluation up to date on every make/ unmake (see evaluation.py)
+
+Other board sizes and connect lengths (e.g. 8x9 connect 5) use the same layout with rows + 1 bits per column:
+a Geometry holds the masks, Zobrist keys and line tables of one configuration, and every BitBoard points to
+its geometry, so the cost of a move depends on the lines through the cell played, not on the board area.
+"""
+
+from constants import ROWS, COLS, CONNECT
+from evaluation import line_windows, cell_windows, win_states, window_gains
+
+
+# Game status returned by BitBoard.last_move_status
+ONGOING = 0
+WIN = 1  # the player who made the last move has won
+DRAW = 2
+
+
+def _splitmix64(seed: int):
+    """Deterministic 64-bit pseudo random numbers (SplitMix64), cheaper to import than the random module"""
+    mask = (1 << 64) - 1
+    while True:
+        seed = (seed + 0x9E3779B97F4A7C15) & mask
+        z = seed
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask
+        yield z ^ (z >> 31)
+
+
+class Geometry:
+    def __init__(self, rows: int = ROWS, cols: int = COLS, connect: int = CONNECT):
+        """Board size and connect length, with every table the bitboard needs built once up front
+        Use get_geometry() instead of creating one, so each configuration is built only once and shared
+
+        Args:
+            rows (int): rows of the board
+            cols (int): columns of the board
+            connect (int): discs in a row needed to win
+        """
+        if rows < 1 or cols < 1 or connect < 2 or connect > max(rows, cols):
+            raise ValueError(f"no line of {connect} fits on a {rows}x{cols} board")
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.size = rows * cols
+        self.column_height = height = rows + 1  # bits per column, including the sentinel bit
+
+        self.bottom_mask = sum(1 << (col * height) for col in range(cols))
+        self.board_mask = self.bottom_mask * ((1 << rows) - 1)  # every playable cell
+        self.top_masks = [1 << (col * height + rows - 1) for col in range(cols)]
+        self.column_mask = (1 << height) - 1  # every bit of column 0
+
+        # Zobrist keys: one random 64-bit number per (player, cell), XORed in/ out as discs come and go
+        # Seeded so hashes are the same on every run (and across worker processes)
+        zobrist_random = _splitmix64(334)
+        self.zobrist_keys = [[next(zobrist_random) for _ in range(cols * height)] for _ in range(2)]
+        self.zobrist_side = next(zobrist_random)  # XOR in when Human (1) is the side to move
+        # mirror_cells[bit] = the same cell in the left-right mirror image, to keep the mirror's hash up to date
+        self.mirror_cells = [(cols - 1 - bit // height) * height + bit % height for bit in range(cols * height)]
+
+        # Every line of `connect` cells, generated once: these tables drive the win check and the evaluation
+        # bit_windows[bit] = indices of the windows passing through that cell (at most 4 * connect)
+        self.windows = line_windows(rows, cols, connect)
+        cells = cell_windows(self.windows, rows, cols)
+        self.bit_windows = [()] * (cols * height)
+        for row in range(rows):
+            for col in range(cols):
+                self.bit_windows[self.cell_bit(row, col)] = cells[row][col]
+        self.state_step = (1, connect + 1)  # see evaluation.window_state
+        self.win_states = win_states(connect)
+        self.window_gains = window_gains(length=connect)
+        self.center_order = sorted(range(cols), key=lambda col: abs(col - cols // 2))
+
+    def __repr__(self):
+        return f"Geometry({self.rows}, {self.cols}, {self.connect})"
+
+    def __reduce__(self):
+        # pickled (e.g. to worker processes) as its configuration, unpickled as the shared instance
+        return get_geometry, (self.rows, self.cols, self.connect)
+
+    def cell_bit(self, row: int, col: int):
+        """Bit index of a UI (row, col) coordinate, row 0 is the top row"""
+        return col * self.column_height + (self.rows - 1 - row)
+
+    def is_win(self, bits: int):
+        """Check if a single player's bitboard contains `connect` in a row"""
+        steps = self.connect - 1
+        for shift in (1, self.column_height, self.column_height + 1, self.column_height - 1):
+            line = bits
+            # after k steps every set bit starts a run of k + 1
+            for _ in range(steps):
+                line &= line >> shift
+            if line:
+                return True
+        return False
+
+    def winning_cells(self, position: int, mask: int):
+        """Empty cells where a player would connect, the generic form of solver.winning_cells
+
+        Args:
+            position (int): bitboard of the player
+            mask (int): bitboard of every occupied cell
+
+        Returns:
+            int: bitboard of the winning cells (playable now or later)
+        """
+        if self.connect == 4:
+            # unrolled for the classic game, it runs once per searched node (threats.py)
+            cells = (position << 1) & (position << 2) & (position << 3)
+            for shift in (self.column_height, self.column_height - 1, self.column_height + 1):
+                pair = (position << shift) & (position << 2 * shift)
+                cells |= pair & (position << 3 * shift)
+                cells |= pair & (position >> shift)
+                pair = (position >> shift) & (position >> 2 * shift)
+                cells |= pair & (position << shift)
+                cells |= pair & (position >> 3 * shift)
+            return cells & (self.board_mask ^ mask)
+
+        steps = self.connect - 1
+        # vertical: steps discs right below
+        cells = position << 1
+        for step in range(2, steps + 1):
+            cells &= position << step
+        # horizontal and both diagonals: a run of `before` discs on one side and steps - before on the other
+        for shift in (self.column_height, self.column_height - 1, self.column_height + 1):
+            below, above = [-1], [-1]  # below[n] = cells with n own discs in a row right before them
+            for step in range(1, steps + 1):
+                below.append(below[-1] & (position << step * shift))
+                above.append(above[-1] & (position >> step * shift))
+            for before in range(steps + 1):
+                cells |= below[before] & above[steps - before]
+        return cells & (self.board_mask ^ mask)
+
+    def drop_mirrored(self, columns: list):
+        """Columns without those whose mirror column comes earlier in the list, for a position that is its own
+        mirror image: a column and its mirror column are worth the same there, so one of the two is enough"""
+        last = self.cols - 1
+        return [col for index, col in enumerate(columns) if last - col not in columns[:index]]
+
+    def mirror_bits(self, bits: int):
+        """Mirror a bitboard left-right (column col moves to column cols - 1 - col)"""
+        mirrored = 0
+        height, mask, last = self.column_height, self.column_mask, self.cols - 1
+        for col in range(self.cols):
+            mirrored |= ((bits >> (col * height)) & mask) << ((last - col) * height)
+        return mirrored
+
+
+_geometries = {}  # (rows, cols, connect) -> Geometry, a plain dict keeps functools out of the headless import
+
+
+def get_geometry(rows: int = ROWS, cols: int = COLS, connect: int = CONNECT):
+    """Shared Geometry of a configuration, built on first use"""
+    shape = (rows, cols, connect)
+    if shape not in _geometries:
+        _geometries[shape] = Geometry(rows, cols, connect)
+    return _geometries[shape]
+
+
+# The classic 6x7 connect 4, used when no geometry is given; its tables are also exported as module constants
+DEFAULT_GEOMETRY = get_geometry()
+
+COLUMN_HEIGHT = DEFAULT_GEOMETRY.column_height
+BOTTOM_MASK = DEFAULT_GEOMETRY.bottom_mask
+BOARD_MASK = DEFAULT_GEOMETRY.board_mask
+TOP_MASKS = DEFAULT_GEOMETRY.top_masks
+COLUMN_MASK = DEFAULT_GEOMETRY.column_mask
+ZOBRIST_KEYS = DEFAULT_GEOMETRY.zobrist_keys
+ZOBRIST_SIDE = DEFAULT_GEOMETRY.zobrist_side
+BIT_WINDOWS = DEFAULT_GEOMETRY.bit_windows
+
+
+def is_win(bits: int):
+    """Check if a single player's bitboard contains 4 in a row (classic board, see Geometry.is_win for others)
+
+    Args:
+        bits (int): bitboard of one player
+
+    Returns:
+        bool: True if there is a horizontal, vertical or diagonal line of 4
+    """
+    # vertical, horizontal, positively sloped diagonal, negatively sloped diagonal
+    for shift in (1, COLUMN_HEIGHT, COLUMN_HEIGHT + 1, COLUMN_HEIGHT - 1):
+        pairs = bits & (bits >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+
+def mirror_bits(bits: int):
+    """Mirror a bitboard left-right (column col moves to column COLS - 1 - col)"""
+    return DEFAULT_GEOMETRY.mirror_bits(bits)
+
+
+def cell_bit(row: int, col: int):
+    """Convert a UI (row, col) coordinate to its bit index
+
+    Args:
+        row (int): row on the UI board, 0 is the top row
+        col (int): column on the board
+
+    Returns:
+        int: bit index of the cell
+    """
+    return col * COLUMN_HEIGHT + (ROWS - 1 - row)
+
+
+class BitBoard:
+    __slots__ = ("bits", "heights", "moves", "hash", "mirror_hash", "window_states", "score", "window_gains",
+                 "geometry")
+
+    def __init__(self, window_gains: tuple = None, geometry: Geometry = None):
+        """
+        Args:
+            window_gains (tuple): evaluation gain tables (evaluation.window_gains), to evaluate with custom weights,
+                defaults to the gains of evaluate_window
+            geometry (Geometry): board size and connect length (get_geometry), defaults to the classic 6x7 connect 4
+        """
+        if geometry is None:
+            geometry = DEFAULT_GEOMETRY
+        self.geometry = geometry
+        self.window_gains = window_gains if window_gains is not None else geometry.window_gains
+        self.bits = [0, 0]
+        self.heights = [col * geometry.column_height for col in range(geometry.cols)]
+        self.moves = []  # columns played so far, needed to unmake moves
+        self.hash = 0
+        self.mirror_hash = 0  # hash of the left-right mirror image, kept up to date move by move like hash
+        # AI and Human disc counts of every window, see evaluation.window_state
+        self.window_states = [0] * len(geometry.windows)
+        # Heuristic score from the AI's perspective, equal to score_position for any position nobody has won
+        self.score = 0
+
+    @property
+    def mask(self):
+        """Bitboard of every occupied cell"""
+        return self.bits[0] | self.bits[1]
+
+    def can_play(self, col: int):
+        """Check if a column has space for a new disc
+
+        Args:
+            col (int): column to check
+
+        Returns:
+            bool: True if column not full, False otherwise
+        """
+        return not (self.bits[0] | self.bits[1]) & self.geometry.top_masks[col]
+
+    def valid_moves_mask(self):
+        """Bitboard with one bit set on the next free cell of every non-full column"""
+        geometry = self.geometry
+        return ((self.bits[0] | self.bits[1]) + geometry.bottom_mask) & geometry.board_mask
+
+    def valid_columns(self):
+        """List the columns that are not full, left to right"""
+        mask = self.bits[0] | self.bits[1]
+        return [col for col, top in enumerate(self.geometry.top_masks) if not mask & top]
+
+    def position_key(self, turn: int):
+        """Hash of the position together with the side to move, used as transposition table key
+
+        Args:
+            turn (int): player to move, 0 for AI, 1 for Human
+        """
+        return self.hash ^ self.geometry.zobrist_side if turn else self.hash
+
+    def canonical_key(self, turn: int):
+        """Key shared by the position and its left-right mirror image, used by every cache of positions
+        Columns stored under the key are those of the canonical side: mirror them (cols - 1 - col) when mirrored
+
+        Args:
+            turn (int): player to move, 0 for AI, 1 for Human
+
+        Returns:
+            tuple: (key, mirrored), mirrored is True if the key is the one of the mirror image
+        """
+        if self.mirror_hash < self.hash:
+            return (self.mirror_hash ^ self.geometry.zobrist_side if turn else self.mirror_hash), True
+        return (self.hash ^ self.geometry.zobrist_side if turn else self.hash), False
+
+    def is_symmetric(self):
+        """Check if the position is its own mirror image, then a column and its mirror column are worth the same"""
+        return self.hash == self.mirror_hash
+
+    def is_full(self):
+        return len(self.moves) == self.geometry.size
+
+    def make_move(self, col: int, turn: int):
+        """Drop a disc for a player into a column, in place
+
+        Args:
+            col (int): column to play, must not be full
+            turn (int): 0 for AI, 1 for Human
+        """
+        geometry = self.geometry
+        bit = self.heights[col]
+        self.bits[turn] |= 1 << bit
+        keys = geometry.zobrist_keys[turn]
+        self.hash ^= keys[bit]
+        self.mirror_hash ^= keys[geometry.mirror_cells[bit]]
+        self.heights[col] = bit + 1
+        self.moves.append(col)
+
+        states = self.window_states
+        gains = self.window_gains[turn]
+        step = geometry.state_step[turn]
+        score = self.score
+        for window in geometry.bit_windows[bit]:
+            state = states[window]
+            score += gains[state]
+            states[window] = state + step
+        self.score = score
+
+    def unmake_move(self):
+        """Take back the last move played, in place
+
+        Returns:
+            int: column the disc was removed from
+        """
+        geometry = self.geometry
+        col = self.moves.pop()
+        bit = self.heights[col] - 1
+        self.heights[col] = bit
+        turn = 0 if self.bits[0] >> bit & 1 else 1
+        self.bits[turn] ^= 1 << bit
+        keys = geometry.zobrist_keys[turn]
+        self.hash ^= keys[bit]
+        self.mirror_hash ^= keys[geometry.mirror_cells[bit]]
+
+        states = self.window_states
+        gains = self.window_gains[turn]
+        step = geometry.state_step[turn]
+        score = self.score
+        for window in geometry.bit_windows[bit]:
+            state = states[window] - step
+            score -= gains[state]
+            states[window] = state
+        self.score = score
+        return col
+
+    def last_move_status(self):
+        """Check if the game is over, only looking at the lines through the last disc played
+        (a position can only become won by the move just played), so it costs at most 13 lookups
+        (4 * connect - 3 on other geometries)
+
+        Returns:
+            int: WIN if the last move connected 4, DRAW if it filled the board, ONGOING otherwise
+        """
+        if not self.moves:
+            return ONGOING
+        geometry = self.geometry
+        bit = self.heights[self.moves[-1]] - 1
+        win_state = geometry.win_states[0 if self.bits[0] >> bit & 1 else 1]
+        states = self.window_states
+        for window in geometry.bit_windows[bit]:
+            if states[window] == win_state:
+                return WIN
+        if len(self.moves) == geometry.size:
+            return DRAW
+        return ONGOING
+
+    def get_cell(self, row: int, col: int):
+        """Get the value stored at a UI (row, col) coordinate
+
+        Returns:
+            int or None: 0 (AI), 1 (Human) or None (empty)
+        """
+        bit = 1 << self.geometry.cell_bit(row, col)
+        if self.bits[0] & bit:
+            return 0
+        if self.bits[1] & bit:
+            return 1
+        return None
+
+    def next_open_row(self, col: int):
+        """Get the UI row the next disc in a column would land on, None if full"""
+        rows = self.geometry.rows
+        height = self.heights[col] - col * self.geometry.column_height
+        if height >= rows:
+            return None
+        return rows - 1 - height
+
+    def copy(self):
+        new_bitboard = BitBoard.__new__(BitBoard)
+        new_bitboard.geometry = self.geometry
+        new_bitboard.window_gains = self.window_gains
+        new_bitboard.bits = self.bits[:]
+        new_bitboard.heights = self.heights[:]
+        new_bitboard.moves = self.moves[:]
+        new_bitboard.hash = self.hash
+        new_bitboard.mirror_hash = self.mirror_hash
+        new_bitboard.window_states = self.window_states[:]
+        new_bitboard.score = self.score
+        return new_bitboard
@@ -1,21 +1,60 @@
-from constants import ROWS, COLS, DISC_RADIUS, CELL_SIZE, RED, WHITE, LIGHT_GRAY, NAVY_BLUE, RED 
-from disc import Disc
-import pygame
+from constants import AI_TURN
+from bitboard import BitBoard, Geometry, ONGOING
 
 class Board:
-    def __init__(self):
-        # Store board as 0s (AI), 1s (Human), or None (empty)
-        self.board = [[None] * COLS for _ in range (ROWS)]
+    def __init__(self, bitboard: BitBoard = None):
+        # Thin adapter over a BitBoard: the search plays moves on self.bitboard in place,
+        # the UI keeps using the (row, col) API below
+        self.bitboard = bitboard if bitboard is not None else BitBoard()
+    
+    @classmethod
+    def from_moves(cls, moves: str, first_turn: int = AI_TURN, geometry: Geometry = None):
+        """Build a board by replaying a move string, e.g. "4453": one digit per move, columns numbered from 1
+        
+        Args:
+            moves (str): columns played, players alternate starting with first_turn
+            first_turn (int): player of the first move, 0 for AI, 1 for Human
+            geometry (Geometry): board size and connect length, defaults to the classic board (up to 9 columns)
+        
+        Returns:
+            Board: board after the moves, the player to move is first_turn if len(moves) is even
+        """
+        board = cls(BitBoard(geometry=geometry))
+        bitboard = board.bitboard
+        cols = bitboard.geometry.cols
+        turn = first_turn
+        for index, char in enumerate(moves):
+            col = ord(char) - ord("1")
+            if not 0 <= col < min(cols, 9):
+                raise ValueError(f"invalid column {char!r} at move {index + 1} of {moves!r}")
+            if bitboard.moves and bitboard.last_move_status() != ONGOING:
+                raise ValueError(f"move {index + 1} of {moves!r} is played after the game is over")
+            if not bitboard.can_play(col):
+                raise ValueError(f"column {char} is full at move {index + 1} of {moves!r}")
+            bitboard.make_move(col, turn)
+            turn = 1 - turn
+        return board
+    
+    @property
+    def board(self):
+        """2D view of the board as 0s (AI), 1s (Human), or None (empty), row 0 is the top row
+        Built on demand from the bitboard, so only use it for rendering/ debugging
+        """
+        get_cell = self.bitboard.get_cell
+        geometry = self.bitboard.geometry
+        return [[get_cell(row, col) for col in range(geometry.cols)] for row in range(geometry.rows)]
     
     def place_value(self, row: int, col: int, turn: int):
         """Place a value (0 or 1) on the board
         
         Args:
-            row (int): row to place value
+            row (int): row to place value, must be the next open row of the column
             col (int): column to place value
             turn (int): value 0 for AI, 1 for Human
         """
-        self.board[row][col] = turn
+        if row != self.bitboard.next_open_row(col):
+            raise ValueError(f"row {row} is not the next open row of column {col}")
+        self.bitboard.make_move(col, turn)
     
     def is_valid_column(self, col: int):
         """Check if a column has space for a new piece
@@ -26,7 +65,7 @@ class Board:
         Returns:
             bool: True if column not full, False otherwise
         """
-        return self.board[0][col] is None
+        return self.bitboard.can_play(col)
     
     def get_next_open_row(self, col: int):
         """Get the next available row in a column
@@ -37,10 +76,7 @@ class Board:
         Returns:
             int or None: row index if available, None if column is full
         """
-        for row in range(ROWS - 1, -1, -1):
-            if self.board[row][col] is None:
-                return row
-        return None
+        return self.bitboard.next_open_row(col)
     
         
     def draw_board(self, screen):
@@ -49,28 +85,9 @@ class Board:
         Args:
             screen: pygame screen to draw on
         """
-        for row in range(ROWS):
-            for col in range(COLS):
-                # Draw rectangle for each cell
-                pygame.draw.rect(
-                    surface=screen,
-                    color=LIGHT_GRAY,
-                    rect=(col * CELL_SIZE, row * CELL_SIZE + CELL_SIZE, CELL_SIZE, CELL_SIZE),
-                )
-                
-                # Calculate center of the cell
-                center_x = int(col * CELL_SIZE + CELL_SIZE // 2)
-                center_y = int(row * CELL_SIZE + CELL_SIZE + CELL_SIZE // 2) # one more CELL_SIZE here since we have an extra space to display title near Ox axis
-                
-                if self.board[row][col] == 0: # AI 
-                    Disc.draw(color=NAVY_BLUE, center_x=center_x, center_y=center_y)
-                    
-                elif self.board[row][col] == 1: # HUMAN
-                    Disc.draw(color=RED, center_x=center_x, center_y=center_y)
-                    
-                else: # Empty cell 
-                    Disc.draw(color=WHITE, center_x=center_x, center_y=center_y)
-        pygame.display.update()  
+        # rendering lives in the UI layer, imported here so the engine never needs pygame
+        from ui import draw_board
+        draw_board(self, screen)
         
                     
     def copy(self):
@@ -79,7 +96,7 @@ class Board:
         
         Returns: A deep copy of the current board (Board type)
         """
-        new_board = Board()
-        new_board.board = [row[:] for row in self.board]
+        new_board = Board.__new__(Board)
+        new_board.bitboard = self.bitboard.copy()
         
         return new_board
\ No newline at end of file
@@ -0,0 +1,252 @@
+"""
+Opening book: precomputed AI moves for the first plies, in a compact memory-mapped binary file
+
+The first moves of every game start from the same few positions, so instead of searching them each game
+they are searched once offline (with a deep search) and looked up at runtime.
+
+Keys: a position is identified exactly by `AI discs + occupied cells + BOTTOM_MASK` (49 bits, no collisions),
+always with the AI to move. A position and its left-right mirror image have mirrored best moves, so only the
+smaller key of the two is stored (the canonical one) and a lookup of the mirrored side mirrors the column back.
+
+File format (little-endian):
+    header: magic b"C4OB", format version (uint16), max ply (uint16), entry count (uint32)
+    entries sorted by key: key (uint64), best column (int8), search depth (uint8), score (int32)
+Scores are from the AI's perspective (like the search), forced wins/ losses are stored as +/- INF_SCORE.
+
+At runtime the file is opened with mmap and binary searched, so nothing is loaded up front, a lookup
+takes a few microseconds, and worker processes opening the same file share its pages read-only.
+
+Usage:
+    python3 book.py --ply 6 --depth 12 --workers 8   # generate opening_book.bin
+    python3 book.py --probe 4453                     # look up a position given as a move string
+"""
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import BitBoard, BOTTOM_MASK, DEFAULT_GEOMETRY, ONGOING, mirror_bits
+from board import Board
+from constants import AI_TURN, HUMAN_TURN, COLS, DEPTH, HIGHEST_SCORE, LOWEST_SCORE, OPENING_BOOK_PATH
+from engine import iterative_deepening
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+MAGIC = b"C4OB"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+ENTRY = struct.Struct("<QbBi")
+INF_SCORE = 2 ** 31 - 1
+DEFAULT_BOOK_PLY = 4
+
+
+def book_key(bitboard: BitBoard):
+    """Canonical key of a position with the AI to move
+
+    Returns:
+        tuple: (key, mirrored), mirrored is True if the key is the one of the mirror image
+    """
+    mask = bitboard.bits[0] | bitboard.bits[1]
+    key = bitboard.bits[AI_TURN] + mask + BOTTOM_MASK
+    mirrored_key = mirror_bits(bitboard.bits[AI_TURN]) + mirror_bits(mask) + BOTTOM_MASK
+    if mirrored_key < key:
+        return mirrored_key, True
+    return key, False
+
+
+def _encode_score(score: float):
+    if score == HIGHEST_SCORE:
+        return INF_SCORE
+    if score == LOWEST_SCORE:
+        return -INF_SCORE
+    return int(score)
+
+
+def _decode_score(score: int):
+    if score == INF_SCORE:
+        return HIGHEST_SCORE
+    if score == -INF_SCORE:
+        return LOWEST_SCORE
+    return score
+
+
+class OpeningBook:
+    def __init__(self, path: str = OPENING_BOOK_PATH):
+        """Open a book file read-only through mmap
+
+        Args:
+            path (str): book file written by write_book
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.max_ply, self.count = HEADER.unpack_from(self.data, 0)
+        except (ValueError, struct.error) as error:  # empty or truncated file
+            self.file.close()
+            raise ValueError(f"{path} is not an opening book") from error
+        if magic != MAGIC or version != FORMAT_VERSION or len(self.data) != HEADER.size + self.count * ENTRY.size:
+            self.close()
+            raise ValueError(f"{path} is not an opening book (version {FORMAT_VERSION})")
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def _find(self, key: int):
+        """Binary search the sorted entries for a key, return the unpacked entry or None"""
+        data, unpack_from = self.data, ENTRY.unpack_from
+        low, high = 0, self.count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            entry = unpack_from(data, HEADER.size + middle * ENTRY.size)
+            if entry[0] < key:
+                low = middle + 1
+            elif entry[0] > key:
+                high = middle - 1
+            else:
+                return entry
+        return None
+
+    def probe(self, bitboard: BitBoard, turn: int = AI_TURN):
+        """Look up the best move of a position
+
+        Args:
+            bitboard (BitBoard): position to look up
+            turn (int): player to move, the book only holds positions with the AI to move
+
+        Returns:
+            tuple or None: (best_column, score, depth) like iterative_deepening, None if the position is not in the book
+                (the book only holds classic 6x7 positions)
+        """
+        if turn != AI_TURN or len(bitboard.moves) > self.max_ply or bitboard.geometry is not DEFAULT_GEOMETRY:
+            return None
+        key, mirrored = book_key(bitboard)
+        entry = self._find(key)
+        if entry is None:
+            return None
+        _, column, depth, score = entry
+        return (COLS - 1 - column if mirrored else column), _decode_score(score), depth
+
+
+def write_book(path: str, entries: dict, max_ply: int):
+    """Write a book file
+
+    Args:
+        path (str): file to write
+        entries (dict): canonical key -> (best_column of the canonical position, depth, score)
+        max_ply (int): deepest ply in the book, lookups of later positions skip the search
+    """
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, max_ply, len(entries)))
+        for key in sorted(entries):
+            column, depth, score = entries[key]
+            file.write(ENTRY.pack(key, column, depth, _encode_score(score)))
+
+
+def book_positions(max_ply: int):
+    """Every position with the AI to move that is reachable within max_ply moves and not over,
+    one per canonical key (the AI moves first at even plies, the human at odd plies)
+
+    Returns:
+        dict: canonical key -> move string (columns from 1) and first player reaching the canonical position
+    """
+    positions = {}
+
+    def visit(bitboard, turn, first_turn, ply, moves):
+        if turn == AI_TURN:
+            key, mirrored = book_key(bitboard)
+            if key not in positions:
+                if mirrored:
+                    moves = "".join(str(COLS - int(char) + 1) for char in moves)
+                positions[key] = (moves, first_turn)
+        if ply == max_ply:
+            return
+        for col in bitboard.valid_columns():
+            bitboard.make_move(col, turn)
+            if bitboard.last_move_status() == ONGOING:
+                visit(bitboard, 1 - turn, first_turn, ply + 1, moves + str(col + 1))
+            bitboard.unmake_move()
+
+    for first_turn in (AI_TURN, HUMAN_TURN):
+        visit(BitBoard(), first_turn, first_turn, 0, "")
+    return positions
+
+
+# Per worker process caches, set up by _init_worker
+_table = None
+_ordering = None
+
+
+def _init_worker():
+    global _table, _ordering
+    _table = TranspositionTable()
+    _ordering = MoveOrdering()
+
+
+def _search_position(key: int, moves: str, first_turn: int, depth: int):
+    board = Board.from_moves(moves, first_turn)
+    column, score, completed_depth = iterative_deepening(board, AI_TURN, max_depth=depth,
+                                                         table=_table, ordering=_ordering)
+    return key, column, completed_depth, score
+
+
+def generate_book(path: str = OPENING_BOOK_PATH, max_ply: int = DEFAULT_BOOK_PLY, depth: int = 12,
+                  workers: int = None, verbose: bool = True):
+    """Search every book position to depth on a process pool and write the book file
+
+    Returns:
+        int: number of entries written
+    """
+    positions = book_positions(max_ply)
+    if verbose:
+        print(f"searching {len(positions)} positions up to ply {max_ply} at depth {depth}")
+    entries = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(_search_position, key, moves, first_turn, depth)
+                   for key, (moves, first_turn) in positions.items()]
+        for index, future in enumerate(futures):
+            key, column, completed_depth, score = future.result()
+            entries[key] = (column, completed_depth, score)
+            if verbose and (index + 1) % 100 == 0:
+                print(f"{index + 1}/{len(futures)} positions, {time.perf_counter() - start:.0f} s")
+    write_book(path, entries, max_ply)
+    if verbose:
+        print(f"wrote {len(entries)} entries ({os.path.getsize(path)} bytes) to {path}")
+    return len(entries)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate or query the opening book")
+    parser.add_argument("--output", default=OPENING_BOOK_PATH, help="book file to write or read")
+    parser.add_argument("--ply", type=int, default=DEFAULT_BOOK_PLY, help="book positions up to this many moves")
+    parser.add_argument("--depth", type=int, default=max(DEPTH, 12), help="search depth of every book position")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--probe", metavar="MOVES", help="look up the position after these moves (columns from 1), "
+                                                         "the human moves first if the count is odd")
+    args = parser.parse_args()
+
+    if args.probe is not None:
+        with OpeningBook(args.output) as book:
+            board = Board.from_moves(args.probe, AI_TURN if len(args.probe) % 2 == 0 else HUMAN_TURN)
+            start = time.perf_counter()
+            entry = book.probe(board.bitboard)
+            elapsed_us = (time.perf_counter() - start) * 1e6
+            print(f"{entry} ({elapsed_us:.1f} us)" if entry else "not in the book")
+    else:
+        generate_book(args.output, args.ply, args.depth, args.workers)
@@ -1,4 +1,4 @@
-import pygame
+# No pygame here: the engine imports these constants, the window is created by ui.get_screen()
 
 # RGB colors
 WHITE = (255, 255, 255) # unfilled cell on board + background
@@ -12,12 +12,12 @@ TRANSPARENT = (0, 0, 0, 0)
 # Screen
 SCREEN_WIDTH = 700
 SCREEN_HEIGHT = 700
-SCREEN = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Connect4 - Artificial Intelligence - Ngoc Linh Le")
+WINDOW_CAPTION = "Connect4 - Artificial Intelligence - Ngoc Linh Le"
 
 # Board settings (square board)
 ROWS = 6
 COLS = 7
+CONNECT = 4  # discs in a row needed to win
 CELL_SIZE = 100
 WIDTH = COLS * CELL_SIZE
 HEIGHT = (ROWS + 1) * CELL_SIZE  # Extra row for top spacing/text
@@ -31,7 +31,20 @@ AI_TURN = 0
 HUMAN_TURN = 1
 HIGHEST_SCORE = float("inf")
 LOWEST_SCORE = float("-inf")
-DEPTH = 4
+DEPTH = 4  # fixed search depth, used when the search is not time-budgeted
+TIME_BUDGET_MS = 1000  # AI think time per move, the search goes as deep as this budget allows
+AI_WORKERS = 1  # processes searching each AI move, more than 1 splits the root columns across cores (parallel.py)
+PONDER = True  # search the likely replies in the background while the human is choosing a move
+SHOW_HINTS = False  # show the AI's score of the hovered column while the human is choosing (analysis.py)
+HINT_TIME_MS = 300  # think time of the hint analysis, it runs before pondering
+FPS = 60  # frame rate cap of the game loop, it keeps running while the AI is thinking
+SOLVER_EMPTY_CELLS = 16  # with this many empty cells or fewer the AI solves the game exactly (solver.py)
+THREAT_PREPASS = True  # settle immediate wins/ forced blocks and skip poisoned columns before searching a node (threats.py)
+OPENING_BOOK_PATH = "opening_book.bin"  # precomputed opening moves (book.py), the game searches normally without it
+TELEMETRY_PATH = None  # set to a .jsonl or .csv file to log search statistics of every AI move (instrumentation.py)
+GAME_RECORDS_PATH = None  # set to a file to append every finished game as a move-string record (records.py)
+PROFILE_SEARCH = False  # print a cProfile report of every AI move
+SEED = None  # seed for who moves first, set an int to replay the same games (the search itself has no randomness)
 # Alpha and Beta initial values for alpha-beta pruning
 # Alpha should start at -infinity (worst for maximizer)
 # Beta should start at +infinity (worst for minimizer)
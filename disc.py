@@ -1,11 +1,12 @@
-
-import pygame
-from constants import DISC_RADIUS, SCREEN
+from constants import DISC_RADIUS
 
 class Disc:
-    def draw(color: tuple, center_x: int, center_y: int):
+    def draw(color: tuple, center_x: int, center_y: int, surface=None):
+        import pygame
+        from ui import get_screen
+        
         pygame.draw.circle(
-            surface=SCREEN,
+            surface=surface if surface is not None else get_screen(),
             color=color,
             center=(center_x, center_y),
             radius=DISC_RADIUS
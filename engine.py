@@ -0,0 +1,433 @@
+"""
+Headless Connect 4 engine: game rules, evaluation and alpha-beta search
+
+Nothing here (or in the modules it imports) depends on pygame or opens a window,
+so it can be imported by batch jobs, worker processes and command line tools;
+the pygame game lives in main.py/ ui.py
+"""
+import time
+
+from board import Board
+from bitboard import DEFAULT_GEOMETRY, ONGOING, WIN, DRAW
+from evaluation import evaluate_window
+from instrumentation import SearchStats, TimedBitBoard
+from ordering import MoveOrdering
+from solver import Solver
+from threats import THREAT_MIN_DEPTH, FORCED_WIN, forced_columns
+from transposition import TranspositionTable, DEPTH as TT_DEPTH, SCORE, FLAG, MOVE, EXACT, LOWER_BOUND, UPPER_BOUND
+from constants import (AI_TURN, HUMAN_TURN, HIGHEST_SCORE, LOWEST_SCORE, ALPHA, BETA, SOLVER_EMPTY_CELLS,
+                       THREAT_PREPASS)
+
+def get_valid_columns(board: Board):
+    return board.bitboard.valid_columns()
+
+def winning_move(board: Board, turn: int):
+    """Check if a player (0 for AI, or 1 for Human) has won by scanning every line on the board
+    The search only checks the lines through the last disc (BitBoard.last_move_status),
+    this full scan is kept to validate it against
+
+    Args:
+        board (Board): Board object
+        turn (int): 0 (AI) or 1 (Human)
+
+    Returns:
+        bool: check if the player in turn (HUMAN_TURN or AI_TURN) is the winner
+    """
+    curr_board = board.board
+    
+    # every horizontal, vertical and diagonal line of `connect` cells, listed once per board geometry
+    for window in board.bitboard.geometry.windows:
+        if all(curr_board[row][col] == turn for row, col in window):
+            return True
+    
+    return False
+    
+def is_termninal_node(board: Board):
+    """Check if the current turn or node in the minimax tree is terminal
+    A terminal node is either human or AI winning, or draw if board is filled up without winner
+
+    Args:
+        board (Board)
+
+    Returns:
+        bool: check if the current turn is terminal
+    """
+    bitboard = board.bitboard
+    is_win = bitboard.geometry.is_win
+
+    # terminal if someone has won or there are no valid columns left
+    return (is_win(bitboard.bits[HUMAN_TURN]) or 
+        is_win(bitboard.bits[AI_TURN]) or 
+        bitboard.is_full())
+    
+def score_position(board: Board, turn: int):
+    """Evaluate the entire board position by rescanning every window
+    The search reads the same value from board.bitboard.score, which is kept up to date on every move;
+    this full rescan is kept as the reference to validate it against
+
+    Args:
+        board (Board): Board object
+        turn (int): 0 if AI_TURN, 1 if HUMAN_TURN
+    """
+    score = 0
+    curr_board = board.board  # Get the 2D array, not a copy
+    
+    # # Score center column (connecting in center is often advantageous)
+    # center_col_idx = board.bitboard.geometry.cols // 2
+  
+    # # get the center columnn values
+    # center_col = [curr_board[row][center_col_idx] for row in range(board.bitboard.geometry.rows)]
+    # center_count = center_col.count(turn)
+    # score += center_count * 100    
+
+    # score every horizontal, vertical and diagonal window, in the order of the geometry's line table
+    for window in board.bitboard.geometry.windows:
+        score += evaluate_window([curr_board[row][col] for row, col in window], turn)
+            
+    return score
+
+class SearchTimeout(Exception):
+    """Raised from inside alpha_beta_pruning when the SearchLimits budget is used up"""
+
+
+class SearchLimits:
+    # Reading the clock (or the stop flag) on every node is expensive, so only check it every this many nodes
+    CLOCK_CHECK_INTERVAL = 256
+
+    def __init__(self, time_ms: float = None, max_nodes: int = None, stop=None):
+        """Time and/ or node budget for one search, None means unlimited
+
+        Args:
+            time_ms (float): wall-clock budget in milliseconds
+            max_nodes (int): maximum number of nodes to visit
+            stop (threading.Event): optional flag another thread sets to abort the search
+        """
+        self.start = time.perf_counter()
+        self.deadline = self.start + time_ms / 1000 if time_ms is not None else None
+        self.max_nodes = max_nodes
+        self.stop = stop
+        self.nodes = 0
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def is_expired(self):
+        return ((self.max_nodes is not None and self.nodes >= self.max_nodes) or
+                (self.deadline is not None and time.perf_counter() >= self.deadline) or
+                (self.stop is not None and self.stop.is_set()))
+
+    def check(self):
+        """Count a visited node, raise SearchTimeout once the budget is used up"""
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise SearchTimeout()
+        if self.nodes % self.CLOCK_CHECK_INTERVAL == 0:
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise SearchTimeout()
+            if self.stop is not None and self.stop.is_set():
+                raise SearchTimeout()
+
+
+def alpha_beta_pruning(board: Board, depth: int, player_turn: int, alpha: float, beta: float,
+                       table: TranspositionTable = None, limits: SearchLimits = None, pv_column: int = None,
+                       ordering: MoveOrdering = None, ply: int = 0, stats: SearchStats = None):
+    """Implement Alpha-Beta Pruning Algorithm
+    Children are simulated by making/ unmaking moves on board.bitboard in place,
+    so the board is back to its original state when the search returns
+    The game over check only looks at the last move played, which was made by the opponent of player_turn
+
+    Args:
+        board (Board): board that is active
+        depth (int): depth of tree
+        player_turn (int): 0 if AI_TURN (Maximizer), 1 if HUMAN_TURN
+        alpha (float): alpha value, initiatially -infinity
+        beta (float): beta value, initially +infinity
+        table (TranspositionTable): optional cache of already searched positions
+        limits (SearchLimits): optional budget, SearchTimeout is raised when it runs out
+        pv_column (int): optional column to search first, e.g. the best column of a shallower search
+        ordering (MoveOrdering): optional move ordering heuristics, columns are searched left to right without it
+        ply (int): distance from the root of the search, used by killer moves
+        stats (SearchStats): optional instrumentation, counts nodes, leaves and cutoffs per ply
+    """
+    if limits is not None:
+        limits.check()
+    
+    bitboard = board.bitboard
+    status = bitboard.last_move_status()
+    if stats is not None:
+        stats.nodes += 1
+        if status != ONGOING:
+            stats.terminal += 1
+        elif depth == 0:
+            stats.leaves += 1
+    
+    # base case
+    if status == WIN:
+        if player_turn == HUMAN_TURN: # if AI has won with the last move
+            return (None, HIGHEST_SCORE)
+        else:  # if Human has won with the last move
+            return (None, LOWEST_SCORE)
+    elif status == DRAW:
+        return (None, 0)
+    
+    # if depth == 0, simply score the current board (incrementally maintained score_position)
+    elif depth == 0:
+        return (None, bitboard.score) # Note: score in the AI's perspective (the maximizer), regardless of whose turn in the simulation
+    
+    # reuse a stored result of the same position (or of its mirror image) if it was searched at least as deep
+    # a shallower result still tells which column to search first
+    last_column = bitboard.geometry.cols - 1
+    if table is not None:
+        key, mirrored = bitboard.canonical_key(player_turn)
+        alpha_orig, beta_orig = alpha, beta
+        entry = table.probe(key)
+        if entry is not None:
+            # the stored column is the one of the canonical side
+            entry_column = last_column - entry[MOVE] if mirrored and entry[MOVE] is not None else entry[MOVE]
+            if pv_column is None:
+                pv_column = entry_column
+            if entry[TT_DEPTH] >= depth:
+                if entry[FLAG] == EXACT:
+                    return entry_column, entry[SCORE]
+                elif entry[FLAG] == LOWER_BOUND:
+                    alpha = max(alpha, entry[SCORE])
+                else:
+                    beta = min(beta, entry[SCORE])
+                if beta <= alpha:
+                    return entry_column, entry[SCORE]
+    
+    # threat pre-pass (threats.py): an immediate win or an unstoppable threat settles the node, a single threat
+    # leaves only its block, and columns that let the opponent win on top are not searched
+    if THREAT_PREPASS and depth >= THREAT_MIN_DEPTH:
+        outcome, valid_columns = forced_columns(bitboard, player_turn)
+        if outcome is not None:
+            best_column = valid_columns[0]
+            best_eval = HIGHEST_SCORE if (outcome == FORCED_WIN) == (player_turn == AI_TURN) else LOWEST_SCORE
+            if stats is not None:
+                stats.forced += 1
+            if table is not None:
+                table.store(key, depth, best_eval, EXACT, last_column - best_column if mirrored else best_column)
+            return best_column, best_eval
+        if valid_columns is None:
+            valid_columns = bitboard.valid_columns()
+    else:
+        valid_columns = bitboard.valid_columns()
+    
+    # searching the expected best column first lets the other columns be cut off sooner
+    if ordering is not None:
+        valid_columns = ordering.order(bitboard, valid_columns, player_turn, ply, pv_column)
+    elif pv_column is not None and pv_column in valid_columns:
+        valid_columns.remove(pv_column)
+        valid_columns.insert(0, pv_column)
+    
+    # a position that is its own mirror image (the empty board, ...): a column and its mirror column are worth
+    # the same, so only the first of the two in search order is searched
+    if bitboard.is_symmetric():
+        valid_columns = bitboard.geometry.drop_mirrored(valid_columns)
+    
+    # if maximizer (AI)
+    if player_turn == AI_TURN:
+        max_eval = float("-inf")
+        best_column = valid_columns[0] # initially choose the column expected to be best
+        
+        # for every valid column, simulate placing a disc/ place a turn value
+        # make the move on the bitboard, run alpha beta pruning, then take the move back
+        # imagine from a board version, we have different scenerios leading different game states for different ways of placing disc to different columns
+        for index, column in enumerate(valid_columns):
+            bitboard.make_move(column, AI_TURN) # place turn value in the simulated space of current board
+            eval = alpha_beta_pruning(board, depth - 1, HUMAN_TURN, alpha, beta, table, limits,
+                                      ordering=ordering, ply=ply + 1, stats=stats)[1] # column, eval
+            bitboard.unmake_move()
+            if eval > max_eval:
+                max_eval = eval
+                best_column = column
+                
+            alpha = max(alpha, eval)
+            
+            if beta <= alpha:
+                if ordering is not None:
+                    ordering.record_cutoff(bitboard, column, AI_TURN, ply, depth, index)
+                if stats is not None:
+                    stats.record_cutoff(ply)
+                break
+            
+        best_eval = max_eval
+          
+    # if minimizer        
+    elif player_turn == HUMAN_TURN:
+        min_eval = float("inf")
+        best_column = valid_columns[0]
+        
+        for index, column in enumerate(valid_columns):
+            bitboard.make_move(column, HUMAN_TURN)
+            eval = alpha_beta_pruning(board, depth - 1, AI_TURN, alpha, beta, table, limits,
+                                      ordering=ordering, ply=ply + 1, stats=stats)[1]
+            bitboard.unmake_move()
+            if eval < min_eval:
+                min_eval = eval
+                best_column = column
+            
+            beta = min(beta, eval)
+            if beta <= alpha:
+                if ordering is not None:
+                    ordering.record_cutoff(bitboard, column, HUMAN_TURN, ply, depth, index)
+                if stats is not None:
+                    stats.record_cutoff(ply)
+                break
+            
+        best_eval = min_eval
+    
+    if table is not None:
+        if best_eval <= alpha_orig:
+            flag = UPPER_BOUND
+        elif best_eval >= beta_orig:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        table.store(key, depth, best_eval, flag, last_column - best_column if mirrored else best_column)
+    
+    return best_column, best_eval
+
+def solve_endgame(board: Board, player_turn: int, limits: SearchLimits, solver: Solver = None):
+    """Solve a position exactly (see solver.py) with at most half of what is left of the budget,
+    so a position too hard to solve in time still leaves time for the heuristic search
+
+    Args:
+        board (Board): board that is active, it is not modified
+        player_turn (int): 0 if AI_TURN (Maximizer), 1 if HUMAN_TURN
+        limits (SearchLimits): budget of the whole move, the solver's nodes are added to it
+        solver (Solver): optional solver whose cache is kept between moves
+
+    Returns:
+        tuple or None: (best_column, score, depth) like iterative_deepening, None if it was not solved in time
+    """
+    if solver is None:
+        solver = Solver()
+    solver_limits = SearchLimits(stop=limits.stop)
+    if limits.deadline is not None:
+        solver_limits.deadline = solver_limits.start + (limits.deadline - solver_limits.start) / 2
+    if limits.max_nodes is not None:
+        solver_limits.max_nodes = (limits.max_nodes - limits.nodes) // 2
+    try:
+        column, score = solver.solve(board.bitboard, player_turn, solver_limits)
+    except SearchTimeout:
+        return None
+    finally:
+        limits.nodes += solver_limits.nodes
+    
+    # exact result as a search score: a win is a win however far away, from the AI's perspective
+    if score == 0:
+        search_score = 0
+    elif (score > 0) == (player_turn == AI_TURN):
+        search_score = HIGHEST_SCORE
+    else:
+        search_score = LOWEST_SCORE
+    return column, search_score, board.bitboard.geometry.size - len(board.bitboard.moves)
+
+def iterative_deepening(board: Board, player_turn: int, time_ms: float = None, max_nodes: int = None,
+                        max_depth: int = None, table: TranspositionTable = None, ordering: MoveOrdering = None,
+                        stop=None, limits: SearchLimits = None, on_depth=None, book=None,
+                        solve_empty_cells: int = SOLVER_EMPTY_CELLS, solver: Solver = None, stats: SearchStats = None):
+    """Search depth 1, 2, 3... until the time/ node budget runs out, and return the deepest completed result
+    The best column of each depth is searched first at the next depth
+
+    Args:
+        board (Board): board that is active, it is not modified
+        player_turn (int): 0 if AI_TURN (Maximizer), 1 if HUMAN_TURN
+        time_ms (float): wall-clock budget in milliseconds, None for no time limit
+        max_nodes (int): node budget, None for no node limit
+        max_depth (int): deepest depth to search, defaults to the number of empty cells
+        table (TranspositionTable): optional cache shared by all depths
+        ordering (MoveOrdering): optional move ordering heuristics shared by all depths
+        stop (threading.Event): optional flag another thread sets to abort the search early
+        limits (SearchLimits): optional budget used instead of time_ms/ max_nodes/ stop, pass one to read its node count afterwards
+        on_depth (callable): optional on_depth(depth, best_column, score), called after every completed depth
+        book (OpeningBook): optional opening book, a position in it is answered without searching
+        solve_empty_cells (int): solve the position exactly (solve_endgame) with this many empty cells or fewer, None to never solve
+        solver (Solver): optional endgame solver whose cache is kept between calls
+        stats (SearchStats): optional instrumentation of this search (see instrumentation.py), filled in place
+
+    Returns:
+        tuple: (best_column, score, depth) of the deepest completed search, depth 0 if none completed
+    """
+    if limits is None:
+        limits = SearchLimits(time_ms, max_nodes, stop)
+    if stats is None:
+        return _iterative_deepening(board, player_turn, max_depth, table, ordering, limits, on_depth, book,
+                                    solve_empty_cells, solver, None)
+    
+    stats.start_profile()
+    try:
+        result = _iterative_deepening(board, player_turn, max_depth, table, ordering, limits, on_depth, book,
+                                      solve_empty_cells, solver, stats)
+    finally:
+        stats.stop_profile()
+    stats.time_ms = limits.elapsed_ms()
+    stats.best_column, stats.score, stats.depth = result
+    return result
+
+def _iterative_deepening(board: Board, player_turn: int, max_depth: int, table: TranspositionTable,
+                         ordering: MoveOrdering, limits: SearchLimits, on_depth, book, solve_empty_cells: int,
+                         solver: Solver, stats: SearchStats):
+    valid_columns = get_valid_columns(board)
+    if not valid_columns or is_termninal_node(board):
+        return None, 0, 0
+    geometry = board.bitboard.geometry
+    if ordering is not None and ordering.geometry is not geometry:
+        raise ValueError(f"move ordering is for {ordering.geometry}, the board is {geometry}")
+    
+    if book is not None:
+        entry = book.probe(board.bitboard, player_turn)
+        if entry is not None and (max_depth is None or entry[2] >= max_depth):
+            return entry
+    
+    empty_cells = geometry.size - len(board.bitboard.moves)
+    if max_depth is None or max_depth > empty_cells:
+        max_depth = empty_cells
+    
+    # the solver (and its threat detection) is written for the classic board
+    if solve_empty_cells is not None and empty_cells <= solve_empty_cells and geometry is DEFAULT_GEOMETRY:
+        result = solve_endgame(board, player_turn, limits, solver)
+        if result is not None:
+            column, score, depth = result
+            if on_depth is not None:
+                on_depth(depth, column, score)
+            return result
+    
+    # an aborted search leaves its moves on the board, so search a copy
+    if stats is not None and stats.timers:
+        start = time.perf_counter()
+        search_board = board.copy()
+        stats.copy_time += time.perf_counter() - start
+        search_board.bitboard = TimedBitBoard.wrap(search_board.bitboard, stats)
+    else:
+        search_board = board.copy()
+    if ordering is not None:
+        ordering.new_search()
+    
+    # fallback if not even depth 1 completes: the valid column closest to the center
+    best_column = min(valid_columns, key=lambda col: abs(col - geometry.cols // 2))
+    best_score = 0
+    completed_depth = 0
+    
+    for depth in range(1, max_depth + 1):
+        if limits.is_expired():
+            break
+        depth_start_nodes = stats.nodes if stats is not None else 0
+        try:
+            column, score = alpha_beta_pruning(search_board, depth, player_turn, ALPHA, BETA,
+                                               table, limits, pv_column=best_column, ordering=ordering, stats=stats)
+        except SearchTimeout:
+            break
+        
+        best_column, best_score, completed_depth = column, score, depth
+        if stats is not None:
+            stats.depth_nodes.append(stats.nodes - depth_start_nodes)
+        if on_depth is not None:
+            on_depth(depth, column, score)
+        
+        # a forced win/ loss is found, searching deeper will not change the result
+        if score == HIGHEST_SCORE or score == LOWEST_SCORE:
+            break
+    
+    return best_column, best_score, completed_depth
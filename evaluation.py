@@ -0,0 +1,221 @@
+"""
+Heuristic evaluation: scoring windows of 4 cells
+
+There are 69 windows of 4 cells on a 6x7 board (24 horizontal, 21 vertical, 12 + 12 diagonal).
+They are listed once here, together with which windows pass through each cell, so the
+BitBoard can keep the score up to date on every make/ unmake move instead of rescanning the board.
+
+A window is scored only by how many AI and Human discs it contains, so every possible window
+content is scored once up front (WINDOW_SCORES), using evaluate_window itself to stay identical.
+
+The module constants are the tables of the classic game; the functions build the same tables for
+any board size and connect length (one window per line of `length` cells), see bitboard.Geometry.
+"""
+from constants import ROWS, COLS, CONNECT, AI_TURN, HUMAN_TURN, HIGHEST_SCORE, LOWEST_SCORE
+
+WINDOW_LENGTH = CONNECT
+
+# Window state: a single int encoding the disc counts of a window, state = ai_count + STATE_STEP[HUMAN_TURN] * human_count
+STATE_STEP = (1, WINDOW_LENGTH + 1)  # indexed by turn: adding an AI disc adds 1, adding a Human disc adds 5
+NUM_STATES = (WINDOW_LENGTH + 1) ** 2
+
+# Scores of a window one, two and three discs short of a line, with no opponent disc in it
+OWN_SCORES = (500, 300, 100)
+OPPONENT_SCORES = (1000, 700, 300)
+
+
+def evaluate_window(window, turn:int):
+    """ Evaluatation function
+    Evaluate a window of 4 locations in a row/ col/ horizontal based on what value/turn value it contains (0 or 1)
+    From AI's perspective
+
+    positive scores = good for AI
+    negative scores = bad for AI
+
+    Args:
+        window: list of 4 disc objects or None (a longer/ shorter list for other connect lengths)
+        turn (int): 0 if AI_TURN, 1 if HUMAN_TURN
+    """
+    score = 0
+
+    # Count number of friendly values, opponent values, and None in the window list
+    if window is None:
+        return score
+
+    length = len(window)
+    ai_count = window.count(AI_TURN)
+    human_count = window.count(HUMAN_TURN)
+    none_count = window.count(None)
+
+    # Positive scores for AI's good positions (scale chosen so human threats
+    # outweigh AI's similar-length threats), by how many discs the AI is short of a line
+    if ai_count == length:  # AI wins
+        score += HIGHEST_SCORE
+    elif ai_count and none_count == length - ai_count <= len(OWN_SCORES):
+        score += OWN_SCORES[none_count - 1]
+
+    # Decrease scores if Human's good positions (threats to AI)
+    # Very large negative one disc short: block immediate human win should be top priority
+    if human_count == length:  # Human wins
+        score += LOWEST_SCORE
+    elif human_count and none_count == length - human_count <= len(OPPONENT_SCORES):
+        score -= OPPONENT_SCORES[none_count - 1]
+
+    return score
+
+
+def line_windows(rows: int = ROWS, cols: int = COLS, length: int = WINDOW_LENGTH):
+    """List every window as a tuple of `length` (row, col) cells, in the same order score_position visits them"""
+    windows = []
+    span = length - 1
+
+    # horizontal
+    for row in range(rows):
+        for col in range(cols - span):
+            windows.append(tuple((row, col + i) for i in range(length)))
+
+    # vertical
+    for col in range(cols):
+        for row in range(rows - span):
+            windows.append(tuple((row + i, col) for i in range(length)))
+
+    # positively sloped diagonal
+    for col in range(cols - span):
+        for row in range(span, rows):
+            windows.append(tuple((row - i, col + i) for i in range(length)))
+
+    # negatively sloped diagonal
+    for col in range(cols - span):
+        for row in range(rows - span):
+            windows.append(tuple((row + i, col + i) for i in range(length)))
+
+    return tuple(windows)
+
+
+def cell_windows(windows: tuple, rows: int = ROWS, cols: int = COLS):
+    """cell_windows(...)[row][col] = indices into windows of every window containing that cell"""
+    cells = [[[] for _ in range(cols)] for _ in range(rows)]
+    for index, window in enumerate(windows):
+        for row, col in window:
+            cells[row][col].append(index)
+    return [[tuple(indices) for indices in row] for row in cells]
+
+
+WINDOWS = line_windows()
+
+# CELL_WINDOWS[row][col] = indices into WINDOWS of every window containing that cell (3 to 13 of them)
+CELL_WINDOWS = cell_windows(WINDOWS)
+
+
+def window_state(ai_count: int, human_count: int, length: int = WINDOW_LENGTH):
+    return ai_count + human_count * (length + 1)
+
+
+def win_states(length: int = WINDOW_LENGTH):
+    """win_states(length)[turn] = state of a window holding `length` discs of turn"""
+    return window_state(length, 0, length), window_state(0, length, length)
+
+
+WIN_STATES = win_states()
+
+
+def evaluate_window_scores(length: int = WINDOW_LENGTH):
+    """Score every window state with evaluate_window
+
+    Returns:
+        list: scores[state] = evaluate_window of a window with that many AI and Human discs
+    """
+    scores = [0] * (length + 1) ** 2
+    for ai in range(length + 1):
+        for human in range(length + 1 - ai):
+            window = [AI_TURN] * ai + [HUMAN_TURN] * human + [None] * (length - ai - human)
+            scores[window_state(ai, human, length)] = evaluate_window(window, AI_TURN)
+    return scores
+
+
+# WINDOW_SCORES[state] = evaluate_window of a window with that many AI and Human discs
+WINDOW_SCORES = evaluate_window_scores()
+
+
+# Weights of evaluate_window: score of a window holding 1, 2 or 3 discs of one player and no opponent disc,
+# for the evaluating player ("own") and against it ("opponent")
+DEFAULT_WEIGHTS = {"own": (100, 300, 500), "opponent": (300, 700, 1000)}
+
+
+def _align(weights: tuple, length: int):
+    """Weights indexed by disc count for a window of length cells: the last weight is always
+    one disc short of a line, missing ones (long lines) score 0 and extra ones (short lines) are dropped"""
+    return (0,) + ((0,) * (length - 1) + tuple(weights))[-(length - 1):]
+
+
+def window_scores(weights: dict = None, perspective: int = AI_TURN, length: int = WINDOW_LENGTH):
+    """Score every window state with custom weights, e.g. to tune them in the arena
+
+    Args:
+        weights (dict): {"own": (w1, w2, w3), "opponent": (w1, w2, w3)}, defaults to DEFAULT_WEIGHTS
+        perspective (int): player the weights are written for; scores are always from the AI's (0) point of view
+            (the maximizer), so for Human (1) own and opponent swap sides and the sign flips
+        length (int): discs in a row needed to win
+
+    Returns:
+        list: score of each window state, same layout as WINDOW_SCORES
+    """
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+    own = _align(weights["own"], length)
+    opponent = _align(weights["opponent"], length)
+    scores = [0] * (length + 1) ** 2
+    for ai_count in range(length + 1):
+        for human_count in range(length + 1 - ai_count):
+            mine, theirs = (ai_count, human_count) if perspective == AI_TURN else (human_count, ai_count)
+            if mine == length:
+                score = HIGHEST_SCORE
+            elif theirs == length:
+                score = LOWEST_SCORE
+            elif theirs == 0:
+                score = own[mine]
+            elif mine == 0:
+                score = -opponent[theirs]
+            else:
+                score = 0
+            scores[window_state(ai_count, human_count, length)] = score if perspective == AI_TURN else -score
+    return scores
+
+
+def _gains(scores: list, turn: int, length: int):
+    """Score change of adding a disc of turn to a window in each state
+    Completed windows (a win) count as 0: the running score is only read for positions
+    nobody has won yet, and keeping infinities out lets unmake subtract the gain back exactly
+    """
+    gains = [0] * (length + 1) ** 2
+    step = window_state(1, 0, length) if turn == AI_TURN else window_state(0, 1, length)
+    for ai_count in range(length + 1):
+        for human_count in range(length + 1 - ai_count):
+            if ai_count + human_count == length:
+                continue
+            state = window_state(ai_count, human_count, length)
+            new_ai = ai_count + (turn == AI_TURN)
+            new_human = human_count + (turn == HUMAN_TURN)
+            if new_ai == length or new_human == length:
+                gains[state] = -scores[state]
+            else:
+                gains[state] = scores[state + step] - scores[state]
+    return gains
+
+
+def window_gains(scores: list = None, length: int = WINDOW_LENGTH):
+    """Gain tables used by BitBoard to update its running score
+
+    Args:
+        scores (list): score of each window state, defaults to evaluate_window's (WINDOW_SCORES for the classic length)
+        length (int): discs in a row needed to win
+
+    Returns:
+        tuple: gains[turn][state] = change of the running score when turn drops a disc in a window in that state
+    """
+    if scores is None:
+        scores = WINDOW_SCORES if length == WINDOW_LENGTH else evaluate_window_scores(length)
+    return (_gains(scores, AI_TURN, length), _gains(scores, HUMAN_TURN, length))
+
+
+WINDOW_GAINS = window_gains()
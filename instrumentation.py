@@ -0,0 +1,172 @@
+"""
+Opt-in search instrumentation: per-move statistics, timers, profiling and telemetry export
+
+Pass a SearchStats to iterative_deepening (or alpha_beta_pruning) to collect, for one move:
+    - nodes visited, leaves evaluated (depth 0), terminal positions reached and nodes settled by the threat pre-pass
+    - beta/ alpha cutoffs, counted per ply
+    - nodes of every completed depth, and the effective branching factor
+    - time spent in make/ unmake (which keeps the incremental evaluation up to date, the counterpart of
+      score_position), in the game over check (last_move_status, the counterpart of winning_move) and in Board.copy
+    - optionally a cProfile report of the whole search
+
+Without a SearchStats the search only pays a few `stats is not None` checks per node: the timers come
+from TimedBitBoard, which replaces the searched bitboard only while instrumentation is on.
+
+TelemetryWriter appends one record per move to a JSON lines or CSV file.
+
+The engine imports this module eagerly, so the profiling, CSV and JSON modules are only imported once they are used.
+"""
+import math
+import os
+import time
+
+from bitboard import BitBoard
+
+PROFILE_LINES = 25  # functions listed in the cProfile report
+
+
+class SearchStats:
+    def __init__(self, timers: bool = True, profile: bool = False):
+        """Statistics of one search (one move)
+
+        Args:
+            timers (bool): time make/ unmake, the game over check and Board.copy (costs a clock read per call)
+            profile (bool): run the search under cProfile, the report ends up in profile_report
+        """
+        self.timers = timers
+        self.profile = profile
+        self.nodes = 0
+        self.leaves = 0  # positions scored by the evaluation (depth 0)
+        self.terminal = 0  # won/ drawn positions reached
+        self.forced = 0  # nodes settled by the threat pre-pass (threats.py) without searching a child
+        self.cutoffs_by_ply = []  # cutoffs_by_ply[ply] = beta/ alpha cutoffs at that distance from the root
+        self.depth_nodes = []  # nodes searched by each completed depth of iterative deepening
+        self.move_time = 0.0  # seconds in make_move/ unmake_move, incremental evaluation included
+        self.status_time = 0.0  # seconds in last_move_status
+        self.copy_time = 0.0  # seconds in Board.copy
+        self.time_ms = 0.0
+        self.depth = 0
+        self.best_column = None
+        self.score = None
+        self.profile_report = None
+        self._profiler = None
+
+    def record_cutoff(self, ply: int):
+        while len(self.cutoffs_by_ply) <= ply:
+            self.cutoffs_by_ply.append(0)
+        self.cutoffs_by_ply[ply] += 1
+
+    @property
+    def cutoffs(self):
+        return sum(self.cutoffs_by_ply)
+
+    def effective_branching_factor(self):
+        """b such that b ** depth = nodes of the deepest completed depth, 0.0 if no depth completed"""
+        if not self.depth_nodes or not self.depth_nodes[-1]:
+            return 0.0
+        return self.depth_nodes[-1] ** (1 / len(self.depth_nodes))
+
+    def start_profile(self):
+        if self.profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_profile(self):
+        if self._profiler is not None:
+            import io
+            import pstats
+            self._profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(self._profiler, stream=report).sort_stats("cumulative").print_stats(PROFILE_LINES)
+            self.profile_report = report.getvalue()
+            self._profiler = None
+
+    def to_dict(self):
+        """JSON-serializable summary of the move"""
+        record = {
+            "depth": self.depth,
+            "best_column": self.best_column,
+            "score": self.score if self.score is None or math.isfinite(self.score) else str(self.score),
+            "time_ms": round(self.time_ms, 3),
+            "nodes": self.nodes,
+            "leaves": self.leaves,
+            "terminal": self.terminal,
+            "forced": self.forced,
+            "cutoffs": self.cutoffs,
+            "cutoffs_by_ply": self.cutoffs_by_ply,
+            "depth_nodes": self.depth_nodes,
+            "ebf": round(self.effective_branching_factor(), 3),
+            "move_ms": round(self.move_time * 1000, 3),
+            "status_ms": round(self.status_time * 1000, 3),
+            "copy_ms": round(self.copy_time * 1000, 3),
+        }
+        if self.profile_report is not None:
+            record["profile"] = self.profile_report
+        return record
+
+
+class TimedBitBoard(BitBoard):
+    """BitBoard that adds the time of its make/ unmake and game over checks to a SearchStats"""
+    __slots__ = ("stats",)
+
+    @classmethod
+    def wrap(cls, bitboard: BitBoard, stats: SearchStats):
+        """Timed copy of a bitboard (the state lists are shared, so only use it in place of the original)"""
+        timed = cls.__new__(cls)
+        for name in BitBoard.__slots__:
+            setattr(timed, name, getattr(bitboard, name))
+        timed.stats = stats
+        return timed
+
+    def make_move(self, col: int, turn: int):
+        start = time.perf_counter()
+        BitBoard.make_move(self, col, turn)
+        self.stats.move_time += time.perf_counter() - start
+
+    def unmake_move(self):
+        start = time.perf_counter()
+        col = BitBoard.unmake_move(self)
+        self.stats.move_time += time.perf_counter() - start
+        return col
+
+    def last_move_status(self):
+        start = time.perf_counter()
+        status = BitBoard.last_move_status(self)
+        self.stats.status_time += time.perf_counter() - start
+        return status
+
+
+CSV_FIELDS = ("move", "depth", "best_column", "score", "time_ms", "nodes", "leaves", "terminal", "forced", "cutoffs",
+              "cutoffs_by_ply", "depth_nodes", "ebf", "move_ms", "status_ms", "copy_ms")
+
+
+class TelemetryWriter:
+    def __init__(self, path: str):
+        """Append per-move records to a file, CSV if the path ends with .csv, JSON lines otherwise
+
+        Args:
+            path (str): file to append to
+        """
+        self.path = path
+        self.csv = path.endswith(".csv")
+        write_header = self.csv and (not os.path.exists(path) or os.path.getsize(path) == 0)
+        self.file = open(path, "a", newline="")
+        if self.csv:
+            import csv
+            self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, record: dict):
+        """Append one record (SearchStats.to_dict() plus any extra fields), lists are written as JSON in CSV"""
+        import json
+        if self.csv:
+            self.writer.writerow({key: json.dumps(value) if isinstance(value, list) else value
+                                  for key, value in record.items()})
+        else:
+            self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
@@ -1,303 +1,102 @@
 # Set up game state and main algorithm here
-import pygame
+import os
 import sys
 import random
 
 from board import Board
-from disc import Disc
-from constants import (DEPTH, AI_TURN, HUMAN_TURN, SCREEN,
-                       ROWS, COLS, HIGHEST_SCORE, LOWEST_SCORE, ALPHA, BETA, 
-                       RED, WHITE, CELL_SIZE, NAVY_BLUE, SHADE_GRAY)
+from bitboard import WIN, DRAW
+from book import OpeningBook
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+from ui import get_screen, get_renderer
+from worker import AIWorker
+from instrumentation import TelemetryWriter
+from records import format_record, game_result
+from constants import (TIME_BUDGET_MS, AI_WORKERS, PONDER, SHOW_HINTS, FPS, SEED, OPENING_BOOK_PATH, TELEMETRY_PATH,
+                       GAME_RECORDS_PATH, HIGHEST_SCORE, LOWEST_SCORE,
+                       PROFILE_SEARCH, AI_TURN, HUMAN_TURN, ROWS, COLS, RED, BLACK, CELL_SIZE, NAVY_BLUE)
+
+# Shared between AI moves so positions searched on an earlier move are reused
+transposition_table = TranspositionTable()
+move_ordering = MoveOrdering()
+
+# who moves first is the only random choice, seeded so games can be replayed
+rng = random.Random(SEED)
 
 # end the game which will close the window eventually
 def end_game():
     global game_over
     game_over = True
-        
+
+def save_record(board, last_turn):
+    """Append a finished game to GAME_RECORDS_PATH (records.py format, with the player who moved first)"""
+    moves = board.bitboard.moves
+    first_turn = last_turn if len(moves) % 2 else 1 - last_turn
+    with open(GAME_RECORDS_PATH, "a") as file:
+        file.write(format_record(moves, game_result(board.bitboard), first_turn) + "\n")
+
 def reset_game():
     """Reset the game to initial state"""
     board = Board()
-    turn = random.choice([HUMAN_TURN, AI_TURN])
+    turn = rng.choice([HUMAN_TURN, AI_TURN])
     game_over = False
-    SCREEN.fill(WHITE)
-    board.draw_board(SCREEN)
-    pygame.display.update()
+    get_renderer().reset(board)
     return board, turn, game_over
 
-def get_valid_columns(board: Board):
-    valid_columns = []
-    for col in range(COLS):
-        if board.is_valid_column(col):
-            valid_columns.append(col)
-    return valid_columns
-
-def highlight_column(board, column):
-    """Highlight a column when mouse hovers over it
-    
-    Args:
-        board: Board object to redraw
-        column: Column index to highlight
-    """
-    if column < 0 or column >= COLS:
-        return
-    
-    # Redraw the board first
-    SCREEN.fill(WHITE)
-    board.draw_board(SCREEN)
-    
-    # Draw semi-transparent highlight over the column
-    highlight_surface = pygame.Surface((CELL_SIZE, CELL_SIZE * ROWS))
-    highlight_surface.set_alpha(50)  # Transparency level (0-255)
-    highlight_surface.fill(SHADE_GRAY)
-    SCREEN.blit(highlight_surface, (column * CELL_SIZE, CELL_SIZE))
-    
-    pygame.display.update()
-
-# ==== Alpha-Beta Pruning Algorithm ====
-def winning_move(board: Board, turn: int):
-    """Check if a player (0 for AI, or 1 for Human) has won 
-
-    Args:
-        board (Board): Board object
-        turn (int): 0 (AI) or 1 (Human)
-
-    Returns:
-        bool: check if the player in turn (HUMAN_TURN or AI_TURN) is the winner
-    """
-    curr_board = board.board
-    
-    # check horizonal range of 4 for win
-    # range of row and col is determined so that they are not out of range when increase/ decrease by i
-    for row in range(ROWS):
-        for col in range(COLS - 3): # 7 - 3 = 4
-            if all(curr_board[row][col+i] == turn for i in range(4)):
-                return True
-        
-    # check vertical range of 4 for win
-    for col in range(COLS):
-        for row in range(ROWS - 3):
-            if all(curr_board[row+i][col] == turn for i in range(4)):
-                return True
-    
-    # check positively sloped diagonal for win - decreased row, increased col
-    for col in range(COLS - 3):
-        for row in range(3, ROWS):
-            if all(curr_board[row-i][col+i] == turn for i in range(4)):
-                return True
-
-    # check negatively sloped diagonal for win - increased row, increased col
-    for col in range(COLS - 3): 
-        for row in range(ROWS - 3):
-            if all(curr_board[row+i][col+i] == turn for i in range(4)):
-                return True
-    
-    return False
-    
-def is_termninal_node(board: Board):
-    """Check if the current turn or node in the minimax tree is terminal
-    A terminal node is either human or AI winning, or draw if board is filled up without winner
+def hint_label(hints: dict, column: int):
+    """Text shown above the hovered column: the human's score of playing it (positive is good for the human)
 
     Args:
-        board (Board)
+        hints (dict): column -> analysis line, see AIWorker.get_hints
+        column (int): hovered column
 
     Returns:
-        bool: check if the current turn is terminal
+        str or None: None if the column has no hint (yet)
     """
-    valid_columns = get_valid_columns(board)
-
-    # terminal if someone has won or there are no valid columns left
-    return (winning_move(board, HUMAN_TURN) or 
-        winning_move(board, AI_TURN) or 
-        len(valid_columns) == 0)
-    
-def evaluate_window(window, turn:int):
-    """ Evaluatation function
-    Evaluate a window of 4 locations in a row/ col/ horizontal based on what value/turn value it contains (0 or 1)
-    From AI's perspective   
-    
-    positive scores = good for AI
-    negative scores = bad for AI
-    
-    Args:
-        window: list of 4 disc objects or None
-        turn (int): 0 if AI_TURN, 1 if HUMAN_TURN
-    """
-    score = 0
-    
-    # Count number of friendly values, opponent values, and None in the window list
-    if window is None:
-        return score
-    
-    ai_count = window.count(AI_TURN)
-    human_count = window.count(HUMAN_TURN)
-    none_count = window.count(None)
-    
-    # Positive scores for AI's good positions (scale chosen so human threats
-    # outweigh AI's similar-length threats)
-    if ai_count == 4:  # AI wins
-        score += HIGHEST_SCORE
-    elif ai_count == 3 and none_count == 1:
-        score += 500
-    elif ai_count == 2 and none_count == 2:
-        score += 300
-    elif ai_count == 1 and none_count == 3:
-        score += 100
-
-    # Decrease scores if Human's good positions (threats to AI)
-    if human_count == 4:  # Human wins
-        score += LOWEST_SCORE
-    elif human_count == 3 and none_count == 1:
-        # Very large negative: block immediate human win should be top priority
-        score -= 1000
-    elif human_count == 2 and none_count == 2:
-        score -= 700
-    elif human_count == 1 and none_count == 3:
-        score -= 300
-    
-    return score
-
-def score_position(board: Board, turn: int):
-    """Evaluate the entire board position
-
-    Args:
-        board (Board): Board object
-        turn (int): 0 if AI_TURN, 1 if HUMAN_TURN
-    """
-    score = 0
-    curr_board = board.board  # Get the 2D array, not a copy
-    
-    # # Score center column (connecting in center is often advantageous)
-    # center_col_idx = COLS // 2
-  
-    # # get the center columnn values
-    # center_col = [curr_board[row][center_col_idx] for row in range(ROWS)]
-    # center_count = center_col.count(turn)
-    # score += center_count * 100    
-
-    # score for horizonal, range of 4 
-    for row in range(ROWS):
-        for col in range(COLS - 3): # 7 - 3 = 4
-            window = [curr_board[row][col+i] for i in range(4)]
-            score += evaluate_window(window, turn)
-                    
-    # score for vertical, range of 4
-    for col in range(COLS):
-        for row in range(ROWS - 3):
-            window = [curr_board[row+i][col] for i in range(4)]
-            score += evaluate_window(window, turn)
-            
-    # score for positively sloped diagonal range of 4
-    for col in range(COLS - 3):
-        for row in range(3, ROWS):
-            window = [curr_board[row-i][col+i] for i in range(4)]
-            score += evaluate_window(window, turn)
-            
-    # score for negatively sloped diagonal, range of 4
-    for col in range(COLS - 3): 
-        for row in range(ROWS - 3):
-            window = [curr_board[row+i][col+i] for i in range(4)]
-            score += evaluate_window(window, turn)
-            
-    return score
+    if not hints or column not in hints:
+        return None
+    line = hints[column]
+    score = -line["score"]  # search scores are from the AI's perspective
+    if score == HIGHEST_SCORE:
+        return "WIN"
+    if score == LOWEST_SCORE:
+        return "LOSS"
+    # negating the score swaps the bound
+    return {"upper": ">=", "lower": "<="}.get(line["bound"], "") + str(int(score))
 
-def alpha_beta_pruning(board: Board, depth: int, player_turn: int, alpha: float, beta: float):
-    """Implement Alpha-Beta Pruning Algorithm
-
-    Args:
-        board (Board): board that is active
-        depth (int): depth of tree
-        player_turn (int): 0 if AI_TURN (Maximizer), 1 if HUMAN_TURN
-        alpha (float): alpha value, initiatially -infinity
-        beta (float): beta value, initially +infinity
-    """
-    valid_columns = get_valid_columns(board)
-    is_termninal = is_termninal_node(board)
-    
-    # base case
-    if is_termninal: 
-        if winning_move(board, AI_TURN): # if AI has won
-            return (None, HIGHEST_SCORE)
-        elif winning_move(board, HUMAN_TURN):  # if Human has won
-            return (None, LOWEST_SCORE)
-        else: # if draw
-            return (None, 0)
-    
-    # if depth == 0, simply score the current board
-    elif depth == 0:
-        return (None, score_position(board, AI_TURN)) # Note: score in the AI's perspective (the maximizer), regardless of whose turn in the simulation
-    
-    # if maximizer (AI)
-    if player_turn == AI_TURN:
-        max_eval = float("-inf")
-        best_column = random.choice(valid_columns) # initially choose a random valid column
-        
-        # for every valid column, simulate placing a disc/ place a turn value
-        # use copy of board, run alpha beta pruning 
-        # imagine from a board version, we have different scenerios leading different game states for different ways of placing disc to different columns
-        for column in valid_columns:
-            board_copy = board.copy() # A copy of current copy 
-            row = board.get_next_open_row(column)
-            board_copy.place_value(row, column, AI_TURN) # place turn value in the simulated space of current board
-            
-            eval = alpha_beta_pruning(board_copy, depth - 1, HUMAN_TURN, alpha, beta)[1] # column, eval
-            if eval > max_eval:
-                max_eval = eval
-                best_column = column
-                
-            alpha = max(alpha, eval)
-            
-            if beta <= alpha:
-                break
-            
-        return best_column, max_eval
-          
-    # if minimizer        
-    elif player_turn == HUMAN_TURN:
-        min_eval = float("inf")
-        best_column = random.choice(valid_columns)
-        
-        for column in valid_columns:
-            board_copy = board.copy() 
-            row = board_copy.get_next_open_row(column)
-            board_copy.place_value(row, column, HUMAN_TURN)
-            
-            eval = alpha_beta_pruning(board_copy, depth - 1, AI_TURN, alpha, beta)[1]
-            if eval < min_eval:
-                min_eval = eval
-                best_column = column
-            
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break
-            
-        return best_column, min_eval
-    
 if __name__ == "__main__":
+    # pygame is only needed to play, importing this module (e.g. for the search functions) stays headless
+    import pygame
+    
     board = Board()
-    turn = random.choice([HUMAN_TURN, AI_TURN]) # randomize the first turn
+    turn = rng.choice([HUMAN_TURN, AI_TURN]) # randomize the first turn
     game_over = False
     
     # initialize game
     pygame.init()
+    SCREEN = get_screen()
     
-    # Fill screen with background color
-    SCREEN.fill(WHITE)  # White background
-    
-    # draw GUI
-    board.draw_board(SCREEN)
-    
-    pygame.display.update()
+    # draw GUI: background and disc sprites are rendered once, then only changed cells are redrawn
+    renderer = get_renderer()
+    renderer.reset(board)
     my_font = pygame.font.SysFont("Arial", 75, bold=True)
     
     # Game loop that runs while game is not over (GAME_OVER == False) (i.e, none has placed 4 in a row/col/horizontal axis yet)
     running = True
-    last_hovered_col = -1  # Track last highlighted column
+    clock = pygame.time.Clock()
+    # the book is optional, generate it with `python3 book.py`
+    book = OpeningBook(OPENING_BOOK_PATH) if os.path.exists(OPENING_BOOK_PATH) else None
+    telemetry = TelemetryWriter(TELEMETRY_PATH) if TELEMETRY_PATH else None
+    worker = AIWorker(transposition_table, move_ordering, time_ms=TIME_BUDGET_MS, workers=AI_WORKERS, book=book,
+                      telemetry=telemetry, profile=PROFILE_SEARCH)
+    pondering = False  # pondering was started for the current human turn
     
     while running:
         # for every player's event
         for event in pygame.event.get():
             # if player closes the window, exit the game
             if event.type == pygame.QUIT:
+                worker.shutdown()
                 sys.exit()
             
             # Track mouse motion for column highlighting (only during human's turn)
@@ -305,10 +104,8 @@ if __name__ == "__main__":
                 x_pos = event.pos[0]
                 curr_col = int(x_pos // CELL_SIZE)
                 
-                # Only redraw if hovering over a different column
-                if curr_col != last_hovered_col and 0 <= curr_col < COLS:
-                    highlight_column(board, curr_col)
-                    last_hovered_col = curr_col
+                # only the old and the new highlighted column are redrawn, nothing if the column did not change
+                renderer.highlight(curr_col)
             
             # if that stack is valid to place a disc on the top + curr_player == HUMAN_PLAYER, on user's mouse click, place the disc (note: disc color is based on current player)
             if not game_over and turn == HUMAN_TURN and event.type == pygame.MOUSEBUTTONDOWN:
@@ -321,20 +118,34 @@ if __name__ == "__main__":
                     valid_row = board.get_next_open_row(curr_col)
                     if valid_row >= 0 and valid_row < ROWS:
                         board.place_value(valid_row, curr_col, HUMAN_TURN)
+                        pondering = False
                         
-                        # Redraw the entire board
-                        SCREEN.fill(WHITE)
-                        board.draw_board(SCREEN)
-                        pygame.display.update()
+                        # Redraw the new disc
+                        renderer.draw_board(board)
                         
-                        # check if it is a winning move
-                        if winning_move(board, HUMAN_TURN):
+                        # check if it is a winning move (only the lines through the new disc can have changed)
+                        status = board.bitboard.last_move_status()
+                        if status == WIN:
                             print("Human player wins!")
-                            SCREEN.fill(WHITE)
-                            board.draw_board(SCREEN)
                             label = my_font.render("HUMAN WINS!", 1, RED)
-                            SCREEN.blit(label, (80, 10))
-                            pygame.display.update()
+                            renderer.show_message(label, (80, 10))
+                            renderer.flush()
+                            if GAME_RECORDS_PATH:
+                                save_record(board, HUMAN_TURN)
+                            
+                            game_over = True
+                            pygame.time.wait(5000)  # Wait 5 seconds
+                            board, turn, game_over = reset_game()
+                            continue
+                        
+                        # board filled up without a winner
+                        elif status == DRAW:
+                            print("Draw!")
+                            label = my_font.render("DRAW!", 1, BLACK)
+                            renderer.show_message(label, (200, 10))
+                            renderer.flush()
+                            if GAME_RECORDS_PATH:
+                                save_record(board, HUMAN_TURN)
                             
                             game_over = True
                             pygame.time.wait(5000)  # Wait 5 seconds
@@ -345,42 +156,73 @@ if __name__ == "__main__":
                     turn = (turn + 1) % 2
                                    
                 # if mouse not on valid column, does not allow to create a new disc
+        
+        # while the human is choosing, let the AI search its answers to the likely replies in the background
+        # (after scoring the human's columns for the hover hint)
+        if (PONDER or SHOW_HINTS) and not game_over and turn == HUMAN_TURN and not pondering:
+            worker.start_pondering(board, HUMAN_TURN, ponder=PONDER, hint=SHOW_HINTS)
+            pondering = True
+        
+        # if current_player == AI_PLAYER
+        elif not game_over and turn == AI_TURN:
+            # run alpha-beta pruning algorithm with iterative deepening on the background thread: find the column
+            # to create a new AI's disc within the time budget, the loop keeps handling events meanwhile
+            if not worker.is_busy():
+                worker.start_search(board, AI_TURN)
+            result = worker.poll()
             
-            # if current_player == AI_PLAYER
-            elif not game_over and turn == AI_TURN:
-                # run alpha-beta pruning algorithm: find the column to create a new AI's disc 
-                depth = DEPTH
-                best_column, minimax_score = alpha_beta_pruning(board, depth, player_turn=turn, alpha = ALPHA, beta = BETA)
+            if result is not None:
+                best_column, minimax_score, depth = result
+                print(f"AI searched depth {depth} (pondered answers used: {worker.ponder_hits}), "
+                      f"transposition table:", transposition_table.stats())
+                print("Move ordering:", move_ordering.stats())
                 
-                if best_column >= 0 and best_column < COLS and board.is_valid_column(best_column):
+                if board.is_valid_column(best_column):
                     valid_row = board.get_next_open_row(best_column)
+                    board.place_value(valid_row, best_column, AI_TURN)
                     
-                    if valid_row >= 0 and valid_row < ROWS:
-                        board.place_value(valid_row, best_column, AI_TURN)
-                        
-                        # Redraw the entire board
-                        SCREEN.fill(WHITE)
-                        board.draw_board(SCREEN)
-                        pygame.display.update()
+                    # Redraw the new disc
+                    renderer.draw_board(board)
+                    
+                    # check if it is a winning move (only the lines through the new disc can have changed)
+                    status = board.bitboard.last_move_status()
+                    if status == WIN:
+                        print("AI player wins!")
+                        label = my_font.render("AI WINS!", 1, NAVY_BLUE)
+                        renderer.show_message(label, (150, 10))
+                        renderer.flush()
+                        if GAME_RECORDS_PATH:
+                            save_record(board, AI_TURN)
                         
-                        # check if it is a winning move
-                        if winning_move(board, AI_TURN):
-                            print("AI player wins!")
-                            SCREEN.fill(WHITE)
-                            board.draw_board(SCREEN)
-                            label = my_font.render("AI WINS!", 1, NAVY_BLUE)
-                            SCREEN.blit(label, (150, 10))
-                            pygame.display.update()
-                            
-                            game_over = True
-                            pygame.time.wait(5000)  # Wait 5 seconds
-                            board, turn, game_over = reset_game()
-                            continue
+                        game_over = True
+                        pygame.time.wait(5000)  # Wait 5 seconds
+                        board, turn, game_over = reset_game()
+                    
+                    # board filled up without a winner
+                    elif status == DRAW:
+                        print("Draw!")
+                        label = my_font.render("DRAW!", 1, BLACK)
+                        renderer.show_message(label, (200, 10))
+                        renderer.flush()
+                        if GAME_RECORDS_PATH:
+                            save_record(board, AI_TURN)
                         
-                    # switch turn
-                    turn = (turn + 1) % 2
-    
-            pygame.display.update()
+                        game_over = True
+                        pygame.time.wait(5000)  # Wait 5 seconds
+                        board, turn, game_over = reset_game()
+                    
+                    else:
+                        # switch turn
+                        turn = (turn + 1) % 2
+        
+        # the hint of the hovered column, it gets better with every depth the background analysis completes
+        if SHOW_HINTS and not game_over and turn == HUMAN_TURN:
+            renderer.show_hint(renderer.highlighted, hint_label(worker.get_hints(board, HUMAN_TURN), renderer.highlighted))
+        
+        # send only the changed rectangles to the display, at most FPS times per second
+        renderer.flush()
+        clock.tick(FPS)
 
+    worker.shutdown()
     pygame.quit()
     sys.exit()      
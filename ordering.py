@@ -0,0 +1,128 @@
+"""
+Move ordering for alpha_beta_pruning
+
+Alpha-beta prunes the most when the best column is searched first, so columns are ordered by:
+1. PV move: best column of a shallower search / the transposition table
+2. Killer moves: columns that caused a cutoff at the same ply in a sibling subtree
+3. History heuristic: how often (weighted by depth) playing on that cell caused a cutoff
+4. Static center-out order: center columns take part in more lines of 4
+
+Every heuristic can be switched off to measure how much it helps (see stats())
+"""
+from bitboard import DEFAULT_GEOMETRY, Geometry
+
+CENTER_ORDER = DEFAULT_GEOMETRY.center_order  # [3, 2, 4, 1, 5, 0, 6]
+KILLERS_PER_PLY = 2
+
+
+class MoveOrdering:
+    def __init__(self, center: bool = True, pv: bool = True, killers: bool = True, history: bool = True,
+                 geometry: Geometry = DEFAULT_GEOMETRY):
+        """
+        Args:
+            center (bool): search center columns before edge columns
+            pv (bool): search the PV/ transposition table move first
+            killers (bool): search killer moves of the same ply early
+            history (bool): order remaining columns by history heuristic score
+            geometry (Geometry): board size of the positions that will be ordered
+        """
+        self.geometry = geometry
+        self.center_order = geometry.center_order
+        self.use_center = center
+        self.use_pv = pv
+        self.use_killers = killers
+        self.use_history = history
+        self.killers = []  # killers[ply] = list of up to KILLERS_PER_PLY columns, most recent first
+        self.history = [[0] * (geometry.cols * geometry.column_height) for _ in range(2)]  # history[turn][cell bit]
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.nodes = 0  # nodes whose children were ordered
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0  # cutoffs caused by the first column searched
+
+    def stats(self):
+        """Cutoff counters since the last reset_stats
+
+        Returns:
+            dict: nodes, cutoffs, first_move_cutoffs, cutoff_rate and first_move_cutoff_rate
+        """
+        return {
+            "nodes": self.nodes,
+            "cutoffs": self.cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "cutoff_rate": self.cutoffs / self.nodes if self.nodes else 0.0,
+            "first_move_cutoff_rate": self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+        }
+
+    def new_search(self):
+        """Prepare for searching a new position: killers are ply-relative so they are dropped,
+        history is halved so it keeps a memory of earlier moves without drowning new information
+        """
+        self.killers = []
+        for table in self.history:
+            for bit in range(len(table)):
+                table[bit] >>= 1
+
+    def order(self, bitboard, columns: list, turn: int, ply: int, pv_column: int = None):
+        """Sort columns so the most promising are searched first
+
+        Args:
+            bitboard (BitBoard): position the columns are played on
+            columns (list): valid columns, left to right
+            turn (int): player to move
+            ply (int): distance from the root of the search
+            pv_column (int): column expected to be best, or None
+
+        Returns:
+            list: the same columns, reordered
+        """
+        self.nodes += 1
+        if self.use_center:
+            ordered = [col for col in self.center_order if col in columns]
+        else:
+            ordered = list(columns)
+
+        if self.use_history:
+            history = self.history[turn]
+            heights = bitboard.heights
+            ordered.sort(key=lambda col: history[heights[col]], reverse=True)  # stable, keeps center order on ties
+
+        if self.use_killers and ply < len(self.killers):
+            for killer in reversed(self.killers[ply]):
+                if killer in ordered:
+                    ordered.remove(killer)
+                    ordered.insert(0, killer)
+
+        if self.use_pv and pv_column is not None and pv_column in ordered:
+            ordered.remove(pv_column)
+            ordered.insert(0, pv_column)
+
+        return ordered
+
+    def record_cutoff(self, bitboard, column: int, turn: int, ply: int, depth: int, move_index: int):
+        """Update killers and history after a column caused a beta/ alpha cutoff
+
+        Args:
+            bitboard (BitBoard): position the column was played on (move already taken back)
+            column (int): column that caused the cutoff
+            turn (int): player who played it
+            ply (int): distance from the root of the search
+            depth (int): remaining depth, deeper cutoffs weigh more in the history table
+            move_index (int): position of the column in the ordered list
+        """
+        self.cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+
+        if self.use_killers:
+            while len(self.killers) <= ply:
+                self.killers.append([])
+            killers = self.killers[ply]
+            if column in killers:
+                killers.remove(column)
+            killers.insert(0, column)
+            del killers[KILLERS_PER_PLY:]
+
+        if self.use_history:
+            self.history[turn][bitboard.heights[column]] += depth * depth
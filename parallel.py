@@ -0,0 +1,286 @@
+"""
+Multi-core alpha-beta search: root moves are split across a process pool
+
+Every valid root column is searched by a worker process (Python threads would share one core).
+Workers share the best root score found so far through a multiprocessing.Value, and use it as their
+alpha (AI) or beta (Human) bound, so later root moves are searched with a narrower window.
+Each worker process keeps its own transposition table and move ordering between tasks, so
+iterative deepening still reuses the shallower searches. A stop event (threading.Event) of the caller
+is forwarded to the workers through a shared flag, so a running search can be aborted at any time.
+
+With workers <= 1 no pool is created and the search runs serially in this process,
+which gives the same result as engine.alpha_beta_pruning.
+
+Run `python3 parallel.py --depth 9 --workers 4` to compare speedup and search overhead against serial.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from bitboard import DEFAULT_GEOMETRY, Geometry
+from board import Board
+from constants import AI_TURN, HUMAN_TURN, ALPHA, BETA, HIGHEST_SCORE, LOWEST_SCORE, SOLVER_EMPTY_CELLS
+from engine import SearchLimits, SearchTimeout, alpha_beta_pruning, solve_endgame
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+STOP_POLL_S = 0.01  # how often the pool's caller checks its stop event while the root moves are searched
+
+# Per worker process state, set up by _init_worker
+_shared_bound = None
+_shared_stop = None
+_table = None
+_ordering = None
+
+
+def _init_worker(shared_bound, shared_stop, geometry):
+    global _shared_bound, _shared_stop, _table, _ordering
+    _shared_bound = shared_bound
+    _shared_stop = shared_stop
+    _table = TranspositionTable()
+    _ordering = MoveOrdering(geometry=geometry)
+
+
+class _StopFlag:
+    """The shared stop flag, duck-typed like the threading.Event SearchLimits polls"""
+
+    def is_set(self):
+        return bool(_shared_stop.value)
+
+
+def _search_root_move(board: Board, column: int, depth: int, player_turn: int, deadline: float):
+    """Search one root column in a worker process
+
+    Args:
+        deadline (float): time.time() by which the search must finish, or None
+            (wall-clock time, since perf_counter is not comparable across processes)
+
+    Returns:
+        tuple: (column, score or None if the time ran out, exact, nodes)
+    """
+    time_ms = None
+    if deadline is not None:
+        time_ms = (deadline - time.time()) * 1000
+        if time_ms <= 0:
+            return column, None, False, 0
+
+    board.bitboard.make_move(column, player_turn)
+    with _shared_bound.get_lock():
+        bound = _shared_bound.value
+    alpha, beta = (bound, BETA) if player_turn == AI_TURN else (ALPHA, bound)
+
+    limits = SearchLimits(time_ms, stop=_StopFlag())
+    try:
+        score = alpha_beta_pruning(board, depth - 1, 1 - player_turn, alpha, beta,
+                                   _table, limits, ordering=_ordering, ply=1)[1]
+    except SearchTimeout:
+        return column, None, False, limits.nodes
+
+    # outside the window the score is only a bound: the column is not better than the one that set it
+    exact = alpha < score < beta
+    with _shared_bound.get_lock():
+        if (player_turn == AI_TURN and score > _shared_bound.value) or \
+                (player_turn == HUMAN_TURN and score < _shared_bound.value):
+            _shared_bound.value = score
+    return column, score, exact, limits.nodes
+
+
+class ParallelSearch:
+    def __init__(self, workers: int = None, geometry: Geometry = DEFAULT_GEOMETRY):
+        """
+        Args:
+            workers (int): number of worker processes, defaults to the number of cores;
+                1 (or less) searches serially in this process
+            geometry (Geometry): board size of the positions that will be searched
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self.pool = None
+        self.shared_bound = None
+        self.shared_stop = None
+        if workers > 1:
+            # spawn instead of fork: the game forks from a process that already runs a search thread
+            context = multiprocessing.get_context("spawn")
+            self.shared_bound = context.Value("d", 0.0)
+            self.shared_stop = context.Value("b", 0)
+            self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                            initargs=(self.shared_bound, self.shared_stop, geometry))
+        else:
+            self.table = TranspositionTable()
+            self.ordering = MoveOrdering(geometry=geometry)
+        self.nodes = 0  # nodes searched by the last search/ iterative_deepening call, all workers together
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def search(self, board: Board, depth: int, player_turn: int, time_ms: float = None, pv_column: int = None,
+               stop=None):
+        """Search a position to a fixed depth
+
+        Args:
+            board (Board): board that is active, it is not modified
+            depth (int): depth of tree
+            player_turn (int): 0 if AI_TURN (Maximizer), 1 if HUMAN_TURN
+            time_ms (float): optional wall-clock budget in milliseconds
+            pv_column (int): optional column to search first
+            stop (threading.Event): optional flag another thread sets to abort the search
+
+        Returns:
+            tuple or None: (best_column, score), None if the time ran out (or stop was set) before the search completed
+        """
+        if self.pool is None:
+            limits = SearchLimits(time_ms, stop=stop)
+            try:
+                result = alpha_beta_pruning(board.copy(), depth, player_turn, ALPHA, BETA, self.table, limits,
+                                            pv_column=pv_column, ordering=self.ordering)
+            except SearchTimeout:
+                result = None
+            self.nodes += limits.nodes
+            return result
+
+        valid_columns = board.bitboard.valid_columns()
+        root_order = [col for col in board.bitboard.geometry.center_order if col in valid_columns]
+        if pv_column in root_order:
+            root_order.remove(pv_column)
+            root_order.insert(0, pv_column)
+        # a symmetric root (e.g. the empty board): mirrored columns score the same, only the first one is searched
+        if board.bitboard.is_symmetric():
+            root_order = board.bitboard.geometry.drop_mirrored(root_order)
+
+        # root moves queued behind others must still finish by the same time
+        deadline = time.time() + time_ms / 1000 if time_ms is not None else None
+        self.shared_bound.value = ALPHA if player_turn == AI_TURN else BETA
+        self.shared_stop.value = 0
+        futures = [self.pool.submit(_search_root_move, board, column, depth, player_turn, deadline)
+                   for column in root_order]
+        if stop is not None:
+            # the workers cannot see the caller's event, forward it to their shared flag
+            pending = futures
+            while pending:
+                pending = wait(pending, timeout=STOP_POLL_S)[1]
+                if pending and stop.is_set():
+                    self.shared_stop.value = 1
+                    break
+        results = [future.result() for future in futures]
+        self.nodes += sum(nodes for _, _, _, nodes in results)
+        if any(score is None for _, score, _, _ in results):
+            return None
+
+        # best score wins, then exact scores over bounds, then the earlier column in root order
+        sign = 1 if player_turn == AI_TURN else -1
+        best = max(range(len(results)),
+                   key=lambda index: (sign * results[index][1], results[index][2], -index))
+        column, score, _, _ = results[best]
+        return column, score
+
+    def iterative_deepening(self, board: Board, player_turn: int, time_ms: float = None, max_depth: int = None,
+                            book=None, stop=None):
+        """Parallel version of engine.iterative_deepening
+
+        Args:
+            stop (threading.Event): optional flag another thread sets to abort the search early,
+                checked between depths and forwarded to the workers
+
+        Returns:
+            tuple: (best_column, score, depth) of the deepest completed search, depth 0 if none completed
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        valid_columns = board.bitboard.valid_columns()
+        if not valid_columns:
+            return None, 0, 0
+        if book is not None:
+            entry = book.probe(board.bitboard, player_turn)
+            if entry is not None and (max_depth is None or entry[2] >= max_depth):
+                return entry
+        geometry = board.bitboard.geometry
+        empty_cells = geometry.size - len(board.bitboard.moves)
+        if max_depth is None or max_depth > empty_cells:
+            max_depth = empty_cells
+        if empty_cells <= SOLVER_EMPTY_CELLS and geometry is DEFAULT_GEOMETRY:
+            # exact endgame solving runs in this process
+            limits = SearchLimits(time_ms, stop=stop)
+            result = solve_endgame(board, player_turn, limits)
+            self.nodes += limits.nodes
+            if result is not None:
+                return result
+
+        best_column = min(valid_columns, key=lambda col: abs(col - geometry.cols // 2))
+        best_score = 0
+        completed_depth = 0
+        for depth in range(1, max_depth + 1):
+            if stop is not None and stop.is_set():
+                break
+            remaining_ms = None
+            if time_ms is not None:
+                remaining_ms = time_ms - (time.perf_counter() - start) * 1000
+                if remaining_ms <= 0:
+                    break
+            result = self.search(board, depth, player_turn, time_ms=remaining_ms, pv_column=best_column, stop=stop)
+            if result is None:
+                break
+            best_column, best_score = result
+            completed_depth = depth
+            if best_score == HIGHEST_SCORE or best_score == LOWEST_SCORE:
+                break
+        return best_column, best_score, completed_depth
+
+
+def compare_with_serial(board: Board, depth: int, player_turn: int, workers: int = None):
+    """Search the same position serially and in parallel (both with fresh caches)
+
+    Returns:
+        dict: times, node counts, speedup (serial time / parallel time) and
+            search overhead (extra nodes searched by the parallel search, relative to serial)
+    """
+    with ParallelSearch(workers=1) as serial:
+        start = time.perf_counter()
+        serial_result = serial.search(board, depth, player_turn)
+        serial_time = time.perf_counter() - start
+        serial_nodes = serial.nodes
+
+    with ParallelSearch(workers=workers) as parallel:
+        # warm up the pool so process start-up is not counted
+        parallel.search(board, 1, player_turn)
+        parallel.nodes = 0
+        start = time.perf_counter()
+        parallel_result = parallel.search(board, depth, player_turn)
+        parallel_time = time.perf_counter() - start
+        parallel_nodes = parallel.nodes
+        workers = parallel.workers
+
+    return {
+        "depth": depth,
+        "workers": workers,
+        "serial_result": serial_result,
+        "parallel_result": parallel_result,
+        "serial_time": serial_time,
+        "parallel_time": parallel_time,
+        "speedup": serial_time / parallel_time if parallel_time else 0.0,
+        "serial_nodes": serial_nodes,
+        "parallel_nodes": parallel_nodes,
+        "search_overhead": parallel_nodes / serial_nodes - 1 if serial_nodes else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare parallel and serial alpha-beta search on the empty board")
+    parser.add_argument("--depth", type=int, default=9)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    report = compare_with_serial(Board(), args.depth, AI_TURN, args.workers)
+    for name, value in report.items():
+        print(f"{name}: {value}")
@@ -0,0 +1,131 @@
+"""
+Game records: one game per line as a compact move string
+
+    4453623 1-0
+    44536211275 * human  # comments run to the end of the line
+
+A record is the columns played, one character per move, columns numbered from 1 ("1".."9", then "a".."z" for
+boards wider than 9 columns, so classic games read like Board.from_moves strings), optionally followed by the
+result from the first player's point of view: "1-0" (first player won), "0-1" (second player won), "1/2" (draw)
+or "*" (unfinished/ unknown), and then by who moved first: "ai" (turn 0, the default when it is left out)
+or "human" (turn 1). A record is replayed with that player moving first, so the evaluation (which is not
+symmetric between the AI and the Human) scores the game from the same side it was played.
+
+read_records also accepts the JSON lines of arena.py (their "record" field), so self-play archives can be
+analyzed directly. Files are read line by line, so archives of any size are streamed in constant memory.
+"""
+import json
+import sys
+
+from bitboard import WIN, DRAW
+from constants import AI_TURN
+
+COLUMN_CHARS = "123456789abcdefghijklmnopqrstuvwxyz"
+RESULTS = ("1-0", "0-1", "1/2", "*")
+FIRST_PLAYERS = ("ai", "human")  # indexed by the turn that moves first
+
+
+def encode_moves(columns):
+    """Move string of a list of columns (from 0)"""
+    return "".join(COLUMN_CHARS[column] for column in columns)
+
+
+def decode_moves(text: str):
+    """Columns (from 0) of a move string
+
+    Raises:
+        ValueError: a character is not a column
+    """
+    columns = []
+    for index, char in enumerate(text.lower()):
+        column = COLUMN_CHARS.find(char)
+        if column < 0:
+            raise ValueError(f"invalid column {char!r} at move {index + 1}")
+        columns.append(column)
+    return columns
+
+
+def game_result(bitboard):
+    """Result of a replayed game from the first player's point of view, "*" if it is not over"""
+    if not bitboard.moves:
+        return "*"
+    status = bitboard.last_move_status()
+    if status == WIN:
+        return "1-0" if len(bitboard.moves) % 2 else "0-1"
+    if status == DRAW:
+        return "1/2"
+    return "*"
+
+
+def format_record(columns, result: str = None, first_turn: int = AI_TURN):
+    """One record line (without newline)
+
+    Args:
+        columns (list): columns played (from 0)
+        result (str): one of RESULTS, None to leave it out
+        first_turn (int): player of the first move, only written when it is not AI_TURN
+    """
+    fields = [encode_moves(columns)]
+    if result is not None:
+        if result not in RESULTS:
+            raise ValueError(f"result must be one of {RESULTS}, got {result!r}")
+        fields.append(result)
+    if first_turn != AI_TURN:
+        fields.append(FIRST_PLAYERS[first_turn])
+    return " ".join(fields)
+
+
+def parse_record(line: str):
+    """Parse one record line
+
+    Returns:
+        tuple or None: (columns, result or None, first_turn), None for a blank or comment line
+
+    Raises:
+        ValueError: the line is not a record
+    """
+    line = line.strip()
+    if line.startswith("{"):  # arena.py JSON line, its first player always plays turn 0
+        return decode_moves(json.loads(line)["record"]), None, AI_TURN
+    line = line.split("#", 1)[0].strip()
+    if not line:
+        return None
+    fields = line.split()
+    result, first_turn = None, AI_TURN
+    rest = fields[1:]
+    if rest and rest[0] in RESULTS:
+        result = rest.pop(0)
+    if rest and rest[0].lower() in FIRST_PLAYERS:
+        first_turn = FIRST_PLAYERS.index(rest.pop(0).lower())
+    if rest:
+        raise ValueError(f"expected moves, an optional result and an optional first player, got {line!r}")
+    return decode_moves(fields[0]), result, first_turn
+
+
+def read_records(paths, on_error=None):
+    """Stream the records of one or more archive files, one line at a time
+
+    Args:
+        paths: file paths, "-" for stdin
+        on_error (callable): on_error(source, line_number, message) for a line that is not a record,
+            None to raise ValueError instead
+
+    Yields:
+        tuple: (source, line_number, columns, result or None, first_turn)
+    """
+    for path in paths:
+        file = sys.stdin if path == "-" else open(path)
+        try:
+            for line_number, line in enumerate(file, 1):
+                try:
+                    record = parse_record(line)
+                except (ValueError, KeyError) as error:
+                    if on_error is None:
+                        raise ValueError(f"{path}:{line_number}: {error}") from None
+                    on_error(path, line_number, str(error))
+                    continue
+                if record is not None:
+                    yield (path, line_number) + record
+        finally:
+            if file is not sys.stdin:
+                file.close()
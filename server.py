@@ -0,0 +1,605 @@
+"""
+Headless multi-game engine server: asyncio, line-delimited JSON over TCP or a Unix socket
+
+Every client connection can run any number of games against the AI at once. The event loop only
+parses requests and keeps the game sessions; every search goes through a bounded queue to a process
+pool (one search per worker process at a time), so the loop never blocks on a search.
+
+Protocol: one JSON object per line each way. Requests may carry an "id", which is echoed in the reply
+(replies to concurrent requests can come back out of order). Columns are numbered from 0.
+
+    {"op": "new_game", "ai_first": true, "time_ms": 300}         -> {"game": 1, "ai_move": 3, ...}
+    {"op": "new_game", "rows": 8, "cols": 9, "connect": 5}        -> {"game": 2, "ai_move": null, ...}
+    {"op": "play", "game": 1, "column": 2}                        -> {"status": "ongoing", "ai_move": 3, ...}
+    {"op": "search", "moves": [3, 3, 2], "time_ms": 100}          -> {"column": 4, "score": 300, "depth": 7, ...}
+    {"op": "close_game", "game": 1}
+    {"op": "metrics"}                                             -> queue depth, p50/ p99 move latency, games/s...
+    {"op": "ping"}
+
+Replies have "ok": true, or "ok": false and an "error" message. The human plays HUMAN_TURN and the AI AI_TURN;
+"status" is one of ongoing, human_won, ai_won and draw. Scores are from the AI's perspective, forced wins/ losses
+are written as "inf"/ "-inf".
+
+Limits:
+    - time budget: every search gets the request's time_ms (default DEFAULT_TIME_MS), capped at --max-time-ms
+    - backpressure: at most --max-queue searches wait for a worker; when the queue is full the requests wait,
+      and a client with --max-inflight requests in progress is not read from until one of them is answered
+    - cancellation: when a client disconnects its games are dropped, its queued searches are skipped and its
+      running searches are stopped through a flag the worker's SearchLimits checks (every 256 nodes)
+
+Usage:
+    python3 server.py --port 4334 --workers 4
+    python3 server.py --unix /tmp/connect4.sock
+    python3 server.py --simulate 16 --games 2     # local load test: server + 16 random clients, then metrics
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import BitBoard, ONGOING, WIN, DRAW, get_geometry
+from board import Board
+from constants import AI_TURN, HUMAN_TURN, ROWS, COLS, CONNECT, OPENING_BOOK_PATH
+from engine import SearchLimits, iterative_deepening
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+DEFAULT_PORT = 4334
+DEFAULT_TIME_MS = 200
+MAX_TIME_MS = 5000
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_MAX_INFLIGHT = 8  # requests of one client in progress at once
+MAX_CELLS = 400  # largest board a game may ask for
+LATENCY_SAMPLES = 1000  # move latencies kept for the percentiles
+WORKER_TABLE_ENTRIES = 1 << 16
+
+# Per worker process state, set up by _init_worker
+_cancel_flags = None
+_caches = {}  # geometry -> (TranspositionTable, MoveOrdering), shared by the games searched in this process
+_book = None
+
+
+def _init_worker(cancel_flags, book_path: str):
+    global _cancel_flags, _book
+    _cancel_flags = cancel_flags
+    if book_path and os.path.exists(book_path):
+        from book import OpeningBook
+        _book = OpeningBook(book_path)
+
+
+class _CancelFlag:
+    """Stop flag of one dispatcher slot, duck-typed like the threading.Event SearchLimits polls"""
+
+    def __init__(self, slot: int):
+        self.slot = slot
+
+    def is_set(self):
+        return bool(_cancel_flags[self.slot])
+
+
+def _search_job(slot: int, shape: tuple, first_turn: int, moves: list, turn: int, time_ms: float, max_depth: int):
+    """Search a position in a worker process
+
+    Args:
+        slot (int): dispatcher slot, its cancel flag stops the search
+        shape (tuple): (rows, cols, connect) of the board
+        first_turn (int): player of the first move
+        moves (list): columns played so far
+        turn (int): player to move
+        time_ms (float): time budget
+        max_depth (int): deepest depth to search, None for no limit
+
+    Returns:
+        tuple: (best_column, score, depth, nodes)
+    """
+    geometry = get_geometry(*shape)
+    bitboard = BitBoard(geometry=geometry)
+    player = first_turn
+    for column in moves:
+        bitboard.make_move(column, player)
+        player = 1 - player
+    if geometry not in _caches:
+        _caches[geometry] = (TranspositionTable(WORKER_TABLE_ENTRIES), MoveOrdering(geometry=geometry))
+    table, ordering = _caches[geometry]
+    limits = SearchLimits(time_ms, stop=_CancelFlag(slot))
+    column, score, depth = iterative_deepening(Board(bitboard), turn, max_depth=max_depth, table=table,
+                                               ordering=ordering, limits=limits, book=_book)
+    return column, score, depth, limits.nodes
+
+
+def _score(score: float):
+    # JSON has no infinity, forced wins/ losses are written as "inf"/ "-inf"
+    return score if math.isfinite(score) else str(score)
+
+
+def _percentile(samples: list, percent: float):
+    """Nearest-rank percentile of unsorted samples, 0.0 without samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(percent / 100 * len(ordered)) - 1))]
+
+
+class RequestError(Exception):
+    """A request that cannot be served, its message is sent back to the client"""
+
+
+class SearchJob:
+    def __init__(self, shape: tuple, first_turn: int, moves: list, turn: int, time_ms: float, max_depth: int = None):
+        """One search waiting in the queue, future gets (best_column, score, depth, nodes)"""
+        self.args = (shape, first_turn, list(moves), turn, time_ms, max_depth)
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class GameSession:
+    def __init__(self, game_id: int, geometry, first_turn: int, time_ms: float, client: int):
+        """One game between a client (HUMAN_TURN) and the AI (AI_TURN)"""
+        self.game_id = game_id
+        self.bitboard = BitBoard(geometry=geometry)
+        self.first_turn = first_turn
+        self.turn = first_turn
+        self.time_ms = time_ms
+        self.client = client
+        self.status = "ongoing"
+        self.busy = False  # a request of this game is in progress
+
+    @property
+    def shape(self):
+        geometry = self.bitboard.geometry
+        return geometry.rows, geometry.cols, geometry.connect
+
+    def play(self, column: int):
+        """Play a column for the side to move and update the status"""
+        self.bitboard.make_move(column, self.turn)
+        status = self.bitboard.last_move_status()
+        if status == WIN:
+            self.status = "ai_won" if self.turn == AI_TURN else "human_won"
+        elif status == DRAW:
+            self.status = "draw"
+        self.turn = 1 - self.turn
+
+
+class ServerMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.searches = 0
+        self.cancelled = 0  # searches dropped or stopped because their client went away
+        self.games_started = 0
+        self.games_finished = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # ms from a move request to its answer, queue wait included
+        self.search_ms = deque(maxlen=LATENCY_SAMPLES)  # ms of the searches themselves
+
+    def snapshot(self, queue_depth: int, running: int, sessions: int):
+        uptime = time.perf_counter() - self.started
+        latencies, search_ms = list(self.latencies), list(self.search_ms)
+        return {
+            "uptime_s": round(uptime, 3),
+            "connections": self.connections,
+            "sessions": sessions,
+            "queue_depth": queue_depth,
+            "running": running,
+            "requests": self.requests,
+            "errors": self.errors,
+            "searches": self.searches,
+            "cancelled": self.cancelled,
+            "games_started": self.games_started,
+            "games_finished": self.games_finished,
+            "games_per_s": round(self.games_finished / uptime, 3) if uptime else 0.0,
+            "latency_p50_ms": round(_percentile(latencies, 50), 3),
+            "latency_p99_ms": round(_percentile(latencies, 99), 3),
+            "search_p50_ms": round(_percentile(search_ms, 50), 3),
+            "search_p99_ms": round(_percentile(search_ms, 99), 3),
+        }
+
+
+class EngineServer:
+    def __init__(self, workers: int = None, max_queue: int = DEFAULT_MAX_QUEUE, max_inflight: int = DEFAULT_MAX_INFLIGHT,
+                 max_time_ms: float = MAX_TIME_MS, book_path: str = OPENING_BOOK_PATH):
+        """
+        Args:
+            workers (int): search processes, defaults to the number of cores
+            max_queue (int): searches allowed to wait for a worker, further requests wait to be queued
+            max_inflight (int): requests of one client in progress at once, the client is not read beyond that
+            max_time_ms (float): cap on the time budget a request may ask for
+            book_path (str): opening book used by the workers if the file exists
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.max_inflight = max_inflight
+        self.max_time_ms = max_time_ms
+        self.book_path = book_path
+        self.metrics = ServerMetrics()
+        self.sessions = {}  # game id -> GameSession
+        self.game_ids = itertools.count(1)
+        self.client_ids = itertools.count(1)
+        self.running = 0
+        self.queue = None
+        self.pool = None
+        self.dispatchers = []
+
+    async def start(self):
+        """Start the worker pool and the dispatchers, call before serving clients"""
+        # spawn like parallel.py: forking a process that runs an event loop (and maybe threads) is unsafe
+        context = multiprocessing.get_context("spawn")
+        self.cancel_flags = context.Array("b", self.workers, lock=False)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                                        initargs=(self.cancel_flags, self.book_path))
+        self.queue = asyncio.Queue(self.max_queue)
+        self.metrics.started = time.perf_counter()
+        self.dispatchers = [asyncio.create_task(self._dispatch(slot)) for slot in range(self.workers)]
+
+    async def close(self):
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        for slot in range(self.workers):
+            self.cancel_flags[slot] = 1
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    async def _dispatch(self, slot: int):
+        """Feed queued searches to the pool, one at a time per slot, so the pool never queues work itself
+        and every running search has a cancel flag of its own"""
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            if job.future.cancelled():  # the client went away while the job was queued
+                self.metrics.cancelled += 1
+                continue
+            self.running += 1
+            start = time.perf_counter()
+            search = asyncio.wrap_future(self.pool.submit(_search_job, slot, *job.args), loop=loop)
+            try:
+                await asyncio.wait({search, job.future}, return_when=asyncio.FIRST_COMPLETED)
+                if not search.done():  # cancelled while running: stop the worker, then free the slot
+                    self.cancel_flags[slot] = 1
+                    await asyncio.gather(search, return_exceptions=True)
+                    self.metrics.cancelled += 1
+                elif not job.future.done():
+                    if search.exception() is not None:
+                        job.future.set_exception(search.exception())
+                    else:
+                        job.future.set_result(search.result())
+                self.metrics.searches += 1
+                self.metrics.search_ms.append((time.perf_counter() - start) * 1000)
+            finally:
+                self.cancel_flags[slot] = 0
+                self.running -= 1
+
+    async def _search(self, job: SearchJob):
+        """Queue a search and wait for its result, blocks while the queue is full (backpressure)"""
+        await self.queue.put(job)
+        return await job.future
+
+    def _time_ms(self, request: dict, default: float):
+        time_ms = request.get("time_ms", default)
+        if isinstance(time_ms, bool) or not isinstance(time_ms, (int, float)) or not math.isfinite(time_ms) \
+                or time_ms <= 0:
+            raise RequestError("time_ms must be a positive number")
+        return min(time_ms, self.max_time_ms)
+
+    def _geometry(self, request: dict):
+        # checked before get_geometry: building the tables of a huge board would block the event loop,
+        # and every geometry built stays cached
+        shape = request.get("rows", ROWS), request.get("cols", COLS), request.get("connect", CONNECT)
+        if any(isinstance(value, bool) or not isinstance(value, int) for value in shape):
+            raise RequestError("rows, cols and connect must be integers")
+        rows, cols, connect = shape
+        if rows < 1 or cols < 1 or rows * cols > MAX_CELLS:
+            raise RequestError(f"boards are limited to {MAX_CELLS} cells")
+        if not 2 <= connect <= max(rows, cols):
+            raise RequestError(f"no line of {connect} fits on a {rows}x{cols} board")
+        return get_geometry(rows, cols, connect)
+
+    def _session(self, request: dict, client: int):
+        game = request.get("game")
+        if isinstance(game, bool) or not isinstance(game, int):
+            raise RequestError(f"game must be a game id, got {game!r}")
+        session = self.sessions.get(game)
+        if session is None or session.client != client:
+            raise RequestError(f"no game {request.get('game')!r}")
+        return session
+
+    async def _ai_move(self, session: GameSession):
+        """Search and play the AI move of a session
+
+        Returns:
+            dict: ai_move, score, depth and nodes of the search
+        """
+        job = SearchJob(session.shape, session.first_turn, session.bitboard.moves, AI_TURN, session.time_ms)
+        column, score, depth, nodes = await self._search(job)
+        session.play(column)
+        return {"ai_move": column, "score": _score(score), "depth": depth, "nodes": nodes}
+
+    def _finish(self, session: GameSession):
+        if session.status != "ongoing":
+            self.metrics.games_finished += 1
+
+    async def _new_game(self, request: dict, client: int):
+        geometry = self._geometry(request)
+        first_turn = AI_TURN if request.get("ai_first") else HUMAN_TURN
+        session = GameSession(next(self.game_ids), geometry, first_turn,
+                              self._time_ms(request, DEFAULT_TIME_MS), client)
+        self.sessions[session.game_id] = session
+        self.metrics.games_started += 1
+        reply = {"game": session.game_id, "ai_move": None}
+        if first_turn == AI_TURN:
+            session.busy = True
+            try:
+                reply.update(await self._ai_move(session))
+            finally:
+                session.busy = False
+        reply["status"] = session.status
+        return reply
+
+    async def _play(self, request: dict, client: int):
+        session = self._session(request, client)
+        if session.busy:
+            raise RequestError(f"game {session.game_id} is waiting for the AI")
+        if session.status != "ongoing":
+            raise RequestError(f"game {session.game_id} is over ({session.status})")
+        column = request.get("column")
+        if not isinstance(column, int) or not 0 <= column < session.bitboard.geometry.cols \
+                or not session.bitboard.can_play(column):
+            raise RequestError(f"column {column!r} cannot be played")
+
+        session.busy = True
+        try:
+            session.play(column)
+            reply = {"ai_move": None}
+            if session.status == "ongoing":
+                reply.update(await self._ai_move(session))
+        finally:
+            session.busy = False
+        self._finish(session)
+        reply["status"] = session.status
+        return reply
+
+    async def _search_request(self, request: dict):
+        geometry = self._geometry(request)
+        moves = request.get("moves", [])
+        first_turn = request.get("first_turn", AI_TURN)
+        max_depth = request.get("depth")
+        if first_turn not in (AI_TURN, HUMAN_TURN):
+            raise RequestError("first_turn must be 0 (AI) or 1 (Human)")
+        if max_depth is not None and (not isinstance(max_depth, int) or max_depth < 1):
+            raise RequestError("depth must be a positive integer")
+
+        # replay here, so the workers only get valid positions
+        bitboard = BitBoard(geometry=geometry)
+        turn = first_turn
+        if not isinstance(moves, list):
+            raise RequestError("moves must be a list of columns")
+        for index, column in enumerate(moves):
+            if bitboard.moves and bitboard.last_move_status() != ONGOING:
+                raise RequestError(f"move {index + 1} is played after the game is over")
+            if not isinstance(column, int) or not 0 <= column < geometry.cols or not bitboard.can_play(column):
+                raise RequestError(f"move {index + 1}: column {column!r} cannot be played")
+            bitboard.make_move(column, turn)
+            turn = 1 - turn
+        if not bitboard.valid_columns() or (bitboard.moves and bitboard.last_move_status() != ONGOING):
+            raise RequestError("the game is already over")
+
+        job = SearchJob((geometry.rows, geometry.cols, geometry.connect), first_turn, moves, turn,
+                        self._time_ms(request, DEFAULT_TIME_MS), max_depth)
+        column, score, depth, nodes = await self._search(job)
+        return {"column": column, "score": _score(score), "depth": depth, "nodes": nodes}
+
+    async def handle(self, request: dict, client: int):
+        """Serve one request
+
+        Returns:
+            dict: reply fields, "ok" and "id" are added by the caller
+        """
+        op = request.get("op")
+        start = time.perf_counter()
+        if op == "ping":
+            return {}
+        if op == "metrics":
+            return self.metrics.snapshot(self.queue.qsize(), self.running, len(self.sessions))
+        if op == "new_game":
+            reply = await self._new_game(request, client)
+        elif op == "play":
+            reply = await self._play(request, client)
+        elif op == "search":
+            reply = await self._search_request(request)
+        elif op == "close_game":
+            self._session(request, client)
+            del self.sessions[request["game"]]
+            return {}
+        else:
+            raise RequestError(f"unknown op {op!r}")
+        self.metrics.latencies.append((time.perf_counter() - start) * 1000)
+        return reply
+
+    async def _serve_line(self, line: bytes, client: int, writer: asyncio.StreamWriter, write_lock: asyncio.Lock,
+                          slots: asyncio.Semaphore):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("a request must be a JSON object")
+            request_id = request.get("id")
+            reply = {"ok": True, **await self.handle(request, client)}
+        except (RequestError, json.JSONDecodeError, UnicodeDecodeError) as error:
+            self.metrics.errors += 1
+            reply = {"ok": False, "error": str(error)}
+        except Exception as error:  # a bug in one request must not end the client's connection
+            self.metrics.errors += 1
+            reply = {"ok": False, "error": f"internal error: {type(error).__name__}: {error}"}
+        finally:
+            slots.release()
+        self.metrics.requests += 1
+        if request_id is not None:
+            reply["id"] = request_id
+        async with write_lock:
+            writer.write(json.dumps(reply).encode() + b"\n")
+            await writer.drain()  # a client that does not read its replies stops being served
+
+    @staticmethod
+    async def _readline(reader: asyncio.StreamReader):
+        """Next request line, b"" once the client is gone (EOF, reset or a line over the stream limit)"""
+        try:
+            return await reader.readline()
+        except (ConnectionError, ValueError):
+            return b""
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Connection handler for asyncio.start_server/ start_unix_server"""
+        client = next(self.client_ids)
+        self.metrics.connections += 1
+        tasks = set()
+        write_lock = asyncio.Lock()
+        slots = asyncio.Semaphore(self.max_inflight)
+        next_line = asyncio.create_task(self._readline(reader))
+        try:
+            while True:
+                line = await next_line
+                if not line:
+                    break
+                # while the client has max_inflight requests in progress nothing more is read (backpressure),
+                # except one line ahead, so a disconnect is noticed without waiting for a slot
+                next_line = asyncio.create_task(self._readline(reader))
+                if not line.strip():
+                    continue
+                acquire = asyncio.create_task(slots.acquire())
+                await asyncio.wait({acquire, next_line}, return_when=asyncio.FIRST_COMPLETED)
+                if not acquire.done():
+                    if not next_line.result():
+                        acquire.cancel()
+                        break
+                    await acquire
+                task = asyncio.create_task(self._serve_line(line, client, writer, write_lock, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            # disconnect: cancel the requests in progress (and with them their searches), drop the games
+            next_line.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(next_line, *tasks, return_exceptions=True)
+            for game_id in [game_id for game_id, session in self.sessions.items() if session.client == client]:
+                del self.sessions[game_id]
+            self.metrics.connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+async def _report(server: EngineServer, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        print(json.dumps(server.metrics.snapshot(server.queue.qsize(), server.running, len(server.sessions))))
+
+
+async def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, unix_path: str = None, metrics_interval: float = None,
+                **options):
+    """Run a server until cancelled, options are passed to EngineServer"""
+    server = EngineServer(**options)
+    await server.start()
+    if unix_path is not None:
+        listener = await asyncio.start_unix_server(server.serve_client, unix_path)
+        print(f"serving on {unix_path} with {server.workers} workers")
+    else:
+        listener = await asyncio.start_server(server.serve_client, host, port)
+        print(f"serving on {host}:{port} with {server.workers} workers")
+    reporter = asyncio.create_task(_report(server, metrics_interval)) if metrics_interval else None
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        await server.close()
+
+
+async def _random_client(host: str, port: int, games: int, time_ms: float, seed: int):
+    """Play games with random moves, return the number of games finished"""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def request(**fields):
+        writer.write(json.dumps(fields).encode() + b"\n")
+        await writer.drain()
+        reply = json.loads(await reader.readline())
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    finished = 0
+    columns = list(range(COLS))
+    for _ in range(games):
+        reply = await request(op="new_game", ai_first=rng.random() < 0.5, time_ms=time_ms)
+        game = reply["game"]
+        heights = [0] * COLS
+        if reply["ai_move"] is not None:
+            heights[reply["ai_move"]] += 1
+        while reply["status"] == "ongoing":
+            column = rng.choice([col for col in columns if heights[col] < ROWS])
+            heights[column] += 1
+            reply = await request(op="play", game=game, column=column)
+            if reply["ai_move"] is not None:
+                heights[reply["ai_move"]] += 1
+        await request(op="close_game", game=game)
+        finished += 1
+    writer.close()
+    await writer.wait_closed()
+    return finished
+
+
+async def simulate(clients: int, games: int, time_ms: float, **options):
+    """Start a server on a free local port, play random clients against it and return its metrics"""
+    server = EngineServer(**options)
+    await server.start()
+    listener = await asyncio.start_server(server.serve_client, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        await asyncio.gather(*(_random_client("127.0.0.1", port, games, time_ms, seed) for seed in range(clients)))
+        return server.metrics.snapshot(server.queue.qsize(), server.running, len(server.sessions))
+    finally:
+        listener.close()
+        await listener.wait_closed()
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve many games against the AI over line-delimited JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="search processes (default: all cores)")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="searches waiting for a worker")
+    parser.add_argument("--max-inflight", type=int, default=DEFAULT_MAX_INFLIGHT, help="requests in progress per client")
+    parser.add_argument("--max-time-ms", type=float, default=MAX_TIME_MS, help="cap on a request's time budget")
+    parser.add_argument("--book", default=OPENING_BOOK_PATH, help="opening book, used if the file exists")
+    parser.add_argument("--metrics-interval", type=float, default=None, help="print metrics every this many seconds")
+    parser.add_argument("--simulate", type=int, metavar="CLIENTS", help="run random clients against a local server")
+    parser.add_argument("--games", type=int, default=1, help="games per simulated client")
+    parser.add_argument("--time-ms", type=float, default=50, help="time budget of the simulated clients' games")
+    args = parser.parse_args()
+
+    options = {"workers": args.workers, "max_queue": args.max_queue, "max_inflight": args.max_inflight,
+               "max_time_ms": args.max_time_ms, "book_path": args.book}
+    if args.simulate:
+        metrics = asyncio.run(simulate(args.simulate, args.games, args.time_ms, **options))
+        print(json.dumps(metrics, indent=2))
+        return
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.metrics_interval, **options))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
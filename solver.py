@@ -0,0 +1,246 @@
+"""
+Exact endgame solver: negamax with null-window probes
+
+With few empty cells left the game can be solved outright instead of estimated with the heuristic
+evaluation. The solver works on raw bitboards (no incremental evaluation), from the point of view of
+the player to move:
+
+    score > 0: the player to move wins, the larger the sooner (score = number of own discs left unplayed
+               when the winning disc is dropped, + 1)
+    score < 0: the player to move loses, -score the same count for the opponent
+    score = 0: draw
+
+The exact score is found by bisecting the score range with null-window searches (alpha, alpha + 1),
+which prune much more than one full-window search. Inside the search, moves that let the opponent win
+at once are never played, forced blocks are played directly, and the remaining moves are tried in order
+of the threats they create (center first on ties). Upper bounds are cached per position.
+
+engine.iterative_deepening switches to the solver automatically once SOLVER_EMPTY_CELLS cells or fewer are empty.
+
+Usage:
+    python3 solver.py 4453                   # solve the position after these moves (columns from 1)
+    python3 solver.py 4453 --time-ms 5000    # give up after 5 seconds
+"""
+import time
+
+from bitboard import BitBoard, BOTTOM_MASK, BOARD_MASK, COLUMN_HEIGHT, COLUMN_MASK, ONGOING, is_win
+from board import Board
+from constants import ROWS, COLS
+from ordering import CENTER_ORDER
+
+SIZE = ROWS * COLS
+DEFAULT_MAX_ENTRIES = 1 << 20
+COLUMN_MASKS = [(COLUMN_MASK >> 1) << (col * COLUMN_HEIGHT) for col in range(COLS)]  # playable cells of each column
+
+
+def winning_cells(position: int, mask: int):
+    """Empty cells where a player would connect 4
+
+    Args:
+        position (int): bitboard of the player
+        mask (int): bitboard of every occupied cell
+
+    Returns:
+        int: bitboard of the winning cells (playable now or later)
+    """
+    # vertical: 3 discs right below
+    cells = (position << 1) & (position << 2) & (position << 3)
+    # horizontal and both diagonals: the empty cell at either end of 3, or in the gap of 2 + 1
+    for shift in (COLUMN_HEIGHT, COLUMN_HEIGHT - 1, COLUMN_HEIGHT + 1):
+        pair = (position << shift) & (position << 2 * shift)
+        cells |= pair & (position << 3 * shift)
+        cells |= pair & (position >> shift)
+        pair = (position >> shift) & (position >> 2 * shift)
+        cells |= pair & (position << shift)
+        cells |= pair & (position >> 3 * shift)
+    return cells & (BOARD_MASK ^ mask)
+
+
+def outcome(score: int, moves: int):
+    """Translate a solver score into a result for the player to move
+
+    Args:
+        score (int): solver score of the position
+        moves (int): number of discs on the board
+
+    Returns:
+        tuple: ("win" | "loss" | "draw", plies until the game ends with perfect play, the winning move included)
+    """
+    if score == 0:
+        return "draw", SIZE - moves
+    # the winner's winning disc is dropped after `last` discs, with `last` the parity of the winner's turns
+    winner_moves = moves if score > 0 else moves + 1
+    last = SIZE + 1 - 2 * abs(score)
+    if (last - winner_moves) % 2:
+        last -= 1
+    return ("win" if score > 0 else "loss"), last - moves + 1
+
+
+class Solver:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            max_entries (int): the upper bound cache is cleared when it grows past this
+        """
+        self.table = {}  # current + mask (unique per position and side to move) -> upper bound of the score
+        self.max_entries = max_entries
+        self.nodes = 0
+
+    def negamax(self, current: int, mask: int, moves: int, alpha: int, beta: int, limits=None):
+        """Score of a position where the player to move cannot win at once, within (alpha, beta)
+
+        Args:
+            current (int): bitboard of the player to move
+            mask (int): bitboard of every occupied cell
+            moves (int): number of discs on the board
+            alpha (int): lower bound of the window
+            beta (int): upper bound of the window
+            limits (SearchLimits): optional budget, SearchTimeout is raised when it runs out
+
+        Returns:
+            int: the exact score if it is inside the window, otherwise a bound on the same side of the window
+        """
+        self.nodes += 1
+        if limits is not None:
+            limits.check()
+
+        opponent = current ^ mask
+        possible = (mask + BOTTOM_MASK) & BOARD_MASK
+        opponent_wins = winning_cells(opponent, mask)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):  # two cells to block at once: lost on the next move
+                return -((SIZE - moves) // 2)
+            possible = forced
+        # never play right below a cell where the opponent would connect 4
+        candidates = possible & ~(opponent_wins >> 1)
+        if not candidates:
+            return -((SIZE - moves) // 2)
+        if moves >= SIZE - 2:  # nobody can win any more
+            return 0
+
+        # the opponent cannot win on the next move, so the worst case is losing later
+        min_score = -((SIZE - 2 - moves) // 2)
+        if alpha < min_score:
+            alpha = min_score
+            if alpha >= beta:
+                return alpha
+        # we cannot win on this move (checked by the caller), so the best case is winning on the next one
+        max_score = (SIZE - 1 - moves) // 2
+        key = current + mask
+        upper = self.table.get(key)
+        if upper is not None and upper < max_score:
+            max_score = upper
+        if beta > max_score:
+            beta = max_score
+            if alpha >= beta:
+                return beta
+
+        # moves creating the most threats first, center first on ties (sorted is stable)
+        ordered = []
+        for col in CENTER_ORDER:
+            move = candidates & COLUMN_MASKS[col]
+            if move:
+                ordered.append((bin(winning_cells(current | move, mask)).count("1"), move))
+        ordered.sort(key=lambda item: -item[0])
+
+        for _, move in ordered:
+            score = -self.negamax(opponent, mask | move, moves + 1, -beta, -alpha, limits)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+
+        if len(self.table) >= self.max_entries:
+            self.table.clear()
+        self.table[key] = alpha
+        return alpha
+
+    def _solve(self, current: int, mask: int, moves: int, limits=None):
+        """Exact score by bisecting the score range with null-window searches
+        (the player to move must not be able to win at once)"""
+        low = -((SIZE - moves) // 2)
+        high = (SIZE + 1 - moves) // 2
+        while low < high:
+            middle = low + (high - low) // 2
+            # probe closer to 0 first, most positions are decided by a small margin
+            if middle <= 0 and -(-low // 2) < middle:
+                middle = -(-low // 2)
+            elif middle >= 0 and high // 2 > middle:
+                middle = high // 2
+            score = self.negamax(current, mask, moves, middle, middle + 1, limits)
+            if score <= middle:
+                high = score
+            else:
+                low = score
+        return low
+
+    def solve(self, bitboard: BitBoard, turn: int, limits=None):
+        """Solve a position that is not over yet
+
+        Args:
+            bitboard (BitBoard): position to solve, it is not modified
+            turn (int): player to move
+            limits (SearchLimits): optional budget, SearchTimeout is raised when it runs out
+
+        Returns:
+            tuple: (best_column, score) with the score from turn's point of view, see outcome()
+        """
+        current = bitboard.bits[turn]
+        mask = bitboard.bits[0] | bitboard.bits[1]
+        moves = len(bitboard.moves)
+        columns = [col for col in CENTER_ORDER if bitboard.can_play(col)]
+
+        # winning at once is not handled by negamax
+        for col in columns:
+            if is_win(current | (1 << bitboard.heights[col])):
+                return col, (SIZE + 1 - moves) // 2
+
+        # a null window at the best score so far tells if another column is better, only then it is solved exactly
+        best_column, best_score = None, None
+        for col in columns:
+            child_current, child_mask = current ^ mask, mask | (1 << bitboard.heights[col])
+            if winning_cells(child_current, child_mask) & (child_mask + BOTTOM_MASK) & BOARD_MASK:
+                score = -((SIZE - moves) // 2)  # the opponent wins on the next move
+            elif best_score is None:
+                score = -self._solve(child_current, child_mask, moves + 1, limits)
+            else:
+                score = -self.negamax(child_current, child_mask, moves + 1, -best_score - 1, -best_score, limits)
+                if score > best_score:
+                    score = -self._solve(child_current, child_mask, moves + 1, limits)
+            if best_score is None or score > best_score:
+                best_column, best_score = col, score
+        return best_column, best_score
+
+
+def main():
+    # the engine imports this module, so the command line only costs anything when it runs
+    import argparse
+    from engine import SearchLimits, SearchTimeout
+
+    parser = argparse.ArgumentParser(description="Solve a Connect 4 position exactly")
+    parser.add_argument("moves", nargs="?", default="", help="moves played so far, one digit per move, columns from 1")
+    parser.add_argument("--time-ms", type=float, default=None, help="give up after this many milliseconds")
+    args = parser.parse_args()
+
+    board = Board.from_moves(args.moves)
+    bitboard = board.bitboard
+    if bitboard.moves and bitboard.last_move_status() != ONGOING:
+        parser.error("the game is already over")
+    turn = len(args.moves) % 2
+    solver = Solver()
+    limits = SearchLimits(args.time_ms)
+    start = time.perf_counter()
+    try:
+        column, score = solver.solve(bitboard, turn, limits)
+    except SearchTimeout:
+        print(f"not solved within {args.time_ms:.0f} ms ({solver.nodes} nodes)")
+        return
+    elapsed = time.perf_counter() - start
+    result, plies = outcome(score, len(bitboard.moves))
+    print(f"{result} in {plies} plies for the player to move, best column {column + 1} (score {score})")
+    print(f"{solver.nodes} nodes in {elapsed * 1000:.1f} ms ({solver.nodes / elapsed if elapsed else 0:.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
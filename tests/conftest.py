@@ -0,0 +1,46 @@
+import os
+import random
+import sys
+
+import pytest
+
+# the modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitboard import BitBoard, ONGOING  # noqa: E402
+
+
+def play_random(bitboard, plies: int, rng: random.Random, turn: int = 0):
+    """Play up to plies random moves that do not end the game, fewer if every move would end it
+
+    Returns:
+        int: player to move
+    """
+    for _ in range(plies):
+        columns = bitboard.valid_columns()
+        rng.shuffle(columns)
+        for column in columns:
+            bitboard.make_move(column, turn)
+            if bitboard.last_move_status() == ONGOING:
+                break
+            bitboard.unmake_move()
+        else:
+            break
+        turn = 1 - turn
+    return turn
+
+
+@pytest.fixture
+def random_positions():
+    """random_positions(count, seed, geometry=None, min_plies=0, max_plies=None): list of (bitboard, turn),
+    none of them over"""
+    def make(count, seed, geometry=None, min_plies=0, max_plies=None):
+        rng = random.Random(seed)
+        positions = []
+        for _ in range(count):
+            bitboard = BitBoard(geometry=geometry)
+            top = bitboard.geometry.size - 1 if max_plies is None else max_plies
+            turn = play_random(bitboard, rng.randint(min_plies, top), rng)
+            positions.append((bitboard, turn))
+        return positions
+    return make
@@ -0,0 +1,65 @@
+import pytest
+
+from analysis import analyze, principal_variation, EXACT, UPPER, LOWER
+from board import Board
+from constants import ALPHA, BETA
+from engine import alpha_beta_pruning
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+DEPTH = 5
+
+
+def column_score(bitboard, column: int, turn: int, depth: int):
+    """Score of one root column from its own full-window search, no shared table or ordering"""
+    child = bitboard.copy()
+    child.make_move(column, turn)
+    return alpha_beta_pruning(Board(child), depth - 1, 1 - turn, ALPHA, BETA)[1]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_multi_pv_matches_separate_searches(seed, random_positions):
+    for bitboard, turn in random_positions(8, seed, max_plies=20):
+        lines, depth = analyze(Board(bitboard.copy()), turn, max_depth=DEPTH, ordering=MoveOrdering())
+        assert 1 <= depth <= DEPTH  # stops early once every column is a forced win/ loss
+        assert sorted(line["column"] for line in lines) == bitboard.valid_columns()
+        for line in lines:
+            assert line["bound"] == EXACT
+            assert line["score"] == column_score(bitboard, line["column"], turn, depth), (bitboard.moves, line)
+            assert line["pv"][0] == line["column"]
+        # best first for the player to move
+        scores = [line["score"] for line in lines]
+        assert scores == sorted(scores, reverse=turn == 0)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_top_k_bounds_hold(seed, random_positions):
+    for bitboard, turn in random_positions(8, seed + 10, max_plies=20):
+        top = analyze(Board(bitboard.copy()), turn, max_depth=DEPTH, top_k=2)[0]
+        full = analyze(Board(bitboard.copy()), turn, max_depth=DEPTH)[0]
+        assert [line["score"] for line in top[:2]] == [line["score"] for line in full[:2]]
+        for line in top:
+            score = column_score(bitboard, line["column"], turn, DEPTH)
+            assert {EXACT: score == line["score"], UPPER: score <= line["score"],
+                    LOWER: score >= line["score"]}[line["bound"]], (bitboard.moves, line, score)
+
+
+def test_symmetric_position_mirrors_scores():
+    lines = {line["column"]: line for line in analyze(Board(), 0, max_depth=4)[0]}
+    for column in range(3):
+        assert lines[column]["score"] == lines[6 - column]["score"]
+        assert lines[6 - column]["pv"] == [6 - col for col in lines[column]["pv"]]
+
+
+def test_principal_variation_leaves_the_board_unchanged():
+    board = Board.from_moves("4453")
+    table = TranspositionTable()
+    lines = analyze(board, 0, max_depth=6, table=table)[0]
+    moves = list(board.bitboard.moves)
+    pv = principal_variation(board.bitboard, lines[0]["column"], 0, table, 6)
+    assert board.bitboard.moves == moves
+    assert pv == lines[0]["pv"]
+
+
+def test_game_over_has_no_lines():
+    assert analyze(Board.from_moves("1212121"), 1, max_depth=3) == ([], 0)
@@ -0,0 +1,38 @@
+import pytest
+
+from bitboard import BitBoard, get_geometry
+from board import Board
+from constants import AI_TURN
+
+GEOMETRIES = [get_geometry(), get_geometry(5, 6, 3), get_geometry(8, 9, 5)]
+
+
+@pytest.mark.parametrize("geometry", GEOMETRIES, ids=repr)
+def test_mirror_hash_is_hash_of_mirrored_position(geometry, random_positions):
+    last_column = geometry.cols - 1
+    for bitboard, turn in random_positions(50, 2, geometry):
+        mirror = BitBoard(geometry=geometry)
+        player = AI_TURN
+        for column in bitboard.moves:
+            mirror.make_move(last_column - column, player)
+            player = 1 - player
+        assert bitboard.mirror_hash == mirror.hash
+        assert mirror.mirror_hash == bitboard.hash
+        assert bitboard.canonical_key(turn)[0] == mirror.canonical_key(turn)[0]
+        assert bitboard.is_symmetric() == (bitboard.hash == mirror.hash)
+
+
+def test_canonical_key_flags_the_mirrored_side():
+    bitboard = Board.from_moves("12").bitboard
+    mirror = Board.from_moves("76").bitboard
+    (key, mirrored), (mirror_key, mirror_mirrored) = bitboard.canonical_key(0), mirror.canonical_key(0)
+    assert key == mirror_key
+    assert mirrored != mirror_mirrored
+    assert bitboard.canonical_key(0)[0] != bitboard.canonical_key(1)[0]
+
+
+def test_symmetric_positions():
+    assert BitBoard().is_symmetric()
+    assert Board.from_moves("44").bitboard.is_symmetric()
+    assert not Board.from_moves("43").bitboard.is_symmetric()
+    assert Board.from_moves("1726").bitboard.is_symmetric() is False  # mirrored columns, swapped colors
@@ -0,0 +1,69 @@
+import pytest
+
+from bitboard import BitBoard, get_geometry
+from board import Board
+from book import OpeningBook, book_key, book_positions, write_book
+from constants import AI_TURN, HUMAN_TURN, COLS
+from engine import iterative_deepening
+
+MAX_PLY = 2
+DEPTH = 4
+
+
+def mirror_moves(moves: str):
+    return "".join(str(COLS + 1 - int(char)) for char in moves)
+
+
+@pytest.fixture(scope="module")
+def book(tmp_path_factory):
+    """Small book: every position up to MAX_PLY, searched like generate_book but in process"""
+    entries = {}
+    for key, (moves, first_turn) in book_positions(MAX_PLY).items():
+        column, score, depth = iterative_deepening(Board.from_moves(moves, first_turn), AI_TURN, max_depth=DEPTH)
+        entries[key] = (column, depth, score)
+    path = tmp_path_factory.mktemp("book") / "book.bin"
+    write_book(str(path), entries, MAX_PLY)
+    with OpeningBook(str(path)) as opened:
+        yield opened, entries
+
+
+def positions(first_turn: int):
+    """Every move string with the AI to move within MAX_PLY plies"""
+    strings = []
+    for ply in range(0 if first_turn == AI_TURN else 1, MAX_PLY + 1, 2):
+        for number in range(COLS ** ply):
+            strings.append("".join(str(number // COLS ** index % COLS + 1) for index in range(ply)))
+    return strings
+
+
+def test_book_holds_one_entry_per_canonical_position(book):
+    opened, entries = book
+    assert len(opened) == len(entries) == len(book_positions(MAX_PLY))
+
+
+@pytest.mark.parametrize("first_turn", [AI_TURN, HUMAN_TURN])
+def test_probe_returns_the_stored_search(book, first_turn):
+    opened, entries = book
+    for moves in positions(first_turn):
+        bitboard = Board.from_moves(moves, first_turn).bitboard
+        key, mirrored = book_key(bitboard)
+        column, depth, score = entries[key]
+        assert opened.probe(bitboard) == ((COLS - 1 - column if mirrored else column), score, depth)
+
+
+@pytest.mark.parametrize("first_turn", [AI_TURN, HUMAN_TURN])
+def test_mirrored_positions_get_mirrored_moves(book, first_turn):
+    opened, _ = book
+    for moves in positions(first_turn):
+        if moves == mirror_moves(moves):
+            continue  # its own mirror image
+        column, score, depth = opened.probe(Board.from_moves(moves, first_turn).bitboard)
+        mirror = opened.probe(Board.from_moves(mirror_moves(moves), first_turn).bitboard)
+        assert mirror == (COLS - 1 - column, score, depth)
+
+
+def test_probe_misses(book):
+    opened, _ = book
+    assert opened.probe(BitBoard(), HUMAN_TURN) is None  # the book only holds the AI to move
+    assert opened.probe(Board.from_moves("4444").bitboard) is None  # beyond MAX_PLY
+    assert opened.probe(BitBoard(geometry=get_geometry(8, 9, 5))) is None
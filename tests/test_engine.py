@@ -0,0 +1,22 @@
+import pytest
+
+import engine
+from bitboard import get_geometry
+from board import Board
+from constants import ALPHA, BETA
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+
+@pytest.mark.parametrize("shape", [(6, 7, 4), (5, 6, 3), (7, 8, 5)], ids=str)
+def test_search_matches_plain_minimax(shape, random_positions, monkeypatch):
+    geometry = get_geometry(*shape)
+    for bitboard, turn in random_positions(15, 7, geometry, max_plies=geometry.size // 2):
+        for depth in (1, 2, 3, 4):
+            # threat pre-pass, canonical (mirror-shared) transposition table and move ordering
+            score = engine.alpha_beta_pruning(Board(bitboard.copy()), depth, turn, ALPHA, BETA, TranspositionTable(),
+                                              ordering=MoveOrdering(geometry=geometry))[1]
+            with monkeypatch.context() as patch:
+                patch.setattr(engine, "THREAT_PREPASS", False)
+                plain = engine.alpha_beta_pruning(Board(bitboard.copy()), depth, turn, ALPHA, BETA)[1]
+            assert score == plain, (bitboard.moves, depth)
@@ -0,0 +1,28 @@
+import random
+
+import pytest
+
+from bitboard import BitBoard, ONGOING, get_geometry
+from board import Board
+from constants import AI_TURN
+from engine import score_position
+
+
+@pytest.mark.parametrize("geometry", [get_geometry(), get_geometry(5, 6, 3), get_geometry(8, 9, 5)], ids=repr)
+def test_incremental_score_matches_score_position(geometry):
+    # the incremental score is only kept for positions nobody has won, the game stops at the first win
+    rng = random.Random(1)
+    for _ in range(30):
+        bitboard = BitBoard(geometry=geometry)
+        turn = AI_TURN
+        while bitboard.valid_columns():
+            bitboard.make_move(rng.choice(bitboard.valid_columns()), turn)
+            if bitboard.last_move_status() != ONGOING:
+                break
+            turn = 1 - turn
+            assert bitboard.score == score_position(Board(bitboard), AI_TURN)
+        # unmaking (the winning move included) restores every earlier score
+        while bitboard.moves:
+            bitboard.unmake_move()
+            assert bitboard.score == score_position(Board(bitboard), AI_TURN)
+        assert bitboard.score == 0
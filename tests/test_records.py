@@ -0,0 +1,52 @@
+import pytest
+
+from analysis import analyze
+from archive import game_tasks, run_tasks
+from bitboard import get_geometry
+from board import Board
+from constants import AI_TURN, HUMAN_TURN
+from records import format_record, game_result, parse_record, read_records
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("4453623 1-0", ([3, 3, 4, 2, 5, 1, 2], "1-0", AI_TURN)),
+    ("4453 human", ([3, 3, 4, 2], None, HUMAN_TURN)),
+    ("44536211275 1/2 Human  # comment", ([3, 3, 4, 2, 5, 1, 0, 0, 1, 6, 4], "1/2", HUMAN_TURN)),
+    ('{"record": "4453", "result": "a"}', ([3, 3, 4, 2], None, AI_TURN)),
+    ("  # only a comment", None),
+])
+def test_parse_record(line, expected):
+    assert parse_record(line) == expected
+
+
+@pytest.mark.parametrize("line", ["4453 human 1-0", "4453 1-0 1-0", "4453 ai human", "44!3"])
+def test_parse_record_rejects(line):
+    with pytest.raises(ValueError):
+        parse_record(line)
+
+
+@pytest.mark.parametrize("first_turn", [AI_TURN, HUMAN_TURN])
+def test_format_and_parse_round_trip(first_turn):
+    board = Board.from_moves("4455667", first_turn)
+    line = format_record(board.bitboard.moves, game_result(board.bitboard), first_turn)
+    assert parse_record(line) == (board.bitboard.moves, "1-0", first_turn)
+    assert line.endswith("human") == (first_turn == HUMAN_TURN)
+
+
+def test_archive_replays_the_recorded_first_player(tmp_path):
+    path = tmp_path / "games.txt"
+    path.write_text("4453 * human\n4453 *\n")
+    records = list(read_records([str(path)]))
+    assert [record[4] for record in records] == [HUMAN_TURN, AI_TURN]
+
+    tasks = game_tasks(records, get_geometry(), 3)
+    for (game, moves, _, _, _), results, _ in run_tasks(tasks, (6, 7, 4), 3, workers=1):
+        # every position is scored as played: the human made the first move of the first game
+        board = Board.from_moves("", game["first"])
+        turn = game["first"]
+        for ply, column in enumerate(moves):
+            lines = analyze(board, turn, max_depth=3)[0]
+            assert results[ply] == [next((line["score"] for line in lines if line["column"] == col), None)
+                                    for col in range(7)]
+            board.bitboard.make_move(column, turn)
+            turn = 1 - turn
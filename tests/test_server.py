@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+import bitboard
+from server import EngineServer, MAX_CELLS
+
+
+async def exchange(path, requests: list):
+    """Send requests over a fresh connection to a server listening on path, return the replies"""
+    reader, writer = await asyncio.open_unix_connection(str(path))
+    replies = []
+    for request in requests:
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        replies.append(json.loads(await reader.readline()))
+    writer.close()
+    await writer.wait_closed()
+    return replies
+
+
+def serve(tmp_path, requests: list):
+    async def run():
+        server = EngineServer(workers=1, book_path=None)
+        await server.start()
+        path = tmp_path / "engine.sock"
+        listener = await asyncio.start_unix_server(server.serve_client, str(path))
+        try:
+            return await exchange(path, requests)
+        finally:
+            listener.close()
+            await server.close()
+    return asyncio.run(run())
+
+
+def test_oversized_and_malformed_boards_are_rejected_before_building(tmp_path):
+    requests = [
+        {"op": "new_game", "rows": 300, "cols": 300, "connect": 4, "id": 1},
+        {"op": "search", "moves": [], "rows": 21, "cols": 20, "id": 2},
+        {"op": "new_game", "rows": 4.9, "cols": 7, "id": 3},
+        {"op": "new_game", "rows": "7", "cols": 7, "id": 4},
+        {"op": "new_game", "rows": True, "id": 5},
+        {"op": "new_game", "rows": 6, "cols": 7, "connect": 8, "id": 6},
+        {"op": "new_game", "rows": 0, "cols": 7, "id": 7},
+        {"op": "ping", "id": 8},
+    ]
+    replies = serve(tmp_path, requests)
+    assert [reply["id"] for reply in replies] == list(range(1, 9))
+    assert all(not reply["ok"] for reply in replies[:-1])
+    assert f"{MAX_CELLS} cells" in replies[0]["error"]
+    assert replies[-1]["ok"]  # the connection survives every rejected request
+    assert (300, 300, 4) not in bitboard._geometries
+    assert (21, 20, 4) not in bitboard._geometries
+
+
+def test_largest_board_is_accepted(tmp_path):
+    reply, = serve(tmp_path, [{"op": "new_game", "rows": 20, "cols": 20, "connect": 5, "time_ms": 20}])
+    assert reply["ok"]
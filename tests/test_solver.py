@@ -0,0 +1,55 @@
+import pytest
+
+from bitboard import WIN, DRAW
+from solver import SIZE, Solver, outcome
+
+
+def brute_force(bitboard, turn: int, cache: dict):
+    """Score of a position by plain negamax over every move, on the solver's scale (see solver.py)"""
+    key = bitboard.position_key(turn)
+    if key not in cache:
+        moves = len(bitboard.moves)
+        best = None
+        for column in bitboard.valid_columns():
+            bitboard.make_move(column, turn)
+            status = bitboard.last_move_status()
+            if status == WIN:
+                score = (SIZE + 1 - moves) // 2
+            elif status == DRAW:
+                score = 0
+            else:
+                score = -brute_force(bitboard, 1 - turn, cache)
+            bitboard.unmake_move()
+            if best is None or score > best:
+                best = score
+        cache[key] = best
+    return cache[key]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_solver_matches_brute_force(seed, random_positions):
+    solver = Solver()
+    positions = [(bitboard, turn) for bitboard, turn in random_positions(60, seed, min_plies=SIZE - 10)
+                 if SIZE - len(bitboard.moves) <= 10]
+    assert positions
+    for bitboard, turn in positions:
+        expected = brute_force(bitboard.copy(), turn, {})
+        column, score = solver.solve(bitboard, turn)
+        assert score == expected, bitboard.moves
+        # the best column really reaches that score
+        child = bitboard.copy()
+        child.make_move(column, turn)
+        status = child.last_move_status()
+        if status == WIN:
+            assert score == (SIZE + 1 - len(bitboard.moves)) // 2
+        elif status == DRAW:
+            assert score == 0
+        else:
+            assert -brute_force(child, 1 - turn, {}) == score
+
+
+def test_outcome():
+    assert outcome(0, 40) == ("draw", 2)
+    # the player to move (41 discs played, so the second player) wins with the next disc
+    assert outcome((SIZE + 1 - 41) // 2, 41) == ("win", 1)
+    assert outcome(-((SIZE - 40) // 2), 40)[0] == "loss"
@@ -0,0 +1,85 @@
+"""
+Threat pre-pass: immediate wins, forced blocks and poisoned columns of a position
+
+A few bitboard operations per node (Geometry.winning_cells of both players) tell, before any child is searched:
+    - wins: playable cells where the player to move connects at once
+    - blocks: playable cells where the opponent would connect on their next move, they must be blocked
+    - poisoned: playable cells right below an opponent's winning cell, playing there lets the opponent win on top
+
+alpha_beta_pruning runs forced_columns once per node (at depth 2 or more) before expanding it:
+    - an immediate win ends the node with a won score
+    - two threats of the opponent (or a single one whose block is poisoned) lose whatever is played
+    - a single threat leaves the block as the only child
+    - otherwise poisoned columns are not searched, unless every column is poisoned (then the node is lost)
+
+From depth 2 on every skipped child would have scored a loss (the opponent's win is one ply below it),
+so the search returns the same scores with fewer nodes. Odd/ even threat parity (which player ends up filling
+which row) is not used to cut nodes: it decides games through zugzwang long after the search horizon, and
+the exact endgame solver (solver.py) already plays those positions perfectly.
+"""
+THREAT_MIN_DEPTH = 2  # below this the skipped children would not have been seen to lose, so the scores would change
+
+# Outcome of a node settled by the pre-pass, for the player to move
+FORCED_WIN = 1
+FORCED_LOSS = -1
+
+
+def threats(bitboard, player_turn: int):
+    """Threat cells of a position, every one of them playable now
+
+    Args:
+        bitboard (BitBoard): position, nobody has won yet
+        player_turn (int): player to move
+
+    Returns:
+        tuple: bitboards (wins, blocks, poisoned), see the module docstring
+    """
+    geometry = bitboard.geometry
+    bits = bitboard.bits
+    mask = bits[0] | bits[1]
+    playable = (mask + geometry.bottom_mask) & geometry.board_mask
+    opponent_wins = geometry.winning_cells(bits[1 - player_turn], mask)
+    return (geometry.winning_cells(bits[player_turn], mask) & playable, opponent_wins & playable,
+            (opponent_wins >> 1) & playable)
+
+
+def cell_columns(geometry, cells: int):
+    """Columns of the cells of a bitboard, left to right"""
+    columns = []
+    while cells:
+        cell = cells & -cells
+        columns.append((cell.bit_length() - 1) // geometry.column_height)
+        cells ^= cell
+    return columns
+
+
+def forced_columns(bitboard, player_turn: int):
+    """Run the threat pre-pass of a node
+
+    Args:
+        bitboard (BitBoard): position, nobody has won yet and it is not full
+        player_turn (int): player to move
+
+    Returns:
+        tuple: (outcome, columns)
+            (FORCED_WIN, [winning column])
+            (FORCED_LOSS, [column]): every move loses at once, column blocks one threat (or is any column)
+            (None, columns): the columns worth searching, the single block or every column but the poisoned ones
+            (None, None): no threats, search every column
+    """
+    geometry = bitboard.geometry
+    wins, blocks, poisoned = threats(bitboard, player_turn)
+    if wins:
+        return FORCED_WIN, cell_columns(geometry, wins & -wins)
+    if blocks:
+        block = blocks & -blocks
+        if blocks != block or block & poisoned:
+            return FORCED_LOSS, cell_columns(geometry, block)
+        return None, cell_columns(geometry, block)
+    if poisoned:
+        mask = bitboard.bits[0] | bitboard.bits[1]
+        safe = (mask + geometry.bottom_mask) & geometry.board_mask & ~poisoned
+        if not safe:
+            return FORCED_LOSS, cell_columns(geometry, poisoned & -poisoned)
+        return None, cell_columns(geometry, safe)
+    return None, None
@@ -0,0 +1,125 @@
+"""
+Transposition table for alpha_beta_pruning
+
+The same Connect 4 position is reached by many move orders, so results are cached by the
+Zobrist key of the position (BitBoard.canonical_key: a position and its mirror image share one entry,
+the stored move is the one of the canonical side) and reused instead of searching the subtree again.
+
+Memory is capped: the table is two fixed-size lists ("tiers") allocated up front
+- depth tier: keeps the entry searched the deepest, since it saved the most work
+- recent tier: always replaced, so new positions still get cached when the depth tier is busy
+"""
+
+# Bound types: how the stored score relates to the real value of the position
+EXACT = 0  # alpha < score < beta, the score is the real value
+LOWER_BOUND = 1  # score >= beta (cutoff), the real value is at least score
+UPPER_BOUND = 2  # score <= alpha, the real value is at most score
+
+# Entry tuple fields
+KEY, DEPTH, SCORE, FLAG, MOVE = range(5)
+
+DEFAULT_MAX_ENTRIES = 1 << 18
+
+
+class TranspositionTable:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            max_entries (int): upper bound on stored entries (both tiers), rounded down to a power of two
+        """
+        slots = 1
+        while slots * 4 <= max_entries:
+            slots *= 2
+        self.slots = slots
+        self.index_mask = slots - 1
+        self.depth_tier = [None] * slots
+        self.recent_tier = [None] * slots
+        self.reset_stats()
+
+    @property
+    def max_entries(self):
+        return 2 * self.slots
+
+    def reset_stats(self):
+        """Reset hit/ miss/ collision/ overwrite counters, e.g. before every AI move"""
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0  # probe found the slot taken by a different position
+        self.overwrites = 0  # store evicted a different position
+        self.stores = 0
+
+    def stats(self):
+        """Counters since the last reset_stats, plus current fill level
+
+        Returns:
+            dict: hits, misses, collisions, overwrites, stores, entries, max_entries, hit_rate
+        """
+        probes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "overwrites": self.overwrites,
+            "stores": self.stores,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }
+
+    def __len__(self):
+        return (self.slots - self.depth_tier.count(None)) + (self.slots - self.recent_tier.count(None))
+
+    def clear(self):
+        self.depth_tier = [None] * self.slots
+        self.recent_tier = [None] * self.slots
+
+    def probe(self, key: int):
+        """Look a position up
+
+        Args:
+            key (int): position key
+
+        Returns:
+            tuple or None: (key, depth, score, flag, move) if the position is stored
+        """
+        index = key & self.index_mask
+        entry = self.depth_tier[index]
+        if entry is not None and entry[KEY] == key:
+            self.hits += 1
+            return entry
+        other = self.recent_tier[index]
+        if other is not None and other[KEY] == key:
+            self.hits += 1
+            return other
+
+        self.misses += 1
+        if entry is not None or other is not None:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, depth: int, score: float, flag: int, move):
+        """Store a search result, evicting according to the two-tier policy
+
+        Args:
+            key (int): position key
+            depth (int): remaining depth the position was searched to
+            score (float): score found by the search
+            flag (int): EXACT, LOWER_BOUND or UPPER_BOUND
+            move (int or None): best column found
+        """
+        self.stores += 1
+        index = key & self.index_mask
+        new_entry = (key, depth, score, flag, move)
+        entry = self.depth_tier[index]
+
+        if entry is None or entry[KEY] == key or depth >= entry[DEPTH]:
+            self.depth_tier[index] = new_entry
+            if entry is None or entry[KEY] == key:
+                return
+            # demote the shallower entry instead of dropping it
+            new_entry = entry
+
+        replaced = self.recent_tier[index]
+        if replaced is not None and replaced[KEY] != new_entry[KEY]:
+            self.overwrites += 1
+        self.recent_tier[index] = new_entry
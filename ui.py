@@ -0,0 +1,231 @@
+"""
+Pygame rendering for the Connect 4 window
+
+pygame is imported inside the functions, and the window is only opened by the first get_screen() call,
+so importing this module (or anything in the engine) works on machines without a display
+
+The game draws through Renderer (get_renderer()), which only redraws what changed;
+draw_board redraws everything and is kept for Board.draw_board
+"""
+from constants import (ROWS, COLS, CELL_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT, WINDOW_CAPTION,
+                       AI_TURN, HUMAN_TURN, RED, WHITE, BLACK, LIGHT_GRAY, NAVY_BLUE, SHADE_GRAY)
+from disc import Disc
+
+_screen = None
+
+
+def get_screen():
+    """Get the game window, creating it on first use
+
+    Returns:
+        pygame.Surface: the display surface
+    """
+    global _screen
+    if _screen is None:
+        import pygame
+        _screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption(WINDOW_CAPTION)
+    return _screen
+
+
+def draw_board(board, screen):
+    """Draw the entire board with all placed discs
+
+    Args:
+        board: Board object to draw
+        screen: pygame screen to draw on
+    """
+    import pygame
+
+    curr_board = board.board
+    for row in range(ROWS):
+        for col in range(COLS):
+            # Draw rectangle for each cell
+            pygame.draw.rect(
+                surface=screen,
+                color=LIGHT_GRAY,
+                rect=(col * CELL_SIZE, row * CELL_SIZE + CELL_SIZE, CELL_SIZE, CELL_SIZE),
+            )
+
+            # Calculate center of the cell
+            center_x = int(col * CELL_SIZE + CELL_SIZE // 2)
+            center_y = int(row * CELL_SIZE + CELL_SIZE + CELL_SIZE // 2) # one more CELL_SIZE here since we have an extra space to display title near Ox axis
+
+            if curr_board[row][col] == 0: # AI
+                Disc.draw(color=NAVY_BLUE, center_x=center_x, center_y=center_y, surface=screen)
+
+            elif curr_board[row][col] == 1: # HUMAN
+                Disc.draw(color=RED, center_x=center_x, center_y=center_y, surface=screen)
+
+            else: # Empty cell
+                Disc.draw(color=WHITE, center_x=center_x, center_y=center_y, surface=screen)
+    pygame.display.update()
+
+
+class Renderer:
+    def __init__(self, screen):
+        """Draws the game with as little work per frame as possible, for low-power machines:
+        the board background, the cell tiles (one per disc color) and the hover overlay are rendered once,
+        only the cells that changed since the last draw are blitted again, and only the changed
+        rectangles are sent to the display by flush(), once per frame
+
+        Args:
+            screen: pygame screen to draw on
+        """
+        import pygame
+
+        self.screen = screen
+        # cell tile per cell value: gray square with a white (empty), navy (AI) or red (Human) disc
+        self.tiles = {}
+        for value, color in ((None, WHITE), (AI_TURN, NAVY_BLUE), (HUMAN_TURN, RED)):
+            tile = pygame.Surface((CELL_SIZE, CELL_SIZE)).convert()
+            tile.fill(LIGHT_GRAY)
+            Disc.draw(color=color, center_x=CELL_SIZE // 2, center_y=CELL_SIZE // 2, surface=tile)
+            self.tiles[value] = tile
+
+        self.background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.background.fill(WHITE)
+        for row in range(ROWS):
+            for col in range(COLS):
+                self.background.blit(self.tiles[None], self.cell_rect(row, col))
+
+        # semi-transparent highlight over the hovered column
+        self.overlay = pygame.Surface((CELL_SIZE, CELL_SIZE * ROWS)).convert()
+        self.overlay.set_alpha(50)  # Transparency level (0-255)
+        self.overlay.fill(SHADE_GRAY)
+
+        self.cells = [[None] * COLS for _ in range(ROWS)]  # what is drawn on screen now
+        self.highlighted = None  # column under the highlight overlay
+        self.hint = None  # (column, text) shown above the board
+        self.hint_font = None  # created on first use, after pygame.init()
+        self.dirty = []  # rectangles changed since the last flush()
+
+    @staticmethod
+    def cell_rect(row: int, col: int):
+        # one more CELL_SIZE on y since we have an extra space to display title near Ox axis
+        return (col * CELL_SIZE, row * CELL_SIZE + CELL_SIZE, CELL_SIZE, CELL_SIZE)
+
+    @staticmethod
+    def column_rect(col: int):
+        return (col * CELL_SIZE, CELL_SIZE, CELL_SIZE, CELL_SIZE * ROWS)
+
+    @staticmethod
+    def hint_rect(col: int):
+        # title space right above the column
+        return (col * CELL_SIZE, 0, CELL_SIZE, CELL_SIZE)
+
+    def reset(self, board=None):
+        """Redraw the whole window from the background (new game), and show it at once
+
+        Args:
+            board: optional Board object to draw on the empty background
+        """
+        import pygame
+
+        self.screen.blit(self.background, (0, 0))
+        self.cells = [[None] * COLS for _ in range(ROWS)]
+        self.highlighted = None
+        self.hint = None
+        if board is not None:
+            self.draw_board(board)
+        self.dirty = []
+        pygame.display.update()
+
+    def draw_board(self, board):
+        """Draw the cells that changed since the last draw, and remove the highlight and hint like a full redraw would
+
+        Args:
+            board: Board object to draw
+        """
+        self.highlight(None)
+        self.show_hint(None, None)
+        curr_board = board.board
+        for row in range(ROWS):
+            for col in range(COLS):
+                value = curr_board[row][col]
+                if value != self.cells[row][col]:
+                    self.cells[row][col] = value
+                    rect = self.cell_rect(row, col)
+                    self.screen.blit(self.tiles[value], rect)
+                    self.dirty.append(rect)
+
+    def highlight(self, column):
+        """Move the highlight overlay to a column, redrawing only the old and the new column
+
+        Args:
+            column: column index to highlight, None (or out of range) to remove the highlight
+        """
+        if column is not None and not 0 <= column < COLS:
+            column = None
+        if column == self.highlighted:
+            return
+        if self.highlighted is not None:
+            # restore the cells under the old overlay
+            for row in range(ROWS):
+                self.screen.blit(self.tiles[self.cells[row][self.highlighted]], self.cell_rect(row, self.highlighted))
+            self.dirty.append(self.column_rect(self.highlighted))
+        if column is not None:
+            self.screen.blit(self.overlay, (column * CELL_SIZE, CELL_SIZE))
+            self.dirty.append(self.column_rect(column))
+        self.highlighted = column
+
+    def show_message(self, label, position: tuple):
+        """Show a rendered text in the title space above the board
+
+        Args:
+            label: pygame.Surface of the text (font.render)
+            position (tuple): (x, y) of the text
+        """
+        rect = (0, 0, SCREEN_WIDTH, CELL_SIZE)
+        self.screen.fill(WHITE, rect)
+        self.screen.blit(label, position)
+        self.dirty.append(rect)
+        self.hint = None
+
+    def show_hint(self, column, text):
+        """Show a short text above a column (the hint of the hovered column), redrawing only the old and the new one
+
+        Args:
+            column: column index, None to remove the hint
+            text (str): text to show, None to remove the hint
+        """
+        import pygame
+
+        hint = (column, text) if column is not None and text else None
+        if hint == self.hint:
+            return
+        if self.hint is not None:
+            rect = self.hint_rect(self.hint[0])
+            self.screen.fill(WHITE, rect)
+            self.dirty.append(rect)
+        if hint is not None:
+            if self.hint_font is None:
+                self.hint_font = pygame.font.SysFont("Arial", 24, bold=True)
+            label = self.hint_font.render(text, True, BLACK)
+            rect = self.hint_rect(column)
+            self.screen.blit(label, label.get_rect(center=(column * CELL_SIZE + CELL_SIZE // 2, CELL_SIZE // 2)))
+            self.dirty.append(rect)
+        self.hint = hint
+
+    def flush(self):
+        """Send the changed rectangles to the display, call it once per frame"""
+        import pygame
+
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
+
+
+_renderer = None
+
+
+def get_renderer():
+    """Get the renderer of the game window, creating it (and the window) on first use
+
+    Returns:
+        Renderer: renderer drawing on get_screen()
+    """
+    global _renderer
+    if _renderer is None:
+        _renderer = Renderer(get_screen())
+    return _renderer
@@ -0,0 +1,203 @@
+"""
+Background AI worker for the pygame loop
+
+The search runs on a single background thread, so the game loop keeps handling events
+(QUIT, hover highlighting) while the AI is thinking, and picks the move up with poll().
+
+Pondering: while the human is choosing, the same thread searches the AI's answer to the human's
+likely replies (center columns first). The transposition table and move ordering are shared,
+so even an interrupted ponder warms the caches, and when the human plays a reply that was fully
+searched the AI answers instantly.
+
+Hints: before pondering, the same thread can score every column of the human's position (analysis.analyze),
+publishing the scores after every completed depth, so the game can show them on hover. The hint and the
+ponder are stopped as soon as the human moves, so neither delays the AI's own move.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis import analyze
+from bitboard import ONGOING
+from board import Board
+from constants import AI_TURN, HUMAN_TURN, TIME_BUDGET_MS, HINT_TIME_MS
+from engine import iterative_deepening
+from instrumentation import SearchStats, TelemetryWriter
+from ordering import CENTER_ORDER, MoveOrdering
+from parallel import ParallelSearch
+from transposition import TranspositionTable, MOVE
+
+
+class AIWorker:
+    def __init__(self, table: TranspositionTable, ordering: MoveOrdering, time_ms: float = TIME_BUDGET_MS,
+                 workers: int = 1, book=None, telemetry: TelemetryWriter = None, profile: bool = False,
+                 hint_ms: float = HINT_TIME_MS):
+        """
+        Args:
+            table (TranspositionTable): cache shared by searches and pondering
+            ordering (MoveOrdering): move ordering heuristics shared by searches and pondering
+            time_ms (float): think time per AI move, also used for every pondered reply
+            workers (int): more than 1 searches AI moves on a process pool (see parallel.py), pondering stays on this thread
+            book (OpeningBook): optional opening book, positions in it are answered without searching
+            telemetry (TelemetryWriter): optional per-move search statistics log, closed by shutdown()
+            profile (bool): print a cProfile report of every AI move
+                (statistics and profiles cover serial searches only, not workers > 1)
+            hint_ms (float): think time of the hint analysis of the human's position
+        """
+        self.table = table
+        self.ordering = ordering
+        self.time_ms = time_ms
+        self.book = book
+        self.telemetry = telemetry
+        self.profile = profile
+        self.hint_ms = hint_ms
+        self.parallel = ParallelSearch(workers) if workers > 1 else None
+        # one thread: searches and ponders run one after the other, so the caches are never used concurrently
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-search")
+        self.search_future = None
+        self.ready_result = None  # answer found by pondering, returned by the next poll()
+        self.stop_search = threading.Event()
+        self.stop_ponder = threading.Event()
+        self.ponder_results = {}  # canonical key (AI to move) -> (best_column of the canonical side, score, depth)
+        self.ponder_hits = 0
+        self.hints = None  # (position key, human turn, {column: analysis line}) of the last analyzed depth
+
+    def is_busy(self):
+        """Check if an AI move was requested and not picked up with poll() yet"""
+        return self.search_future is not None or self.ready_result is not None
+
+    def start_search(self, board: Board, turn: int = AI_TURN):
+        """Start searching the AI move on a copy of board, returns immediately
+
+        Args:
+            board (Board): current board, it is not modified
+            turn (int): player the AI plays
+        """
+        self.stop_pondering()
+
+        key, mirrored = board.bitboard.canonical_key(turn)
+        pondered = self.ponder_results.get(key)
+        if pondered is not None:
+            self.ponder_hits += 1
+            best_column, score, depth = pondered
+            if mirrored:
+                best_column = board.bitboard.geometry.cols - 1 - best_column
+            self.ready_result = best_column, score, depth
+            return
+
+        self.stop_search.clear()
+        self.search_future = self.executor.submit(self._search, board.copy(), turn)
+
+    def poll(self):
+        """Get the AI move if the search has finished
+
+        Returns:
+            tuple or None: (best_column, score, depth), None while still searching
+        """
+        if self.ready_result is not None:
+            result, self.ready_result = self.ready_result, None
+            return result
+        if self.search_future is not None and self.search_future.done():
+            future, self.search_future = self.search_future, None
+            return future.result()
+        return None
+
+    def start_pondering(self, board: Board, human_turn: int = HUMAN_TURN, ponder: bool = True, hint: bool = False):
+        """Speculatively search the AI's answers to the human's likely replies until stop_pondering()
+
+        Args:
+            board (Board): current board with the human to move, it is not modified
+            human_turn (int): player the human plays
+            ponder (bool): search the AI's answers
+            hint (bool): first score every column of the position for get_hints()
+        """
+        self.stop_pondering()
+        self.ponder_results = {}
+        if hint:
+            self.executor.submit(self._hint, board.copy(), human_turn, self.stop_ponder)
+        if ponder:
+            self.executor.submit(self._ponder, board.copy(), human_turn, self.stop_ponder)
+
+    def get_hints(self, board: Board, human_turn: int = HUMAN_TURN):
+        """Scores of the human's columns from the latest completed depth of the hint analysis
+
+        Returns:
+            dict or None: column -> analysis line (score from the AI's perspective, bound, pv),
+                None if the position has not been analyzed (yet)
+        """
+        hints = self.hints
+        if hints is None or hints[0] != board.bitboard.position_key(human_turn) or hints[1] != human_turn:
+            return None
+        return hints[2]
+
+    def stop_pondering(self):
+        # a new Event per ponder, so a stopped ponder still queued cannot be revived by clear()
+        self.stop_ponder.set()
+        self.stop_ponder = threading.Event()
+
+    def shutdown(self):
+        """Abort any running search/ ponder and stop the thread"""
+        self.stop_ponder.set()
+        self.stop_search.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.parallel is not None:
+            self.parallel.shutdown()
+        if self.telemetry is not None:
+            self.telemetry.close()
+
+    def _search(self, board: Board, turn: int):
+        if self.parallel is not None:
+            return self.parallel.iterative_deepening(board, turn, time_ms=self.time_ms, book=self.book,
+                                                     stop=self.stop_search)
+        self.table.reset_stats()
+        self.ordering.reset_stats()
+        stats = SearchStats(profile=self.profile) if self.telemetry is not None or self.profile else None
+        result = iterative_deepening(board, turn, time_ms=self.time_ms, table=self.table,
+                                     ordering=self.ordering, stop=self.stop_search, book=self.book, stats=stats)
+        if stats is not None:
+            if self.telemetry is not None:
+                self.telemetry.write({"move": len(board.bitboard.moves) + 1, **stats.to_dict()})
+            if stats.profile_report is not None:
+                print(stats.profile_report)
+        return result
+
+    def _likely_replies(self, board: Board, human_turn: int):
+        """Human replies in the order they are pondered: the move the AI expects (from the
+        transposition table) first, then center-out"""
+        valid_columns = board.bitboard.valid_columns()
+        replies = [col for col in CENTER_ORDER if col in valid_columns]
+        key, mirrored = board.bitboard.canonical_key(human_turn)
+        entry = self.table.probe(key)
+        if entry is not None and entry[MOVE] is not None:
+            expected = board.bitboard.geometry.cols - 1 - entry[MOVE] if mirrored else entry[MOVE]
+            if expected in replies:
+                replies.remove(expected)
+                replies.insert(0, expected)
+        return replies
+
+    def _hint(self, board: Board, human_turn: int, stop: threading.Event):
+        key = board.bitboard.position_key(human_turn)
+
+        def publish(depth, lines):
+            self.hints = (key, human_turn, {line["column"]: line for line in lines})
+
+        analyze(board, human_turn, time_ms=self.hint_ms, table=self.table, ordering=self.ordering, stop=stop,
+                on_depth=publish)
+
+    def _ponder(self, board: Board, human_turn: int, stop: threading.Event):
+        bitboard = board.bitboard
+        ai_turn = 1 - human_turn
+        for column in self._likely_replies(board, human_turn):
+            if stop.is_set():
+                return
+            bitboard.make_move(column, human_turn)
+            # a reply mirroring one already pondered (from a symmetric position) shares its answer
+            key, mirrored = bitboard.canonical_key(ai_turn)
+            if bitboard.last_move_status() == ONGOING and key not in self.ponder_results:
+                best_column, score, depth = iterative_deepening(board, ai_turn, time_ms=self.time_ms, table=self.table,
+                                                                ordering=self.ordering, stop=stop, book=self.book)
+                # only an answer searched for the full budget is as good as a real search
+                if not stop.is_set():
+                    if mirrored:
+                        best_column = bitboard.geometry.cols - 1 - best_column
+                    self.ponder_results[key] = best_column, score, depth
+            bitboard.unmake_move()